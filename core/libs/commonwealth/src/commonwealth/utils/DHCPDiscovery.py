@@ -1,23 +1,245 @@
 #! /usr/bin/env python3
+import argparse
 import asyncio
-import re
-import sys
-from typing import List
+import ipaddress
+import os
+import socket
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 from loguru import logger
 
+DHCP_SERVER_PORT = 67
+DHCP_CLIENT_PORT = 68
+BROADCAST_ADDRESS = "255.255.255.255"
+# Time between DHCPDISCOVER retransmissions while waiting for offers, in seconds
+RETRANSMIT_INTERVAL = 1.0
+
+# BOOTP fixed header, RFC 2131 section 2
+BOOTP_HEADER = struct.Struct("!BBBBIHH4s4s4s4s16s64s128s")
+BOOTP_REQUEST = 1
+BOOTP_REPLY = 2
+BOOTP_BROADCAST_FLAG = 0x8000
+HARDWARE_ETHERNET = 1
+MAGIC_COOKIE = b"\x63\x82\x53\x63"
+
+# DHCP options, RFC 2132
+OPTION_PAD = 0
+OPTION_SUBNET_MASK = 1
+OPTION_ROUTER = 3
+OPTION_DNS = 6
+OPTION_MESSAGE_TYPE = 53
+OPTION_SERVER_IDENTIFIER = 54
+OPTION_PARAMETER_REQUEST_LIST = 55
+OPTION_END = 255
+DHCPDISCOVER = 1
+DHCPOFFER = 2
+
 
 class DHCPDiscoveryError(Exception):
     """Base exception for DHCP discovery errors"""
 
 
-async def discover_dhcp_servers(iface: str, timeout: int = 15) -> List[str]:
+@dataclass
+class DHCPOffer:
+    server: str
+    offered_ip: str
+
+
+@dataclass
+class DHCPDiscoveryResult:
+    interface: str
+    offers: List[DHCPOffer] = field(default_factory=list)
+    # Time until the first offer or the end of the discovery, in seconds
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def servers(self) -> List[str]:
+        return list(dict.fromkeys(offer.server for offer in self.offers))
+
+
+def interface_mac(iface: str) -> bytes:
+    """MAC address of the interface, a random locally administered one if it can't be read"""
+    try:
+        with open(f"/sys/class/net/{iface}/address", "r", encoding="utf-8") as file:
+            mac = bytes.fromhex(file.read().strip().replace(":", ""))
+        if len(mac) == 6 and any(mac):
+            return mac
+    except Exception:
+        pass
+    mac = bytearray(os.urandom(6))
+    mac[0] = (mac[0] & 0xFE) | 0x02
+    return bytes(mac)
+
+
+def build_discover(xid: int, mac: bytes) -> bytes:
+    header = BOOTP_HEADER.pack(
+        BOOTP_REQUEST,
+        HARDWARE_ETHERNET,
+        len(mac),
+        0,
+        xid,
+        0,
+        # Ask for broadcast replies since the interface may not have an address yet
+        BOOTP_BROADCAST_FLAG,
+        bytes(4),
+        bytes(4),
+        bytes(4),
+        bytes(4),
+        mac,
+        b"",
+        b"",
+    )
+    options = bytes(
+        [
+            OPTION_MESSAGE_TYPE,
+            1,
+            DHCPDISCOVER,
+            OPTION_PARAMETER_REQUEST_LIST,
+            4,
+            OPTION_SUBNET_MASK,
+            OPTION_ROUTER,
+            OPTION_DNS,
+            OPTION_SERVER_IDENTIFIER,
+            OPTION_END,
+        ]
+    )
+    return header + MAGIC_COOKIE + options
+
+
+def parse_options(data: bytes) -> Dict[int, bytes]:
+    options: Dict[int, bytes] = {}
+    index = 0
+    while index < len(data):
+        code = data[index]
+        if code == OPTION_PAD:
+            index += 1
+            continue
+        if code == OPTION_END or index + 1 >= len(data):
+            break
+        length = data[index + 1]
+        options[code] = data[index + 2 : index + 2 + length]
+        index += 2 + length
+    return options
+
+
+def parse_offer(packet: bytes, xid: int, source: str) -> Optional[DHCPOffer]:
+    """Parse a DHCPOFFER for the given transaction, returns None for any other packet"""
+    cookie_end = BOOTP_HEADER.size + len(MAGIC_COOKIE)
+    if len(packet) < cookie_end or packet[BOOTP_HEADER.size : cookie_end] != MAGIC_COOKIE:
+        return None
+    op, _, _, _, packet_xid, _, _, _, yiaddr, siaddr, _, _, _, _ = BOOTP_HEADER.unpack(packet[: BOOTP_HEADER.size])
+    if op != BOOTP_REPLY or packet_xid != xid:
+        return None
+
+    options = parse_options(packet[cookie_end:])
+    if options.get(OPTION_MESSAGE_TYPE) != bytes([DHCPOFFER]):
+        return None
+
+    server_identifier = options.get(OPTION_SERVER_IDENTIFIER)
+    if server_identifier is not None and len(server_identifier) == 4:
+        server = str(ipaddress.IPv4Address(server_identifier))
+    elif any(siaddr):
+        server = str(ipaddress.IPv4Address(siaddr))
+    else:
+        server = source
+    return DHCPOffer(server=server, offered_ip=str(ipaddress.IPv4Address(yiaddr)))
+
+
+def _open_socket(iface: str, client_port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        # Only send and receive through the probed interface, also allows probing several interfaces at once
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, iface.encode())
+        sock.bind(("", client_port))
+        sock.setblocking(False)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+async def discover_offers(
+    iface: str,
+    timeout: float = 5.0,
+    wait_all: bool = False,
+    server_address: str = BROADCAST_ADDRESS,
+    server_port: int = DHCP_SERVER_PORT,
+    client_port: int = DHCP_CLIENT_PORT,
+) -> DHCPDiscoveryResult:
     """
-    Discover DHCP servers on the network using nmap's DHCP discovery script
+    Broadcast a DHCPDISCOVER on the interface and collect the DHCPOFFERs
+
+    Args:
+        iface: Network interface to use
+        timeout: Time to wait for offers in seconds
+        wait_all: Wait the whole timeout for every server instead of returning on the first offer
+
+    Returns:
+        Offers received on the interface
+
+    Raises:
+        DHCPDiscoveryError: If the discovery can't be done on the interface
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        sock = _open_socket(iface, client_port)
+    except OSError as e:
+        raise DHCPDiscoveryError(f"Failed to open DHCP client socket on {iface}: {e}") from e
+
+    xid = struct.unpack("!I", os.urandom(4))[0]
+    discover = build_discover(xid, interface_mac(iface))
+    result = DHCPDiscoveryResult(interface=iface)
+    start = time.monotonic()
+    deadline = start + timeout
+    next_transmission = start
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now >= next_transmission:
+                await loop.sock_sendto(sock, discover, (server_address, server_port))
+                next_transmission = now + RETRANSMIT_INTERVAL
+
+            try:
+                packet, (source, _) = await asyncio.wait_for(
+                    loop.sock_recvfrom(sock, 1500), min(deadline, next_transmission) - now
+                )
+            except asyncio.TimeoutError:
+                continue
+
+            offer = parse_offer(packet, xid, source)
+            if offer is None:
+                continue
+            logger.debug(f"DHCP offer of {offer.offered_ip} from {offer.server} on {iface}")
+            if offer not in result.offers:
+                result.offers.append(offer)
+            if not wait_all:
+                break
+    except OSError as e:
+        raise DHCPDiscoveryError(f"Failed to discover DHCP servers on {iface}: {e}") from e
+    finally:
+        sock.close()
+
+    result.elapsed = time.monotonic() - start
+    return result
+
+
+async def discover_dhcp_servers(iface: str, timeout: float = 5.0, wait_all: bool = False) -> List[str]:
+    """
+    Discover DHCP servers on the network
 
     Args:
         interface: Network interface to use
         timeout: Time to wait for responses in seconds
+        wait_all: Wait the whole timeout for every server instead of returning on the first offer
 
     Returns:
         List of DHCP server IP addresses found
@@ -25,71 +247,48 @@ async def discover_dhcp_servers(iface: str, timeout: int = 15) -> List[str]:
     Raises:
         DHCPDiscoveryError: If discovery fails
     """
-    try:
-        # Run nmap with DHCP discovery script
-        cmd = [
-            "sudo",  # Need root privileges
-            "nmap",
-            "--script",
-            "broadcast-dhcp-discover",
-            "-e",
-            iface,  # Specify interface
-            "--script-timeout",
-            f"{timeout}s",
-        ]
-
-        # Run nmap asynchronously
-        logger.info(f"Running nmap command: {' '.join(cmd)}")
-        process = await asyncio.create_subprocess_exec(
-            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
+    return (await discover_offers(iface, timeout, wait_all)).servers
 
-        stdout, stderr = await process.communicate()
-        output = stdout.decode()
-        error = stderr.decode()
 
-        if process.returncode != 0:
-            logger.info(f"nmap output: {output}")
-            logger.info(f"nmap error: {error}")
-            raise DHCPDiscoveryError(f"nmap failed: {error}")
-
-        # Parse nmap output for DHCP servers
-        servers = []
+async def discover_dhcp_servers_on_interfaces(
+    interfaces: List[str], timeout: float = 5.0, wait_all: bool = False
+) -> Dict[str, DHCPDiscoveryResult]:
+    """
+    Discover DHCP servers on several interfaces at once, each one returns on its first offer unless wait_all is set
 
-        # Look for Server Identifier or DHCP Server lines
-        server_pattern = r"Server(?:\s+Identifier|\s*:)\s*(\d+\.\d+\.\d+\.\d+)"
-        for match in re.finditer(server_pattern, output):
-            server_ip = match.group(1)
-            if server_ip not in servers:
-                servers.append(server_ip)
+    Returns:
+        Result of each interface, failures are reported in the result error instead of raised
+    """
 
-        return servers
+    async def discover(iface: str) -> DHCPDiscoveryResult:
+        try:
+            return await discover_offers(iface, timeout, wait_all)
+        except DHCPDiscoveryError as e:
+            return DHCPDiscoveryResult(interface=iface, error=str(e))
 
-    except FileNotFoundError as e:
-        raise DHCPDiscoveryError("nmap is not installed. Please install nmap package.") from e
-    except Exception as e:
-        raise DHCPDiscoveryError(f"Failed to discover DHCP servers: {str(e)}") from e
+    results = await asyncio.gather(*(discover(iface) for iface in interfaces))
+    return {result.interface: result for result in results}
 
 
 async def main() -> None:
     """Main function for command line usage"""
-    interface_to_scan = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Discover DHCP servers on the network.")
+    parser.add_argument("interfaces", nargs="+", help="Network interfaces to probe")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Time to wait for offers in seconds")
+    parser.add_argument("--all", action="store_true", help="Wait the whole timeout for every server")
+    args = parser.parse_args()
 
-    try:
-        servers = await discover_dhcp_servers(interface_to_scan)
-        if servers:
-            print(f"Found {len(servers)} DHCP server(s):")
-            for server in servers:
-                print(f"  {server}")
+    results = await discover_dhcp_servers_on_interfaces(args.interfaces, args.timeout, args.all)
+    for result in results.values():
+        if result.error:
+            print(f"{result.interface}: Error: {result.error}")
+        elif result.servers:
+            print(f"{result.interface}: Found {len(result.servers)} DHCP server(s) in {result.elapsed:.2f}s:")
+            for offer in result.offers:
+                print(f"  {offer.server} (offered {offer.offered_ip})")
         else:
-            print("No DHCP servers found.")
-    except DHCPDiscoveryError as e:
-        print(f"Error: {str(e)}")
-        sys.exit(1)
+            print(f"{result.interface}: No DHCP servers found.")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: sudo {sys.argv[0]} <interface>")
-        sys.exit(1)
     asyncio.run(main())
@@ -0,0 +1,164 @@
+import pathlib
+import time
+from enum import Enum
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+
+from commonwealth.utils.streaming import Broadcaster
+
+
+class DHCPLease(BaseModel):
+    interface: str
+    mac: str
+    ip: str
+    hostname: Optional[str] = None
+    # Unix time when the lease expires, None for infinite leases
+    expires: Optional[int] = None
+    # Unix times when the lease was first granted and last granted or renewed
+    first_seen: float
+    last_seen: float
+    active: bool = True
+    # Unix time when the lease was released, None while active
+    released: Optional[float] = None
+
+
+class DHCPLeaseFilter(BaseModel):
+    interface: Optional[str] = None
+    mac: Optional[str] = None
+    ip: Optional[str] = None
+    hostname: Optional[str] = None
+    active_only: bool = False
+
+    def matches(self, lease: DHCPLease) -> bool:
+        return (
+            (self.interface is None or lease.interface == self.interface)
+            and (self.mac is None or lease.mac == self.mac.lower())
+            and (self.ip is None or lease.ip == self.ip)
+            and (self.hostname is None or lease.hostname == self.hostname)
+            and (not self.active_only or lease.active)
+        )
+
+
+class DHCPLeaseEventType(str, Enum):
+    Added = "added"
+    Renewed = "renewed"
+    Released = "released"
+
+
+class DHCPLeaseEvent(BaseModel):
+    event: DHCPLeaseEventType
+    lease: DHCPLease
+
+
+def parse_lease_file(content: str) -> List[Tuple[Optional[int], str, str, Optional[str]]]:
+    """Parse dnsmasq lease file lines: '<expiry> <mac> <ip> <hostname or *> <client id or *>'
+
+    Returns:
+        List of (expiry, mac, ip, hostname) of each IPv4 lease
+    """
+    leases = []
+    for line in content.splitlines():
+        fields = line.split()
+        # IPv6 leases have a different format and are preceded by a 'duid' line
+        if len(fields) < 4 or fields[0] == "duid" or ":" in fields[2]:
+            continue
+        try:
+            expiry = int(fields[0])
+        except ValueError:
+            continue
+        hostname = fields[3] if fields[3] != "*" else None
+        leases.append((expiry or None, fields[1].lower(), fields[2], hostname))
+    return leases
+
+
+class DHCPLeaseIndex:
+    """
+    In-memory index of the leases granted by the DHCP servers, built incrementally from their lease files.
+    """
+
+    # Time released leases are kept for, in seconds
+    RELEASED_LEASE_TTL = 7 * 24 * 3600
+    # Lease events buffered for each subscriber before the oldest ones are dropped
+    QUEUE_SIZE = 100
+
+    def __init__(self) -> None:
+        # (interface, mac) -> lease
+        self._leases: Dict[Tuple[str, str], DHCPLease] = {}
+        # Lease file, last modification time and size of each interface, to only parse files that changed
+        self._files: Dict[str, Tuple[pathlib.Path, float, int]] = {}
+        self._events: Broadcaster[DHCPLeaseEvent] = Broadcaster(self.QUEUE_SIZE)
+
+    def _publish(self, event: DHCPLeaseEventType, lease: DHCPLease) -> None:
+        self._events.publish(DHCPLeaseEvent(event=event, lease=lease.copy()))
+
+    def update(self, interface: str, content: str, now: Optional[float] = None) -> None:
+        """Update the leases of an interface from the content of its lease file"""
+        now = now or time.time()
+        present = set()
+        for expires, mac, ip, hostname in parse_lease_file(content):
+            present.add(mac)
+            lease = self._leases.get((interface, mac))
+            if lease is None or not lease.active:
+                first_seen = lease.first_seen if lease else now
+                lease = DHCPLease(
+                    interface=interface,
+                    mac=mac,
+                    ip=ip,
+                    hostname=hostname,
+                    expires=expires,
+                    first_seen=first_seen,
+                    last_seen=now,
+                )
+                self._leases[(interface, mac)] = lease
+                self._publish(DHCPLeaseEventType.Added, lease)
+            elif (lease.expires, lease.ip, lease.hostname) != (expires, ip, hostname):
+                lease.ip, lease.hostname, lease.expires, lease.last_seen = ip, hostname, expires, now
+                self._publish(DHCPLeaseEventType.Renewed, lease)
+
+        for (lease_interface, mac), lease in self._leases.items():
+            if lease_interface == interface and lease.active and mac not in present:
+                lease.active, lease.released = False, now
+                self._publish(DHCPLeaseEventType.Released, lease)
+
+    def release(self, interface: str, now: Optional[float] = None) -> None:
+        """Mark every lease of an interface as released, used when its DHCP server is removed"""
+        self._files.pop(interface, None)
+        self.update(interface, "", now)
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Forget the leases released more than RELEASED_LEASE_TTL ago"""
+        now = now or time.time()
+        for key, lease in list(self._leases.items()):
+            if lease.released is not None and now - lease.released > self.RELEASED_LEASE_TTL:
+                del self._leases[key]
+
+    def refresh(self, interface: str, lease_file: pathlib.Path) -> None:
+        """Read the lease file of an interface, if it changed since the last refresh"""
+        self.prune()
+        try:
+            stat = lease_file.stat()
+        except FileNotFoundError:
+            # The server did not grant any lease yet
+            return
+        signature = (lease_file, stat.st_mtime, stat.st_size)
+        if self._files.get(interface) == signature:
+            return
+        self._files[interface] = signature
+        try:
+            self.update(interface, lease_file.read_text(encoding="utf-8", errors="ignore"))
+        except Exception as error:
+            logger.warning(f"Failed to read DHCP lease file {lease_file}: {error}")
+
+    def leases(self, lease_filter: Optional[DHCPLeaseFilter] = None) -> List[DHCPLease]:
+        lease_filter = lease_filter or DHCPLeaseFilter()
+        return [lease.copy() for lease in self._leases.values() if lease_filter.matches(lease)]
+
+    async def events(self) -> AsyncGenerator[DHCPLeaseEvent, None]:
+        """Yields lease events as they happen, starting with an 'added' event for every active lease"""
+        active = self.leases(DHCPLeaseFilter(active_only=True))
+        async for event in self._events.listen(
+            DHCPLeaseEvent(event=DHCPLeaseEventType.Added, lease=lease) for lease in active
+        ):
+            yield event
@@ -22,6 +22,7 @@ class Dnsmasq:
         lease_range: Tuple[int, int] = (101, 200),
         lease_time: str = "24h",
         backup: bool = False,
+        lease_file: Optional[pathlib.Path] = None,
     ) -> None:
         self._subprocess: Optional[Any] = None
 
@@ -50,6 +51,9 @@ class Dnsmasq:
 
         self._lease_time = lease_time
 
+        # Each server has its own lease file, so leases can be tracked per interface
+        self._lease_file = lease_file or pathlib.Path(f"/var/lib/misc/dnsmasq-{interface}.leases")
+
         binary_path = shutil.which(self.binary_name())
         if binary_path is None:
             logger.error("Dnsmasq binary not found on system's PATH.")
@@ -96,6 +100,7 @@ class Dnsmasq:
             "--bind-dynamic",
             "--dhcp-option=option6:information-refresh-time,6h",
             "--dhcp-rapid-commit",
+            f"--dhcp-leasefile={self._lease_file}",
             "--cache-size=1500",
             "--no-negcache",
             "--no-resolv",
@@ -156,6 +161,10 @@ class Dnsmasq:
     def ipv4_lease_range(self) -> tuple[IPv4Address, IPv4Address]:
         return self._ipv4_lease_range
 
+    @property
+    def lease_file(self) -> pathlib.Path:
+        return self._lease_file
+
     @property
     def ipv4_network(self) -> IPv4Network:
         return IPv4Interface(f"{self._ipv4_gateway}/{self._subnet_mask}").network
@@ -1,13 +1,29 @@
 import asyncio
 import base64
 import json
+import struct
 from dataclasses import asdict, dataclass
-from typing import AsyncGenerator, Optional, Tuple
+from typing import (
+    AsyncGenerator,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
 from fastapi import status
 
 from commonwealth.utils.apis import StackedHTTPException
 
+# Maximum number of encoded frames waiting to be sent to a client, producers wait when it is full
+DEFAULT_QUEUE_SIZE = 64
+
+T = TypeVar("T")
+
 
 @dataclass
 class StreamingResponse:
@@ -43,68 +59,197 @@ def streaming_response(fragment: int, data: str | bytes) -> str:
     return response_line(StreamingResponse(fragment=fragment, data=data_encoded, status=status.HTTP_200_OK))
 
 
-async def streamer(gen: AsyncGenerator[str | bytes, None], heartbeats: float = -1.0) -> AsyncGenerator[str, None]:
+class StreamEncoder:
+    """
+    Frames the chunks of a stream, the default one is the base64 JSON envelope used since the beginning.
+    """
+
+    media_type = "text/plain"
+
+    def data(self, fragment: int, data: str | bytes) -> str | bytes:
+        return streaming_response(fragment, data)
+
+    def error(self, fragment: int, status_code: int, error: str) -> str | bytes:
+        return response_line(StreamingResponse(fragment=fragment, data=None, status=status_code, error=error))
+
+    def heartbeat(self) -> str | bytes:
+        return streaming_response(-1, "heartbeat")
+
+
+class SSEEncoder(StreamEncoder):
+    """
+    Server-sent events, data is sent as text so binary chunks are decoded as UTF-8.
+    """
+
+    media_type = "text/event-stream"
+
+    def data(self, fragment: int, data: str | bytes) -> str | bytes:
+        text = data.decode("utf-8", errors="replace") if isinstance(data, bytes) else data
+        lines = "".join(f"data: {line}\n" for line in text.splitlines() or [""])
+        return f"id: {fragment}\n{lines}\n"
+
+    def error(self, fragment: int, status_code: int, error: str) -> str | bytes:
+        return f"id: {fragment}\nevent: error\ndata: {json.dumps({'status': status_code, 'error': error})}\n\n"
+
+    def heartbeat(self) -> str | bytes:
+        return ": heartbeat\n\n"
+
+
+class BinaryEncoder(StreamEncoder):
+    """
+    Length prefixed frames: a big endian header with the frame type (1 byte) and payload size (4 bytes).
+    Errors payloads are JSON objects with status and error, heartbeats have no payload.
+    """
+
+    media_type = "application/octet-stream"
+
+    DATA = 0
+    ERROR = 1
+    HEARTBEAT = 2
+    HEADER = struct.Struct(">BI")
+
+    def _frame(self, frame_type: int, payload: bytes) -> bytes:
+        return self.HEADER.pack(frame_type, len(payload)) + payload
+
+    def data(self, fragment: int, data: str | bytes) -> str | bytes:
+        return self._frame(self.DATA, data.encode("utf-8") if isinstance(data, str) else data)
+
+    def error(self, fragment: int, status_code: int, error: str) -> str | bytes:
+        return self._frame(self.ERROR, json.dumps({"status": status_code, "error": error}).encode("utf-8"))
+
+    def heartbeat(self) -> str | bytes:
+        return self._frame(self.HEARTBEAT, b"")
+
+
+def _exception_frame(encoder: StreamEncoder, fragment: int, error: Exception) -> str | bytes:
+    if isinstance(error, StackedHTTPException):
+        return encoder.error(fragment, error.status_code, error.detail)
+    return encoder.error(fragment, status.HTTP_500_INTERNAL_SERVER_ERROR, str(error))
+
+
+def _join(chunks: List[str | bytes]) -> str | bytes:
+    if all(isinstance(chunk, str) for chunk in chunks):
+        return "".join(chunks)  # type: ignore
+    return b"".join(chunk.encode("utf-8") if isinstance(chunk, str) else chunk for chunk in chunks)
+
+
+StreamItem = Tuple[str, str | bytes | Exception | None]
+
+
+def _batch(
+    queue: asyncio.Queue[StreamItem], data: str | bytes, batch_size: int
+) -> Tuple[str | bytes, Optional[StreamItem]]:
+    """
+    Merges data with the data chunks already waiting in the queue, up to batch_size bytes.
+    Returns the merged data and the first item taken from the queue that is not data, if any.
+    """
+    chunks = [data]
+    size = len(data)
+    while size < batch_size and not queue.empty():
+        item = queue.get_nowait()
+        if item[0] != "data":
+            return _join(chunks), item
+        chunk = cast(str | bytes, item[1])
+        chunks.append(chunk)
+        size += len(chunk)
+    return _join(chunks), None
+
+
+async def streamer(
+    gen: AsyncGenerator[str | bytes, None],
+    heartbeats: float = -1.0,
+    encoder: Optional[StreamEncoder] = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    batch_size: int = 0,
+) -> AsyncGenerator[str | bytes, None]:
     """
     Streamer wrapper for async generators and provide a consistent response format
     with error handling. Data is encoded in base64 to avoid any new line jsons conflicts.
+
+    The queue between the generator and the client is bounded by queue_size, so a slow client slows down the
+    generator instead of making memory grow. If batch_size is set, chunks that are already waiting are merged in a
+    single frame of up to batch_size bytes, only use it when clients do not rely on chunk boundaries.
     """
+    encoder = encoder or StreamEncoder()
+    queue: asyncio.Queue[StreamItem] = asyncio.Queue(maxsize=queue_size)
 
-    async def send_heartbeat(period: float, queue: asyncio.Queue[Optional[str]]) -> None:
+    async def send_heartbeat(period: float) -> None:
         while True:
             await asyncio.sleep(period)
-            await queue.put(streaming_response(-1, "heartbeat"))
-
-    queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+            # Heartbeats are only needed when there is nothing else waiting to be sent
+            if queue.empty():
+                queue.put_nowait(("heartbeat", None))
 
-    if heartbeats > 0:
-        heartbeat_task = asyncio.create_task(send_heartbeat(heartbeats, queue))
-    else:
-        heartbeat_task = None
-
-    async def generator_wrapper(gen: AsyncGenerator[str | bytes, None], queue: asyncio.Queue[Optional[str]]) -> None:
-        fragment = 0
+    async def generator_wrapper() -> None:
         try:
-            async for data in gen:
-                await queue.put(streaming_response(fragment, data))
-                fragment += 1
-        except StackedHTTPException as e:
-            await queue.put(streaming_stack_exception(fragment, e))
-        except Exception as e:
-            await queue.put(streaming_error_exception(fragment, e))
+            try:
+                async for data in gen:
+                    await queue.put(("data", data))
+            except Exception as e:
+                await queue.put(("error", e))
+            # Not reached when cancelled, the client is gone and a full queue would never be drained
+            await queue.put(("end", None))
         finally:
-            if heartbeat_task:
-                heartbeat_task.cancel()
-            await queue.put(None)
+            await gen.aclose()
+
+    heartbeat_task = asyncio.create_task(send_heartbeat(heartbeats)) if heartbeats > 0 else None
+    generator_task = asyncio.create_task(generator_wrapper())
 
-    asyncio.create_task(generator_wrapper(gen, queue))
+    fragment = 0
+    pending: Optional[StreamItem] = None
+    try:
+        while True:
+            kind, value = pending or await queue.get()
+            pending = None
+            if kind == "end":
+                break
+            if kind == "heartbeat":
+                yield encoder.heartbeat()
+                continue
+            if isinstance(value, Exception):
+                yield _exception_frame(encoder, fragment, value)
+                continue
 
-    while True:
-        item = await queue.get()
-        if item is None:
-            break
-        yield item
+            data = cast(str | bytes, value)
+            if batch_size > 0:
+                data, pending = _batch(queue, data, batch_size)
+
+            yield encoder.data(fragment, data)
+            fragment += 1
+    finally:
+        if heartbeat_task:
+            heartbeat_task.cancel()
+        generator_task.cancel()
 
 
 async def _fetch_stream(
     gen: AsyncGenerator[str | bytes, None], queue: asyncio.Queue[Optional[Tuple[str | bytes | None, Exception | None]]]
 ) -> None:
     try:
-        async for data in gen:
-            await queue.put((data, None))
-    except Exception as e:
-        await queue.put((None, e))
-    finally:
+        try:
+            async for data in gen:
+                await queue.put((data, None))
+        except Exception as e:
+            await queue.put((None, e))
+        # Not reached when cancelled, the client is gone and a full queue would never be drained
         await queue.put((None, None))
+    finally:
+        await gen.aclose()
 
 
-async def timeout_streamer(gen: AsyncGenerator[str | bytes, None], timeout: int = 3) -> AsyncGenerator[str, None]:
+async def timeout_streamer(
+    gen: AsyncGenerator[str | bytes, None],
+    timeout: int = 3,
+    encoder: Optional[StreamEncoder] = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> AsyncGenerator[str | bytes, None]:
     """
     Streamer wrapper for async generators and provide a consistent response format
     with error handling with additional timeout limit for each item iteration.
     Data is encoded in base64 to avoid any new line jsons conflicts.
     """
-
-    queue: asyncio.Queue[Optional[Tuple[str | bytes | None, Exception | None]]] = asyncio.Queue()
+    encoder = encoder or StreamEncoder()
+    queue: asyncio.Queue[Optional[Tuple[str | bytes | None, Exception | None]]] = asyncio.Queue(maxsize=queue_size)
     task = asyncio.create_task(_fetch_stream(gen, queue))
 
     fragment = 0
@@ -116,13 +261,54 @@ async def timeout_streamer(gen: AsyncGenerator[str | bytes, None], timeout: int
                 raise error
             if data is None:
                 break
-            yield streaming_response(fragment, data)
+            yield encoder.data(fragment, data)
             fragment += 1
     except asyncio.TimeoutError:
-        yield streaming_timeout_exception(fragment)
-    except StackedHTTPException as e:
-        yield streaming_stack_exception(fragment, e)
+        yield encoder.error(fragment, status.HTTP_408_REQUEST_TIMEOUT, "Timeout reached")
     except Exception as e:
-        yield streaming_error_exception(fragment, e)
+        yield _exception_frame(encoder, fragment, e)
     finally:
         task.cancel()
+
+
+class Broadcaster(Generic[T]):
+    """
+    Fans out messages to any number of subscribers through bounded queues. Slow subscribers lose their oldest
+    messages instead of making memory grow or holding back the publisher.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self.subscribers: Set["asyncio.Queue[T]"] = set()
+        # Messages dropped from slow subscribers
+        self.dropped = 0
+
+    def _put(self, queue: "asyncio.Queue[T]", message: T) -> None:
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(message)
+
+    def publish(self, message: T) -> None:
+        for queue in self.subscribers:
+            self._put(queue, message)
+
+    def subscribe(self, initial: Iterable[T] = ()) -> "asyncio.Queue[T]":
+        """Queue receiving the initial messages followed by every published one, until unsubscribed"""
+        queue: "asyncio.Queue[T]" = asyncio.Queue(maxsize=self.queue_size)
+        for message in initial:
+            self._put(queue, message)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[T]") -> None:
+        self.subscribers.discard(queue)
+
+    async def listen(self, initial: Iterable[T] = ()) -> AsyncGenerator[T, None]:
+        """Yields the initial messages followed by every published one"""
+        queue = self.subscribe(initial)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
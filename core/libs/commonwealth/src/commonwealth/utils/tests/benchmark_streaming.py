@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory of the streamer encoders with fast and slow consumers.
+
+Run with: python -m commonwealth.utils.tests.benchmark_streaming
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import AsyncGenerator, Optional
+
+from commonwealth.utils.streaming import (
+    BinaryEncoder,
+    SSEEncoder,
+    StreamEncoder,
+    streamer,
+)
+
+ENCODERS = {
+    "envelope": StreamEncoder,
+    "sse": SSEEncoder,
+    "binary": BinaryEncoder,
+}
+
+
+async def chunks(count: int, size: int) -> AsyncGenerator[bytes, None]:
+    payload = b"x" * size
+    for _ in range(count):
+        yield payload
+
+
+async def run(encoder: StreamEncoder, count: int, size: int, batch_size: int, consumer_delay: float) -> str:
+    tracemalloc.start()
+    start = time.perf_counter()
+    frames = 0
+    sent = 0
+    async for frame in streamer(chunks(count, size), encoder=encoder, batch_size=batch_size):
+        frames += 1
+        sent += len(frame)
+        if consumer_delay:
+            await asyncio.sleep(consumer_delay)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    payload = count * size
+    return (
+        f"{frames:>7} frames {payload / elapsed / 2**20:>9.2f} MB/s "
+        f"overhead {100 * (sent - payload) / payload:>6.1f}% peak memory {peak / 2**10:>9.1f} kB"
+    )
+
+
+async def main(count: int, size: int, batch_size: int, consumer_delay: Optional[float]) -> None:
+    for delay in [0.0, consumer_delay or 0.0001]:
+        print(f"Consumer delay: {delay}s")
+        for name, encoder in ENCODERS.items():
+            for batch in sorted({0, batch_size}):
+                result = await run(encoder(), count, size, batch, delay)
+                print(f"  {name:<9} batch {batch:>6}: {result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20000, help="Number of chunks generated")
+    parser.add_argument("--size", type=int, default=256, help="Size of each chunk in bytes")
+    parser.add_argument("--batch-size", type=int, default=16384, help="Batch size used in the batched runs")
+    parser.add_argument("--consumer-delay", type=float, default=None, help="Delay of the slow consumer per frame")
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.size, args.batch_size, args.consumer_delay))
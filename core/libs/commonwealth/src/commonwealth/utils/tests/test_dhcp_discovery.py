@@ -0,0 +1,96 @@
+import asyncio
+import ipaddress
+import os
+import socket
+from typing import Any, Optional, Tuple
+
+import pytest
+
+from .. import DHCPDiscovery
+
+requires_root = pytest.mark.skipif(os.geteuid() != 0, reason="SO_BINDTODEVICE requires root")
+
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class StubDHCPServer(asyncio.DatagramProtocol):
+    def __init__(self, server: str, offered_ip: str) -> None:
+        self.server = server
+        self.offered_ip = offered_ip
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.discovers = 0
+
+    def connection_made(self, transport: Any) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self.discovers += 1
+        xid = DHCPDiscovery.BOOTP_HEADER.unpack(data[: DHCPDiscovery.BOOTP_HEADER.size])[4]
+        header = DHCPDiscovery.BOOTP_HEADER.pack(
+            DHCPDiscovery.BOOTP_REPLY,
+            1,
+            6,
+            0,
+            xid,
+            0,
+            0,
+            bytes(4),
+            ipaddress.IPv4Address(self.offered_ip).packed,
+            bytes(4),
+            bytes(4),
+            bytes(16),
+            b"",
+            b"",
+        )
+        options = bytes([DHCPDiscovery.OPTION_MESSAGE_TYPE, 1, DHCPDiscovery.DHCPOFFER])
+        options += bytes([DHCPDiscovery.OPTION_SERVER_IDENTIFIER, 4]) + ipaddress.IPv4Address(self.server).packed
+        assert self.transport is not None
+        self.transport.sendto(header + DHCPDiscovery.MAGIC_COOKIE + options + bytes([DHCPDiscovery.OPTION_END]), addr)
+
+
+def test_discover_packet() -> None:
+    packet = DHCPDiscovery.build_discover(1234, bytes.fromhex("0242ac110002"))
+    options = DHCPDiscovery.parse_options(packet[DHCPDiscovery.BOOTP_HEADER.size + 4 :])
+    assert options[DHCPDiscovery.OPTION_MESSAGE_TYPE] == bytes([DHCPDiscovery.DHCPDISCOVER])
+    assert DHCPDiscovery.parse_offer(packet, 1234, "0.0.0.0") is None
+
+
+@requires_root
+@pytest.mark.asyncio
+async def test_discover_offers() -> None:
+    loop = asyncio.get_running_loop()
+    server_port = free_udp_port()
+    transport, server = await loop.create_datagram_endpoint(
+        lambda: StubDHCPServer("192.168.2.1", "192.168.2.101"), local_addr=("127.0.0.1", server_port)
+    )
+    try:
+        result = await DHCPDiscovery.discover_offers(
+            "lo", timeout=2, server_address="127.0.0.1", server_port=server_port, client_port=free_udp_port()
+        )
+        assert result.servers == ["192.168.2.1"]
+        assert result.offers[0].offered_ip == "192.168.2.101"
+        # Returns on the first offer instead of waiting for the timeout
+        assert result.elapsed < 1
+
+        result = await DHCPDiscovery.discover_offers(
+            "lo",
+            timeout=1.5,
+            wait_all=True,
+            server_address="127.0.0.1",
+            server_port=server_port,
+            client_port=free_udp_port(),
+        )
+        # Waits for the whole timeout, retransmitting every RETRANSMIT_INTERVAL
+        assert result.elapsed >= 1.5 and server.discovers == 1 + 2
+    finally:
+        transport.close()
+
+
+@pytest.mark.asyncio
+async def test_discover_on_missing_interface() -> None:
+    results = await DHCPDiscovery.discover_dhcp_servers_on_interfaces(["blueos-missing0"], timeout=0.1)
+    assert results["blueos-missing0"].error is not None
@@ -0,0 +1,88 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from ..DHCPLeases import (
+    DHCPLeaseEventType,
+    DHCPLeaseFilter,
+    DHCPLeaseIndex,
+    parse_lease_file,
+)
+
+LEASES = """1700003600 AA:BB:CC:DD:EE:01 192.168.2.101 topside 01:aa:bb:cc:dd:ee:01
+1700003600 aa:bb:cc:dd:ee:02 192.168.2.102 * *
+duid 00:01:00:01:2c:5f:7a:10:aa:bb:cc:dd:ee:ff
+1700003600 1234 fd00::10 * 00:01
+"""
+
+
+def test_parse_lease_file() -> None:
+    assert parse_lease_file(LEASES) == [
+        (1700003600, "aa:bb:cc:dd:ee:01", "192.168.2.101", "topside"),
+        (1700003600, "aa:bb:cc:dd:ee:02", "192.168.2.102", None),
+    ]
+
+
+def test_lease_index_tracks_first_and_last_seen() -> None:
+    index = DHCPLeaseIndex()
+    index.update("eth0", LEASES, now=100)
+    assert [lease.ip for lease in index.leases(DHCPLeaseFilter(hostname="topside"))] == ["192.168.2.101"]
+
+    renewed = LEASES.replace("1700003600 AA", "1700007200 AA")
+    index.update("eth0", renewed, now=200)
+    lease = index.leases(DHCPLeaseFilter(mac="AA:BB:CC:DD:EE:01"))[0]
+    assert (lease.first_seen, lease.last_seen, lease.expires) == (100, 200, 1700007200)
+
+    # Released leases are kept, but no longer active
+    index.update("eth0", renewed.splitlines()[0], now=300)
+    assert [lease.mac for lease in index.leases(DHCPLeaseFilter(active_only=True))] == ["aa:bb:cc:dd:ee:01"]
+    assert not index.leases(DHCPLeaseFilter(ip="192.168.2.102"))[0].active
+    # Leases of other interfaces are not touched
+    index.update("usb0", "", now=300)
+    assert len(index.leases(DHCPLeaseFilter(interface="eth0"))) == 2
+
+
+def test_lease_index_release_and_prune(tmp_path: pathlib.Path) -> None:
+    index = DHCPLeaseIndex()
+    lease_file = tmp_path / "dnsmasq-eth0.leases"
+    lease_file.write_text(LEASES, encoding="utf-8")
+    index.refresh("eth0", lease_file)
+    index.update("usb0", LEASES, now=100)
+
+    # Removing the server releases all of its leases
+    index.release("eth0", now=200)
+    assert not index.leases(DHCPLeaseFilter(interface="eth0", active_only=True))
+    assert all(lease.released == 200 for lease in index.leases(DHCPLeaseFilter(interface="eth0")))
+    # A new server on the interface reads the lease file again, even if it did not change
+    index.refresh("eth0", lease_file)
+    assert len(index.leases(DHCPLeaseFilter(interface="eth0", active_only=True))) == 2
+
+    index.update("usb0", "", now=300)
+    index.prune(now=300 + DHCPLeaseIndex.RELEASED_LEASE_TTL)
+    assert len(index.leases(DHCPLeaseFilter(interface="usb0"))) == 2
+    # Released leases are pruned on refresh, whatever the interface being refreshed
+    index.RELEASED_LEASE_TTL = 0
+    index.refresh("eth0", lease_file)
+    assert not index.leases(DHCPLeaseFilter(interface="usb0"))
+    assert len(index.leases(DHCPLeaseFilter(interface="eth0"))) == 2
+
+
+@pytest.mark.asyncio
+async def test_lease_index_refresh_and_events(tmp_path: pathlib.Path) -> None:
+    index = DHCPLeaseIndex()
+    events = index.events()
+    lease_file = tmp_path / "dnsmasq-eth0.leases"
+    index.refresh("eth0", lease_file)
+    assert not index.leases()
+
+    lease_file.write_text(LEASES.splitlines()[0], encoding="utf-8")
+    index.refresh("eth0", lease_file)
+    event = await asyncio.wait_for(events.__anext__(), 1)
+    assert event.event == DHCPLeaseEventType.Added and event.lease.hostname == "topside"
+
+    lease_file.write_text("", encoding="utf-8")
+    index.refresh("eth0", lease_file)
+    event = await asyncio.wait_for(events.__anext__(), 1)
+    assert event.event == DHCPLeaseEventType.Released
+    await events.aclose()
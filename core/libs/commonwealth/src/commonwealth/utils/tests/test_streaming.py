@@ -0,0 +1,133 @@
+import asyncio
+import base64
+import json
+import struct
+from typing import AsyncGenerator, List
+
+import pytest
+
+from ..streaming import (
+    BinaryEncoder,
+    Broadcaster,
+    SSEEncoder,
+    streamer,
+    timeout_streamer,
+)
+
+
+async def chunks(count: int, size: int = 8, delay: float = 0.0) -> AsyncGenerator[str, None]:
+    for i in range(count):
+        yield str(i).zfill(size)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def failing_chunks() -> AsyncGenerator[str, None]:
+    yield "first"
+    raise RuntimeError("broken")
+
+
+async def collect(gen: AsyncGenerator[str | bytes, None]) -> List[str | bytes]:
+    return [frame async for frame in gen]
+
+
+def decode_envelope(frame: str) -> dict:  # type: ignore
+    assert frame.endswith("|\n\n|")
+    return json.loads(frame[: -len("|\n\n|")])  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_envelope_streamer() -> None:
+    frames = [decode_envelope(frame) for frame in await collect(streamer(chunks(3)))]  # type: ignore
+    assert [frame["fragment"] for frame in frames] == [0, 1, 2]
+    assert [base64.b64decode(frame["data"]).decode() for frame in frames] == ["00000000", "00000001", "00000002"]
+
+    frames = [decode_envelope(frame) for frame in await collect(streamer(failing_chunks()))]  # type: ignore
+    assert frames[-1]["status"] == 500 and frames[-1]["error"] == "broken"
+
+
+@pytest.mark.asyncio
+async def test_sse_and_binary_encoders() -> None:
+    frames = await collect(streamer(chunks(2), encoder=SSEEncoder()))
+    assert frames == ["id: 0\ndata: 00000000\n\n", "id: 1\ndata: 00000001\n\n"]
+
+    frames = await collect(streamer(failing_chunks(), encoder=BinaryEncoder()))
+    header = BinaryEncoder.HEADER
+    frame_type, size = header.unpack(frames[0][: header.size])  # type: ignore
+    assert (frame_type, frames[0][header.size :]) == (BinaryEncoder.DATA, b"first")
+    assert size == len(b"first")
+    frame_type, _ = struct.unpack(">BI", frames[1][: header.size])  # type: ignore
+    assert frame_type == BinaryEncoder.ERROR
+    assert json.loads(frames[1][header.size :]) == {"status": 500, "error": "broken"}
+
+
+@pytest.mark.asyncio
+async def test_streamer_batching_and_backpressure() -> None:
+    produced = 0
+
+    async def counted() -> AsyncGenerator[str, None]:
+        nonlocal produced
+        async for chunk in chunks(100):
+            produced += 1
+            yield chunk
+
+    stream = streamer(counted(), encoder=BinaryEncoder(), queue_size=4, batch_size=32)
+    first = await stream.__anext__()
+    await asyncio.sleep(0.05)
+    # Producer must be waiting on the bounded queue instead of consuming the whole generator,
+    # only the first batch, the queue and the chunk being put can be produced
+    assert produced <= 4 + 4 + 1
+    # Chunks waiting in the queue are merged up to the batch size
+    payloads = [first] + await collect(stream)
+    data = b"".join(frame[BinaryEncoder.HEADER.size :] for frame in payloads)  # type: ignore
+    assert data == "".join(str(i).zfill(8) for i in range(100)).encode()
+    assert len(payloads) < 100
+
+
+@pytest.mark.asyncio
+async def test_timeout_streamer() -> None:
+    frames = await collect(timeout_streamer(chunks(3, delay=0.5), timeout=0.1))  # type: ignore
+    assert decode_envelope(frames[-1])["status"] == 408  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_streamers_close_generator_on_disconnect() -> None:
+    closed: List[str] = []
+
+    async def endless(name: str) -> AsyncGenerator[str, None]:
+        try:
+            while True:
+                yield name
+        finally:
+            closed.append(name)
+
+    # Producers end up waiting on a full queue when the client goes away
+    for name, stream in [
+        ("streamer", streamer(endless("streamer"), queue_size=1)),
+        ("timeout_streamer", timeout_streamer(endless("timeout_streamer"), queue_size=1)),
+    ]:
+        await stream.__anext__()
+        await asyncio.sleep(0.01)
+        await stream.aclose()  # type: ignore
+        await asyncio.sleep(0.01)
+        assert name in closed
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_drops_oldest_messages() -> None:
+    broadcaster: Broadcaster[int] = Broadcaster(queue_size=3)
+    listener = broadcaster.listen(initial=[0])
+    first = await asyncio.wait_for(anext(listener), 1)
+    assert first == 0
+
+    slow = broadcaster.subscribe()
+    for message in range(1, 6):
+        broadcaster.publish(message)
+    # Slow subscribers keep the newest messages
+    assert [slow.get_nowait() for _ in range(slow.qsize())] == [3, 4, 5]
+    assert [await asyncio.wait_for(anext(listener), 1) for _ in range(3)] == [3, 4, 5]
+    assert broadcaster.dropped == 4
+
+    await listener.aclose()
+    broadcaster.unsubscribe(slow)
+    assert not broadcaster.subscribers
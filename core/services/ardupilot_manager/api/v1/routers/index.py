@@ -3,7 +3,7 @@ import os
 import shutil
 from functools import wraps
 from pathlib import Path
-from typing import Any, Callable, List, Optional, Tuple
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
 
 from commonwealth.mavlink_comm.exceptions import (
     FetchUpdatedMessageFail,
@@ -13,15 +13,19 @@ from commonwealth.mavlink_comm.exceptions import (
 from commonwealth.mavlink_comm.typedefs import FirmwareInfo, MavlinkVehicleType
 from commonwealth.utils.apis import StackedHTTPException
 from commonwealth.utils.decorators import single_threaded
+from commonwealth.utils.streaming import streamer
 from fastapi import APIRouter, Body, File, HTTPException, UploadFile, status
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi_versioning import versioned_api_route
 from loguru import logger
 
 from autopilot_manager import AutoPilotManager
 from exceptions import InvalidFirmwareFile, NoDefaultFirmwareAvailable
+from mavlink_proxy.LinkStats import LinkStats
 from typedefs import (
     Firmware,
+    FirmwareInstallProgress,
+    FirmwareInstallStage,
     FlightController,
     FlightControllerFlags,
     Parameters,
@@ -210,6 +214,51 @@ async def install_firmware_from_file(
         await autopilot.start_ardupilot()
 
 
+@index_router_v1.get(
+    "/install_firmware_progress",
+    response_model=FirmwareInstallProgress,
+    summary="Check the progress of the current or last firmware install.",
+)
+@index_to_http_exception
+def install_firmware_progress() -> Any:
+    return autopilot.get_firmware_install_progress()
+
+
+@index_router_v1.get(
+    "/install_firmware_progress/stream", summary="Stream the progress of the current firmware install until it ends."
+)
+async def stream_install_firmware_progress(interval: float = 0.5) -> StreamingResponse:
+    async def progress_generator() -> AsyncGenerator[str, None]:
+        while True:
+            progress = autopilot.get_firmware_install_progress()
+            yield progress.json()
+            if progress.stage in [FirmwareInstallStage.Idle, FirmwareInstallStage.Done, FirmwareInstallStage.Failed]:
+                return
+            await asyncio.sleep(max(interval, 0.1))
+
+    return StreamingResponse(streamer(progress_generator()), media_type="text/plain")
+
+
+@index_router_v1.get(
+    "/link_stats",
+    response_model=LinkStats,
+    summary="Get statistics of the routed MAVLink traffic, per system and component.",
+)
+@index_to_http_exception
+async def get_link_stats() -> Any:
+    return autopilot.get_link_stats()
+
+
+@index_router_v1.get("/link_stats/stream", summary="Stream statistics of the routed MAVLink traffic.")
+async def stream_link_stats(interval: float = 1.0) -> StreamingResponse:
+    async def stats_generator() -> AsyncGenerator[str, None]:
+        while True:
+            yield autopilot.get_link_stats().json()
+            await asyncio.sleep(max(interval, 0.1))
+
+    return StreamingResponse(streamer(stats_generator()), media_type="text/plain")
+
+
 @index_router_v1.get(
     "/board", response_model=Optional[FlightController], summary="Check what is the current running board."
 )
@@ -261,6 +310,22 @@ def available_routers() -> Any:
     return autopilot.get_available_routers()
 
 
+@index_router_v1.get("/router_output", response_model=List[str], summary="Retrieve last lines of router output.")
+@index_to_http_exception
+def router_output(lines: int = 100) -> Any:
+    return autopilot.mavlink_manager.router_output(lines)
+
+
+@index_router_v1.get(
+    "/launch_timings",
+    response_model=Dict[str, Dict[str, float]],
+    summary="Retrieve how long each phase of the last autopilot stop and start took, in seconds.",
+)
+@index_to_http_exception
+def launch_timings() -> Any:
+    return autopilot.get_launch_timings()
+
+
 @index_router_v1.post("/stop", summary="Stop the autopilot.")
 @index_to_http_exception
 async def stop() -> Any:
@@ -1,10 +1,12 @@
 import asyncio
+import json
 import os
 import pathlib
 import subprocess
 import time
+from contextlib import contextmanager
 from copy import deepcopy
-from typing import Any, List, Optional, Set
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 import psutil
 from commonwealth.mavlink_comm.VehicleManager import VehicleManager
@@ -22,12 +24,15 @@ from flight_controller_detector.Detector import Detector as BoardDetector
 from flight_controller_detector.linux.linux_boards import LinuxFlightController
 from mavlink_proxy.Endpoint import Endpoint, EndpointType
 from mavlink_proxy.exceptions import EndpointAlreadyExists
+from mavlink_proxy.LinkStats import LinkStats, LinkStatsCollector
 from mavlink_proxy.Manager import Manager as MavlinkManager
 from settings import Settings
 from typedefs import (
     Firmware,
+    FirmwareInstallProgress,
     FlightController,
     FlightControllerFlags,
+    LaunchPlan,
     Parameters,
     Platform,
     PlatformType,
@@ -45,6 +50,16 @@ class AutoPilotManager(metaclass=Singleton):
         self._current_board: Optional[FlightController] = None
         self.should_be_running = False
         self.mavlink_manager = MavlinkManager()
+        self._mavlink_manager_configured = False
+        self.link_stats_collector = LinkStatsCollector("127.0.0.1", 14002)
+        self._launch_plan: Optional[LaunchPlan] = None
+        self._validated_firmware: Optional[str] = None
+        # Created once, so the progress of the last install survives the restart that follows it
+        self.firmware_manager = FirmwareManager(
+            self.settings.firmware_folder, self.settings.defaults_folder, self.settings.user_firmware_folder
+        )
+        self.start_timings: Dict[str, float] = {}
+        self.stop_timings: Dict[str, float] = {}
 
         # Load settings and do the initial configuration
         if self.settings.load():
@@ -110,6 +125,15 @@ class AutoPilotManager(metaclass=Singleton):
                 protected=True,
                 overwrite_settings=True,
             ),
+            Endpoint(
+                name="Link Statistics Tap",
+                owner=self.settings.app_name,
+                connection_type=EndpointType.UDPClient,
+                place=self.link_stats_collector.address,
+                argument=self.link_stats_collector.port,
+                persistent=False,
+                protected=True,
+            ),
             Endpoint(
                 name="Ping360 Heading",
                 owner=self.settings.app_name,
@@ -129,8 +153,21 @@ class AutoPilotManager(metaclass=Singleton):
         if self.mavlink_manager is not None:
             await self.mavlink_manager.stop()
 
-        self.mavlink_manager = MavlinkManager()
         preferred_router = self.load_preferred_router()
+        if self._mavlink_manager_configured and preferred_router == self.mavlink_manager.tool.name():
+            # Restarts keep the router, with its endpoints and cached command line
+            logger.debug(f"Reusing MavlinkManager[{preferred_router}].")
+        else:
+            await self._setup_mavlink_manager(preferred_router)
+        self.ardupilot_subprocess: Optional[Any] = None
+        self.vehicle_manager = VehicleManager()
+
+        self.should_be_running = False
+        self.remove_old_logs()
+        self.current_sitl_frame = self.load_sitl_frame()
+
+    async def _setup_mavlink_manager(self, preferred_router: Optional[str]) -> None:
+        self.mavlink_manager = MavlinkManager()
         try:
             self.mavlink_manager = MavlinkManager(preferred_router)
         except ValueError as error:
@@ -145,15 +182,7 @@ class AutoPilotManager(metaclass=Singleton):
         self.mavlink_manager.set_logdir(self.settings.log_path)
 
         self._load_endpoints()
-        self.ardupilot_subprocess: Optional[Any] = None
-        self.firmware_manager = FirmwareManager(
-            self.settings.firmware_folder, self.settings.defaults_folder, self.settings.user_firmware_folder
-        )
-        self.vehicle_manager = VehicleManager()
-
-        self.should_be_running = False
-        self.remove_old_logs()
-        self.current_sitl_frame = self.load_sitl_frame()
+        self._mavlink_manager_configured = True
 
     def remove_old_logs(self) -> None:
         def need_to_remove_file(file: pathlib.Path) -> bool:
@@ -173,6 +202,16 @@ class AutoPilotManager(metaclass=Singleton):
         except Exception as error:
             logger.warning(f"Failed to remove logs: {error}")
 
+    @staticmethod
+    @contextmanager
+    def timed_phase(timings: Dict[str, float], phase: str) -> Iterator[None]:
+        """Record how long the given start/stop phase takes."""
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            timings[phase] = time.monotonic() - start_time
+
     def is_running(self) -> bool:
         if self.current_board is None:
             return False
@@ -206,6 +245,12 @@ class AutoPilotManager(metaclass=Singleton):
     async def start_mavlink_manager_watchdog(self) -> None:
         await self.mavlink_manager.auto_restart_router()
 
+    async def start_link_stats_collector(self) -> None:
+        await self.link_stats_collector.run()
+
+    def get_link_stats(self) -> LinkStats:
+        return self.link_stats_collector.stats()
+
     @property
     def current_board(self) -> Optional[FlightController]:
         return self._current_board
@@ -288,9 +333,6 @@ class AutoPilotManager(metaclass=Singleton):
                     f"No firmware installed for '{board.platform}' and no default firmware available. Please install the firmware manually."
                 )
 
-        firmware_path = self.firmware_manager.firmware_path(self._current_board.platform)
-        self.firmware_manager.validate_firmware(firmware_path, self._current_board.platform)
-
         # ArduPilot process will connect as a client on the UDP server created by the mavlink router
         master_endpoint = Endpoint(
             name="Master",
@@ -301,10 +343,66 @@ class AutoPilotManager(metaclass=Singleton):
             protected=True,
         )
 
+        with self.timed_phase(self.start_timings, "launch_plan"):
+            launch_plan = await self.get_linux_launch_plan(board, master_endpoint)
+
+        logger.info(f"Using command line: '{launch_plan.command_line}'")
+        with self.timed_phase(self.start_timings, "autopilot_process"):
+            # pylint: disable=consider-using-with
+            self.ardupilot_subprocess = subprocess.Popen(
+                launch_plan.command_line,
+                shell=True,
+                encoding="utf-8",
+                errors="ignore",
+                cwd=self.settings.firmware_folder,
+            )
+
+        await self.start_mavlink_manager(master_endpoint)
+
+    @staticmethod
+    def _file_signature(path: pathlib.Path) -> Optional[Tuple[int, int]]:
+        try:
+            file_stat = path.stat()
+            return file_stat.st_mtime_ns, file_stat.st_size
+        except FileNotFoundError:
+            return None
+
+    async def validate_firmware_cached(self, firmware_path: pathlib.Path, platform: Platform) -> None:
+        """Validate firmware file, skipping the validation if the same file was already validated."""
+        key = json.dumps([str(firmware_path), platform, self._file_signature(firmware_path)])
+        if self._validated_firmware == key:
+            return
+        await self.firmware_manager.validate_firmware_async(firmware_path, platform)
+        self._validated_firmware = key
+
+    def _linux_launch_plan_key(self, board: LinuxFlightController, master_endpoint: Endpoint) -> str:
+        """Key that changes whenever anything used to build the Linux launch plan changes."""
+        return json.dumps(
+            [
+                board.platform,
+                str(master_endpoint),
+                self._file_signature(self.firmware_manager.firmware_path(board.platform)),
+                self._file_signature(self.firmware_manager.default_user_params_path(board.platform)),
+                self.configuration.get("serials"),
+                str(self.settings.firmware_folder),
+            ],
+            default=str,
+        )
+
+    async def get_linux_launch_plan(self, board: LinuxFlightController, master_endpoint: Endpoint) -> LaunchPlan:
+        """Validate the firmware and assemble the command line for a Linux board.
+
+        The plan is reused on restarts until the firmware, the default parameters or the settings change."""
+        key = self._linux_launch_plan_key(board, master_endpoint)
+        if self._launch_plan is not None and self._launch_plan.key == key:
+            return self._launch_plan
+
+        firmware_path = self.firmware_manager.firmware_path(board.platform)
+        await self.validate_firmware_cached(firmware_path, board.platform)
+
         # Run ardupilot inside while loop to avoid exiting after reboot command
         ## Can be changed back to a simple command after https://github.com/ArduPilot/ardupilot/issues/17572
         ## gets fixed.
-        # pylint: disable=consider-using-with
         #
         # The mapping of serial ports works as in the following table:
         #
@@ -325,20 +423,12 @@ class AutoPilotManager(metaclass=Singleton):
             f" {self.get_default_params_cmdline(board.platform)}"
         )
 
-        if self.firmware_has_debug_symbols(firmware_path):
+        if await asyncio.to_thread(self.firmware_has_debug_symbols, firmware_path):
             logger.info("Debug symbols found, launching with gdb server...")
             command_line = f"gdbserver 0.0.0.0:5555 {command_line}"
 
-        logger.info(f"Using command line: '{command_line}'")
-        self.ardupilot_subprocess = subprocess.Popen(
-            command_line,
-            shell=True,
-            encoding="utf-8",
-            errors="ignore",
-            cwd=self.settings.firmware_folder,
-        )
-
-        await self.start_mavlink_manager(master_endpoint)
+        self._launch_plan = LaunchPlan(key=key, firmware_path=firmware_path, command_line=command_line)
+        return self._launch_plan
 
     async def start_serial(self, board: FlightController) -> None:
         if not board.path:
@@ -401,7 +491,8 @@ class AutoPilotManager(metaclass=Singleton):
         self.current_sitl_frame = frame
 
         firmware_path = self.firmware_manager.firmware_path(self._current_board.platform)
-        self.firmware_manager.validate_firmware(firmware_path, self._current_board.platform)
+        with self.timed_phase(self.start_timings, "launch_plan"):
+            await self.validate_firmware_cached(firmware_path, self._current_board.platform)
 
         # ArduPilot SITL binary will bind TCP port 5760 (server) and the mavlink router will connect to it as a client
         master_endpoint = Endpoint(
@@ -412,22 +503,23 @@ class AutoPilotManager(metaclass=Singleton):
             argument=5760,
             protected=True,
         )
-        # pylint: disable=consider-using-with
-        self.ardupilot_subprocess = subprocess.Popen(
-            [
-                firmware_path,
-                "--model",
-                self.current_sitl_frame.value,
-                "--base-port",
-                str(master_endpoint.argument),
-                "--home",
-                "-27.563,-48.459,0.0,270.0",
-            ],
-            shell=False,
-            encoding="utf-8",
-            errors="ignore",
-            cwd=self.settings.firmware_folder,
-        )
+        with self.timed_phase(self.start_timings, "autopilot_process"):
+            # pylint: disable=consider-using-with
+            self.ardupilot_subprocess = subprocess.Popen(
+                [
+                    firmware_path,
+                    "--model",
+                    self.current_sitl_frame.value,
+                    "--base-port",
+                    str(master_endpoint.argument),
+                    "--home",
+                    "-27.563,-48.459,0.0,270.0",
+                ],
+                shell=False,
+                encoding="utf-8",
+                errors="ignore",
+                cwd=self.settings.firmware_folder,
+            )
 
         await self.start_mavlink_manager(master_endpoint)
 
@@ -439,7 +531,8 @@ class AutoPilotManager(metaclass=Singleton):
                 pass
             except Exception as error:
                 logger.warning(str(error))
-        await self.mavlink_manager.start(device)
+        with self.timed_phase(self.start_timings, "mavlink_router"):
+            await self.mavlink_manager.start(device)
 
     @staticmethod
     async def available_boards(include_bootloaders: bool = False) -> List[FlightController]:
@@ -540,10 +633,12 @@ class AutoPilotManager(metaclass=Singleton):
 
     async def kill_ardupilot(self) -> None:
         self.should_be_running = False
+        self.stop_timings = {}
         if not self.current_board or self.current_board.platform != Platform.SITL:
             try:
                 logger.info("Disarming vehicle.")
-                await self.vehicle_manager.disarm_vehicle()
+                with self.timed_phase(self.stop_timings, "disarm"):
+                    await self.vehicle_manager.disarm_vehicle()
                 logger.info("Vehicle disarmed.")
             except Exception as error:
                 logger.warning(f"Could not disarm vehicle: {error}. Proceeding with kill.")
@@ -551,24 +646,31 @@ class AutoPilotManager(metaclass=Singleton):
         # TODO: Add shutdown command on HAL_SITL and HAL_LINUX, changing terminate/prune
         # logic with a simple "self.vehicle_manager.shutdown_vehicle()"
         logger.info("Terminating Ardupilot subprocess.")
-        await self.terminate_ardupilot_subprocess()
+        with self.timed_phase(self.stop_timings, "autopilot_process"):
+            await self.terminate_ardupilot_subprocess()
         logger.info("Ardupilot subprocess terminated.")
         logger.info("Pruning Ardupilot's system processes.")
-        await self.prune_ardupilot_processes()
+        with self.timed_phase(self.stop_timings, "prune_processes"):
+            await self.prune_ardupilot_processes()
         logger.info("Ardupilot's system processes pruned.")
 
         logger.info("Stopping Mavlink manager.")
-        await self.mavlink_manager.stop()
+        with self.timed_phase(self.stop_timings, "mavlink_router"):
+            await self.mavlink_manager.stop()
         logger.info("Mavlink manager stopped.")
+        logger.debug(f"Stop timings: {self.stop_timings}")
 
     async def start_ardupilot(self) -> None:
         # This only applies to autopilot process itself, mavlink manager will check by itself
         if self.should_be_running and self.is_running():
             return
 
-        await self.setup()
+        self.start_timings = {}
+        with self.timed_phase(self.start_timings, "setup"):
+            await self.setup()
         try:
-            available_boards = await self.available_boards()
+            with self.timed_phase(self.start_timings, "board_detection"):
+                available_boards = await self.available_boards()
             if not available_boards:
                 raise RuntimeError("No boards available.")
             if len(available_boards) > 1:
@@ -588,6 +690,7 @@ class AutoPilotManager(metaclass=Singleton):
                 raise RuntimeError(f"Invalid board type: {flight_controller}")
         finally:
             self.should_be_running = True
+            logger.debug(f"Start timings: {self.start_timings}")
 
     async def restart_ardupilot(self) -> None:
         if self.current_board is None or self.current_board.type in [PlatformType.SITL, PlatformType.Linux]:
@@ -660,5 +763,11 @@ class AutoPilotManager(metaclass=Singleton):
     ) -> None:
         await self.firmware_manager.install_firmware_from_url(url, board, make_default, default_parameters)
 
+    def get_launch_timings(self) -> Dict[str, Dict[str, float]]:
+        return {"stop": self.stop_timings, "start": self.start_timings}
+
+    def get_firmware_install_progress(self) -> FirmwareInstallProgress:
+        return self.firmware_manager.install_progress()
+
     async def restore_default_firmware(self, board: FlightController) -> None:
         await self.firmware_manager.restore_default_firmware(board)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import pathlib
@@ -13,7 +14,25 @@ from loguru import logger
 from exceptions import FirmwareInstallFail, InvalidFirmwareFile, UnsupportedPlatform
 from firmware.FirmwareDownload import FirmwareDownloader
 from firmware.FirmwareUpload import FirmwareUploader
-from typedefs import FirmwareFormat, FlightController, Platform, PlatformType
+from typedefs import (
+    FirmwareFormat,
+    FirmwareInstallProgress,
+    FirmwareInstallStage,
+    FlightController,
+    Platform,
+    PlatformType,
+)
+
+# Size of each chunk copied in kernel space while installing a firmware file
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_file_range_chunk(source_fd: int, destination_fd: int) -> int:
+    return os.copy_file_range(source_fd, destination_fd, COPY_CHUNK_SIZE)
+
+
+def sendfile_chunk(source_fd: int, destination_fd: int) -> int:
+    return os.sendfile(destination_fd, source_fd, None, COPY_CHUNK_SIZE)
 
 
 def get_board_id(platform: Platform) -> int:
@@ -59,7 +78,7 @@ class FirmwareInstaller:
     """
 
     def __init__(self) -> None:
-        pass
+        self.progress = FirmwareInstallProgress()
 
     @staticmethod
     def _validate_apj(firmware_path: pathlib.Path, platform: Platform) -> None:
@@ -127,6 +146,32 @@ class FirmwareInstaller:
 
         raise UnsupportedPlatform("Firmware validation is not implemented for this platform.")
 
+    @staticmethod
+    async def validate_firmware_async(firmware_path: pathlib.Path, platform: Platform) -> None:
+        """Check if given firmware is valid for given platform, without blocking the event loop."""
+        # A thread instead of a worker process: forking this multi-threaded process could copy a held lock into the
+        # child, and spawned workers would import the service main module again
+        await asyncio.to_thread(FirmwareInstaller.validate_firmware, firmware_path, platform)
+
+    def _copy_firmware(self, source: pathlib.Path, destination: pathlib.Path) -> None:
+        """Copy firmware file in kernel space, updating the install progress."""
+        kernel_copy_methods = [copy_file_range_chunk, sendfile_chunk]
+        self.progress.total_bytes = source.stat().st_size
+        self.progress.copied_bytes = 0
+        with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+            for copy_chunk in kernel_copy_methods:
+                try:
+                    # Both methods use and update the files offsets, so a fallback continues from where it stopped
+                    while copied := copy_chunk(source_file.fileno(), destination_file.fileno()):
+                        self.progress.copied_bytes += copied
+                    break
+                except OSError as error:
+                    logger.debug(f"Kernel copy not available between {source} and {destination}: {error}")
+            else:
+                shutil.copyfileobj(source_file, destination_file, COPY_CHUNK_SIZE)
+                self.progress.copied_bytes = self.progress.total_bytes
+        shutil.copymode(source, destination)
+
     @staticmethod
     def add_run_permission(firmware_path: pathlib.Path) -> None:
         """Add running permission for firmware file."""
@@ -145,6 +190,21 @@ class FirmwareInstaller:
         firmware_dest_path: Optional[pathlib.Path] = None,
     ) -> None:
         """Install given firmware."""
+        self.progress = FirmwareInstallProgress(stage=FirmwareInstallStage.Validating)
+        try:
+            await self._install_firmware(new_firmware_path, board, firmware_dest_path)
+            self.progress.stage = FirmwareInstallStage.Done
+        except Exception as error:
+            self.progress.stage = FirmwareInstallStage.Failed
+            self.progress.error = str(error)
+            raise
+
+    async def _install_firmware(
+        self,
+        new_firmware_path: pathlib.Path,
+        board: FlightController,
+        firmware_dest_path: Optional[pathlib.Path] = None,
+    ) -> None:
         if not new_firmware_path.is_file():
             raise InvalidFirmwareFile("Given path is not a valid file.")
 
@@ -152,9 +212,10 @@ class FirmwareInstaller:
         if firmware_format == FirmwareFormat.ELF:
             self.add_run_permission(new_firmware_path)
 
-        self.validate_firmware(new_firmware_path, board.platform)
+        await self.validate_firmware_async(new_firmware_path, board.platform)
 
         if board.type == PlatformType.Serial:
+            self.progress.stage = FirmwareInstallStage.Uploading
             firmware_uploader = FirmwareUploader()
             if not board.path:
                 raise ValueError("Board path not available.")
@@ -162,10 +223,11 @@ class FirmwareInstaller:
             await firmware_uploader.upload(new_firmware_path)
             return
         if firmware_format == FirmwareFormat.ELF:
-            # Using copy() instead of move() since the last can't handle cross-device properly (e.g. docker binds)
+            # Copying instead of moving since the last can't handle cross-device properly (e.g. docker binds)
             if not firmware_dest_path:
                 raise FirmwareInstallFail("Firmware file destination not provided.")
-            shutil.copy(new_firmware_path, firmware_dest_path)
+            self.progress.stage = FirmwareInstallStage.Copying
+            await asyncio.to_thread(self._copy_firmware, new_firmware_path, firmware_dest_path)
             return
 
         raise UnsupportedPlatform("Firmware install is not implemented for this platform.")
@@ -18,6 +18,7 @@ from firmware.FirmwareInstall import FirmwareInstaller
 from typedefs import (
     Firmware,
     FirmwareFormat,
+    FirmwareInstallProgress,
     FlightController,
     Parameters,
     Platform,
@@ -173,3 +174,10 @@ class FirmwareManager:
     @staticmethod
     def validate_firmware(firmware_path: pathlib.Path, platform: Platform) -> None:
         FirmwareInstaller.validate_firmware(firmware_path, platform)
+
+    @staticmethod
+    async def validate_firmware_async(firmware_path: pathlib.Path, platform: Platform) -> None:
+        await FirmwareInstaller.validate_firmware_async(firmware_path, platform)
+
+    def install_progress(self) -> FirmwareInstallProgress:
+        return self.firmware_installer.progress
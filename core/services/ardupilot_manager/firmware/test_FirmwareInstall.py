@@ -1,13 +1,15 @@
 import asyncio
+import os
 import pathlib
 import platform
 
 import pytest
 
-from exceptions import InvalidFirmwareFile
+from exceptions import FirmwareInstallFail, InvalidFirmwareFile
 from firmware.FirmwareDownload import FirmwareDownloader
 from firmware.FirmwareInstall import FirmwareInstaller
-from typedefs import FlightController, Platform, Vehicle
+from firmware.FirmwareManagement import FirmwareManager
+from typedefs import FirmwareInstallStage, FlightController, Platform, Vehicle
 
 
 def test_firmware_validation() -> None:
@@ -41,3 +43,29 @@ def test_firmware_validation() -> None:
             await installer.install_firmware(temporary_file, board, pathlib.Path(f"{temporary_file}_dest"))
 
     asyncio.run(firmware_validation_wrapper())
+
+
+def test_firmware_copy(tmp_path: pathlib.Path) -> None:
+    source = tmp_path / "firmware"
+    source.write_bytes(os.urandom(3 * 1024 * 1024 + 123))
+    source.chmod(0o755)
+    destination = tmp_path / "firmware_dest"
+
+    installer = FirmwareInstaller()
+    installer._copy_firmware(source, destination)
+
+    assert destination.read_bytes() == source.read_bytes(), "Copied firmware does not match."
+    assert destination.stat().st_mode == source.stat().st_mode, "Copied firmware permissions do not match."
+    assert installer.progress.copied_bytes == installer.progress.total_bytes == source.stat().st_size
+
+
+def test_firmware_install_progress_after_failure(tmp_path: pathlib.Path) -> None:
+    manager = FirmwareManager(tmp_path / "firmware", tmp_path / "defaults", tmp_path / "user_defaults")
+    board = FlightController(name="SITL", manufacturer="ArduPilot Team", platform=Platform.SITL)
+
+    with pytest.raises(FirmwareInstallFail):
+        asyncio.run(manager.install_firmware_from_file(tmp_path / "missing_firmware", board))
+
+    progress = manager.install_progress()
+    assert progress.stage == FirmwareInstallStage.Failed, "Failed install is not reported in the progress."
+    assert progress.error == "Given path is not a valid file.", "Install error is not reported in the progress."
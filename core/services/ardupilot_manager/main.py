@@ -43,5 +43,6 @@ if __name__ == "__main__":
         logger.exception(start_error)
     loop.create_task(autopilot.auto_restart_ardupilot())
     loop.create_task(autopilot.start_mavlink_manager_watchdog())
+    loop.create_task(autopilot.start_link_stats_collector())
     loop.run_until_complete(server.serve())
     loop.run_until_complete(autopilot.kill_ardupilot())
@@ -3,12 +3,16 @@ import asyncio
 import pathlib
 import shlex
 import shutil
+import socket
 import tempfile
-from typing import Any, List, Optional, Set, Type
+import time
+from collections import deque
+from typing import Any, Deque, List, Optional, Set, Tuple, Type
 
+import psutil
 from loguru import logger
 
-from mavlink_proxy.Endpoint import Endpoint
+from mavlink_proxy.Endpoint import Endpoint, EndpointType
 from mavlink_proxy.exceptions import (
     DuplicateEndpointName,
     EndpointAlreadyExists,
@@ -19,10 +23,31 @@ from mavlink_proxy.exceptions import (
 
 
 class AbstractRouter(metaclass=abc.ABCMeta):
+    # The subprocess, its output log and the cached command line are all state of the running router
+    # pylint: disable=too-many-instance-attributes
+    # Maximum time to wait for the router to bind its endpoints before accepting it as running
+    START_TIMEOUT = 3.0
+    # Maximum time to wait for the router to exit after each termination signal
+    EXIT_TIMEOUT = 3.0
+    # Interval between readiness probes while starting
+    READINESS_PROBE_INTERVAL = 0.05
+    # Time the router needs to stay alive to be considered ready when it has no ports to bind
+    START_GRACE_PERIOD = 0.5
+    # Number of router output lines kept in memory for diagnostics
+    OUTPUT_BUFFER_SIZE = 1000
+    # Maximum number of router output lines forwarded to the logger per second
+    OUTPUT_LOG_RATE = 20
+
     def __init__(self) -> None:
         self._endpoints: Set[Endpoint] = set()
         self._master_endpoint: Optional[Endpoint] = None
         self._subprocess: Optional[asyncio.subprocess.Process] = None
+        self._started_at = 0.0
+        self._output: Deque[str] = deque(maxlen=self.OUTPUT_BUFFER_SIZE)
+        self._output_log_window_start = 0.0
+        self._output_logged_lines = 0
+        self._output_suppressed_lines = 0
+        self._command: Optional[Tuple[Endpoint, str]] = None
 
         # Since this methods can fail we need to have the other variables defined
         # to avoid any problem in __del__
@@ -94,16 +119,26 @@ class AbstractRouter(metaclass=abc.ABCMeta):
     def master_endpoint(self) -> Optional[Endpoint]:
         return self._master_endpoint
 
+    def command(self, master_endpoint: Endpoint) -> str:
+        """Command used to start the router, assembled again only when the endpoints or the master change."""
+        if self._command is None or self._command[0] != master_endpoint:
+            self._command = (master_endpoint, self.assemble_command(master_endpoint))
+        return self._command[1]
+
+    def _invalidate_command(self) -> None:
+        self._command = None
+
     async def start(self, master_endpoint: Endpoint) -> None:
         self._master_endpoint = master_endpoint
-        command = self.assemble_command(self._master_endpoint)
+        command = self.command(self._master_endpoint)
         logger.debug(f"Calling router using following command: '{command}'.")
 
         self._subprocess = await asyncio.create_subprocess_exec(
             *shlex.split(command), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
         )
+        self._started_at = time.monotonic()
 
-        await asyncio.sleep(3)  # Non-blocking sleep
+        await self.wait_until_ready(self.START_TIMEOUT)
         if not await self.is_running():
             _stdout, _strerr = await self._subprocess.communicate()
             stdout = _stdout.decode("utf-8") if _stdout else "No stdout."
@@ -119,43 +154,127 @@ class AbstractRouter(metaclass=abc.ABCMeta):
                 logger.warning("Terminating process")
                 self._subprocess.terminate()
                 logger.warning("Termination done")
-                await asyncio.sleep(3)  # Non-blocking sleep
-                logger.warning("Checking if it's still running..")
-                if await self.is_running():
+                if not await self.wait_for_exit(self.EXIT_TIMEOUT):
                     logger.warning("Still running, going to kill it")
                     self._subprocess.kill()
                     logger.warning("Killing done")
-                    await asyncio.sleep(3)
                 await self._subprocess.wait()  # Wait for the subprocess to terminate
         else:
             logger.debug(f"Tried to stop {self.name()}, but it was already not running.")
 
+    async def wait_for_exit(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the router process to exit, returning as soon as it does.
+
+        Returns True if the process is not running anymore, False if the timeout was reached first."""
+        if self._subprocess is None or self._subprocess.returncode is not None:
+            return True
+        try:
+            await asyncio.wait_for(self._subprocess.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def readiness_ports(self) -> Set[int]:
+        """Ports that the router process is expected to bind once it's ready to route messages."""
+        server_types = [EndpointType.UDPServer, EndpointType.TCPServer]
+        endpoints = [*Endpoint.filter_enabled(self.endpoints())]
+        if self._master_endpoint is not None:
+            endpoints.append(self._master_endpoint)
+        return {
+            endpoint.argument
+            for endpoint in endpoints
+            if endpoint.connection_type in server_types and endpoint.argument is not None
+        }
+
+    def bound_ports(self) -> Set[int]:
+        """Local ports currently bound by the router process and its children."""
+        if self._subprocess is None:
+            return set()
+        try:
+            process = psutil.Process(self._subprocess.pid)
+            processes = [process, *process.children(recursive=True)]
+            ports = set()
+            for candidate in processes:
+                for connection in candidate.connections(kind="inet"):
+                    is_udp = connection.type == socket.SOCK_DGRAM
+                    if connection.laddr and (is_udp or connection.status == psutil.CONN_LISTEN):
+                        ports.add(connection.laddr.port)
+            return ports
+        except psutil.Error as error:
+            logger.debug(f"Could not probe {self.name()} sockets: {error}")
+            return set()
+
+    async def is_ready(self) -> bool:
+        """Check if the router process is alive and bound to all of its server endpoints."""
+        if not await self.is_running():
+            return False
+        ports = self.readiness_ports()
+        if not ports:
+            return time.monotonic() - self._started_at >= self.START_GRACE_PERIOD
+        return ports.issubset(self.bound_ports())
+
+    async def wait_until_ready(self, timeout: float) -> bool:
+        """Wait until the router is ready, exits or the timeout is reached.
+
+        Returns True if the router reported to be ready before the timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not await self.is_running():
+                return False
+            if await self.is_ready():
+                return True
+            await self.wait_for_exit(self.READINESS_PROBE_INTERVAL)
+        logger.warning(
+            f"{self.name()} did not bind ports {self.readiness_ports() - self.bound_ports()} after {timeout} seconds."
+        )
+        return False
+
     async def start_house_keepers(self) -> None:
         if self._subprocess is None:
             return
         # Ensure that the logging tasks are awaited and executed
-        asyncio.create_task(self._log_stdout())
-        asyncio.create_task(self._log_stderr())
-
-    async def _log_stdout(self) -> None:
-        while self._subprocess is not None:
-            if self._subprocess.stdout:
-                stdout_line = await self._subprocess.stdout.readline()
-                if stdout_line:
-                    logger.debug(f"Router: {stdout_line.decode().strip()}")
-                else:
-                    break  # EOF reached
-            await asyncio.sleep(0.01)
-
-    async def _log_stderr(self) -> None:
-        while self._subprocess is not None:
-            if self._subprocess.stderr:
-                stderr_line = await self._subprocess.stderr.readline()
-                if stderr_line:
-                    logger.debug(f"Router: {stderr_line.decode().strip()}")
-                else:
-                    break  # EOF reached
-            await asyncio.sleep(0.01)
+        asyncio.create_task(self._capture_output(self._subprocess.stdout))
+        asyncio.create_task(self._capture_output(self._subprocess.stderr))
+
+    async def _capture_output(self, stream: Optional[asyncio.StreamReader]) -> None:
+        # The pipes are drained as fast as the router writes on them, otherwise the router would block when the pipe
+        # buffer gets full. Lines are kept on a bounded buffer and only a limited amount of them reach the logger.
+        if stream is None:
+            return
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # Line is longer than the stream limit, the buffer was already discarded by the reader
+                self._store_output_line("<line too long, discarded>")
+                continue
+            if not line:
+                break  # EOF reached
+            self._store_output_line(line.decode(errors="replace").strip())
+
+    def _store_output_line(self, line: str) -> None:
+        self._output.append(line)
+
+        now = time.monotonic()
+        if now - self._output_log_window_start >= 1.0:
+            if self._output_suppressed_lines:
+                logger.debug(f"Router: {self._output_suppressed_lines} lines suppressed from the log.")
+            self._output_log_window_start = now
+            self._output_logged_lines = 0
+            self._output_suppressed_lines = 0
+
+        if self._output_logged_lines >= self.OUTPUT_LOG_RATE:
+            self._output_suppressed_lines += 1
+            return
+        self._output_logged_lines += 1
+        logger.debug(f"Router: {line}")
+
+    def output(self, lines: Optional[int] = None) -> List[str]:
+        """Return the last lines written by the router process on stdout and stderr."""
+        output = list(self._output)
+        if lines is None:
+            return output
+        return output[max(len(output) - lines, 0) :] if lines > 0 else []
 
     async def restart(self) -> None:
         if self._master_endpoint is None:
@@ -182,6 +301,7 @@ class AbstractRouter(metaclass=abc.ABCMeta):
         if not directory.exists():
             raise ValueError(f"Logging directory {directory} does not exist.")
         self._logdir = directory
+        self._invalidate_command()
 
     def add_endpoint(self, endpoint: Endpoint) -> None:
         self._validate_endpoint(endpoint)
@@ -196,12 +316,14 @@ class AbstractRouter(metaclass=abc.ABCMeta):
                 raise DuplicateEndpointName(f"Name '{endpoint.name}' already being used by an existing endpoint.")
 
         self._endpoints.add(endpoint)
+        self._invalidate_command()
 
     def remove_endpoint(self, endpoint: Endpoint) -> None:
         if endpoint not in self._endpoints:
             raise EndpointDontExist(f"Endpoint '{endpoint.name}' not found.")
 
         self._endpoints.remove(endpoint)
+        self._invalidate_command()
 
     def endpoints(self) -> Set[Endpoint]:
         return self._endpoints
@@ -209,6 +331,7 @@ class AbstractRouter(metaclass=abc.ABCMeta):
     def clear_endpoints(self) -> None:
         """Remove all output endpoints."""
         self._endpoints = set()
+        self._invalidate_command()
 
     def __str__(self) -> str:
         return f"""
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+
+MAVLINK_V1_STX = 0xFE
+MAVLINK_V2_STX = 0xFD
+MAVLINK_V1_OVERHEAD = 8
+MAVLINK_V2_OVERHEAD = 12
+MAVLINK_V2_SIGNATURE_SIZE = 13
+MAVLINK_V2_SIGNED_FLAG = 0x01
+
+
+class MavlinkFrame(NamedTuple):
+    system_id: int
+    component_id: int
+    sequence: int
+    message_id: int
+    size: int
+
+
+class ComponentLinkStats(BaseModel):
+    system_id: int
+    component_id: int
+    messages: int
+    bytes: int
+    lost_messages: int
+    messages_per_second: float
+    bytes_per_second: float
+    last_seen: float
+
+
+class LinkStats(BaseModel):
+    messages: int
+    bytes: int
+    lost_messages: int
+    messages_per_second: float
+    bytes_per_second: float
+    invalid_bytes: int
+    components: List[ComponentLinkStats]
+
+
+def parse_frames(data: bytes) -> Iterator[Tuple[Optional[MavlinkFrame], int]]:
+    """Split a buffer into MAVLink v1/v2 frames, yielding each frame and its size.
+
+    Checksums are not validated, since that would require the CRC_EXTRA of every message definition.
+    Bytes that do not belong to a frame are yielded as None frames so they can be accounted for."""
+    index = 0
+    while index < len(data):
+        stx = data[index]
+        if stx == MAVLINK_V1_STX and index + 6 <= len(data):
+            payload_size = data[index + 1]
+            size = payload_size + MAVLINK_V1_OVERHEAD
+            sequence, system_id, component_id, message_id = data[index + 2 : index + 6]
+        elif stx == MAVLINK_V2_STX and index + 10 <= len(data):
+            payload_size, incompat_flags = data[index + 1], data[index + 2]
+            size = payload_size + MAVLINK_V2_OVERHEAD
+            if incompat_flags & MAVLINK_V2_SIGNED_FLAG:
+                size += MAVLINK_V2_SIGNATURE_SIZE
+            sequence, system_id, component_id = data[index + 4 : index + 7]
+            message_id = int.from_bytes(data[index + 7 : index + 10], "little")
+        else:
+            # Skip until the next possible start of frame
+            next_index = index + 1
+            while next_index < len(data) and data[next_index] not in (MAVLINK_V1_STX, MAVLINK_V2_STX):
+                next_index += 1
+            yield None, next_index - index
+            index = next_index
+            continue
+
+        if index + size > len(data):
+            yield None, len(data) - index
+            return
+        yield MavlinkFrame(system_id, component_id, sequence, message_id, size), size
+        index += size
+
+
+# pylint: disable=too-many-instance-attributes
+class RateCounter:
+    """Counts messages and bytes, updating rates over windows of RATE_WINDOW seconds."""
+
+    RATE_WINDOW = 1.0
+
+    def __init__(self) -> None:
+        self.messages = 0
+        self.bytes = 0
+        self.lost_messages = 0
+        self.last_seen = 0.0
+        self._window_start = time.monotonic()
+        # Counted since the window start
+        self._window_messages = 0
+        self._window_bytes = 0
+        # Rates of the last complete window
+        self._messages_per_second = 0.0
+        self._bytes_per_second = 0.0
+
+    def add(self, size: int, lost_messages: int = 0) -> None:
+        self._update_window()
+        self.messages += 1
+        self.bytes += size
+        self.lost_messages += lost_messages
+        self.last_seen = time.time()
+        self._window_messages += 1
+        self._window_bytes += size
+
+    def _update_window(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < self.RATE_WINDOW:
+            return
+        # Rates go to zero if nothing was received during the whole last window
+        if elapsed > 2 * self.RATE_WINDOW:
+            self._window_messages = self._window_bytes = 0
+        self._messages_per_second = self._window_messages / elapsed
+        self._bytes_per_second = self._window_bytes / elapsed
+        self._window_start = now
+        self._window_messages = self._window_bytes = 0
+
+    def rates(self) -> Tuple[float, float]:
+        self._update_window()
+        return self._messages_per_second, self._bytes_per_second
+
+
+class ComponentCounter(RateCounter):
+    def __init__(self) -> None:
+        super().__init__()
+        self._last_sequence: Optional[int] = None
+
+    def add_frame(self, frame: MavlinkFrame) -> int:
+        lost_messages = 0
+        if self._last_sequence is not None:
+            delta = (frame.sequence - self._last_sequence) % 256
+            # A repeated sequence is a duplicated frame, not a full wrap of lost ones
+            lost_messages = delta - 1 if delta else 0
+        self._last_sequence = frame.sequence
+        self.add(frame.size, lost_messages)
+        return lost_messages
+
+
+class LinkStatsCollector(asyncio.DatagramProtocol):
+    """Passive MAVLink tap that accounts the traffic sent by the router to a local UDP client endpoint."""
+
+    def __init__(self, address: str, port: int) -> None:
+        self.address = address
+        self.port = port
+        self._total = RateCounter()
+        self._components: Dict[Tuple[int, int], ComponentCounter] = {}
+        self._invalid_bytes = 0
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        for frame, size in parse_frames(data):
+            if frame is None:
+                self._invalid_bytes += size
+                continue
+            key = (frame.system_id, frame.component_id)
+            if key not in self._components:
+                self._components[key] = ComponentCounter()
+            lost_messages = self._components[key].add_frame(frame)
+            self._total.add(frame.size, lost_messages)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning(f"Link statistics tap error: {exc}")
+
+    def stats(self) -> LinkStats:
+        components = []
+        for (system_id, component_id), counter in sorted(self._components.items()):
+            messages_per_second, bytes_per_second = counter.rates()
+            components.append(
+                ComponentLinkStats(
+                    system_id=system_id,
+                    component_id=component_id,
+                    messages=counter.messages,
+                    bytes=counter.bytes,
+                    lost_messages=counter.lost_messages,
+                    messages_per_second=messages_per_second,
+                    bytes_per_second=bytes_per_second,
+                    last_seen=counter.last_seen,
+                )
+            )
+        messages_per_second, bytes_per_second = self._total.rates()
+        return LinkStats(
+            messages=self._total.messages,
+            bytes=self._total.bytes,
+            lost_messages=self._total.lost_messages,
+            messages_per_second=messages_per_second,
+            bytes_per_second=bytes_per_second,
+            invalid_bytes=self._invalid_bytes,
+            components=components,
+        )
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        transport, _protocol = await loop.create_datagram_endpoint(lambda: self, local_addr=(self.address, self.port))
+        logger.info(f"Link statistics tap listening on {self.address}:{self.port}.")
+        try:
+            await asyncio.Future()
+        finally:
+            transport.close()
@@ -1,5 +1,6 @@
 import asyncio
 import pathlib
+import time
 from typing import List, Optional, Set, Type
 
 from loguru import logger
@@ -22,6 +23,9 @@ from mavlink_proxy.exceptions import (
 
 
 class Manager:
+    # Safety net interval for the router watchdog, process deaths are detected immediately
+    WATCHDOG_INTERVAL = 5.0
+
     def __init__(self, preferred_tool: Optional[str] = None) -> None:
         available_interfaces = Manager.available_interfaces()
         if not available_interfaces:
@@ -160,7 +164,7 @@ class Manager:
     def command_line(self) -> str:
         if self.master_endpoint is None:
             raise NoMasterMavlinkEndpoint("Mavlink master endpoint was not set. Cannot build command line.")
-        return self.tool.assemble_command(self.master_endpoint)
+        return self.tool.command(self.master_endpoint)
 
     async def is_running(self) -> bool:
         return await self.tool.is_running()
@@ -171,21 +175,31 @@ class Manager:
     def set_logdir(self, log_dir: pathlib.Path) -> None:
         self.tool.set_logdir(log_dir)
 
+    def router_output(self, lines: Optional[int] = None) -> List[str]:
+        return self.tool.output(lines)
+
     async def auto_restart_router(self) -> None:
         """Auto-restart Mavlink router process if it dies."""
         while True:
-            await asyncio.sleep(5.0)
+            # Wake up as soon as the router process exits, with a periodic check as a safety net
+            # for the cases where there is no process to wait for (e.g: a failed start).
+            await self.tool.wait_for_exit(self.WATCHDOG_INTERVAL)
 
             needs_restart = self.should_be_running and not await self.is_running()
 
             if not needs_restart:
+                if not await self.is_running():
+                    await asyncio.sleep(self.WATCHDOG_INTERVAL)
                 continue
 
             logger.debug("Mavlink router stopped. Trying to restart it.")
+            start_time = time.monotonic()
             try:
                 await self.restart()
-                logger.debug("Mavlink router successfully restarted.")
+                logger.debug(f"Mavlink router successfully restarted in {time.monotonic() - start_time:.2f} seconds.")
             except Exception as error:
                 logger.error(f"Failed to restart Mavlink router. {error}")
+                # Avoid hammering the system with restarts of a router that fails to start
+                await asyncio.sleep(self.WATCHDOG_INTERVAL)
 
             self.should_be_running = True
@@ -5,8 +5,9 @@ import pathlib
 import pty
 import re
 import sys
+import time
 import warnings
-from typing import List, Set
+from typing import List, Optional, Set
 
 import pytest
 
@@ -15,6 +16,7 @@ sys.path.append(str(pathlib.Path(__file__).absolute().parent.parent))
 
 from mavlink_proxy.AbstractRouter import AbstractRouter
 from mavlink_proxy.Endpoint import Endpoint, EndpointType
+from mavlink_proxy.LinkStats import LinkStatsCollector, parse_frames
 from mavlink_proxy.MAVLinkRouter import MAVLinkRouter
 from mavlink_proxy.MAVLinkServer import MAVLinkServer
 from mavlink_proxy.MAVP2P import MAVP2P
@@ -384,3 +386,131 @@ async def run_common_routing_tests(
     # Test endpoint combinationsin two orders: regular and reversed
     await test_endpoint_combinations(allowed_master_endpoints, sorted_endpoints)
     await test_endpoint_combinations(allowed_master_endpoints, sorted_endpoints[::-1])
+
+
+class FakeRouter(AbstractRouter):
+    """Python process that binds the master UDP port, used to test the router lifecycle without real binaries."""
+
+    def _get_version(self) -> Optional[str]:
+        return "0.0.0"
+
+    def assemble_command(self, master_endpoint: Endpoint) -> str:
+        script = (
+            "import socket, time;"
+            "sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM);"
+            f"time.sleep(0.2); sock.bind(('{master_endpoint.place}', {master_endpoint.argument}));"
+            "time.sleep(60)"
+        )
+        return f'{self.binary()} -c "{script}"'
+
+    @staticmethod
+    def name() -> str:
+        return "FakeRouter"
+
+    @staticmethod
+    def binary_name() -> str:
+        return pathlib.Path(sys.executable).name
+
+    @staticmethod
+    def _validate_endpoint(endpoint: Endpoint) -> None:
+        pass
+
+    @staticmethod
+    def is_ok() -> bool:
+        # Should never be picked as an available router
+        return False
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.asyncio
+async def test_router_readiness() -> None:
+    router = FakeRouter()
+    master_endpoint = Endpoint(
+        name="Master endpoint",
+        owner="pytest",
+        connection_type=EndpointType.UDPServer,
+        place="127.0.0.1",
+        argument=14990,
+    )
+    assert router.readiness_ports() == set(), "Router without master should not wait for any port."
+
+    start_time = time.monotonic()
+    await router.start(master_endpoint)
+    assert time.monotonic() - start_time < router.START_TIMEOUT, "Router start is not returning on readiness."
+    assert await router.is_ready(), "Router is not ready after start."
+    assert 14990 in router.bound_ports(), "Router did not bind master port."
+
+    start_time = time.monotonic()
+    await router.exit()
+    assert time.monotonic() - start_time < router.EXIT_TIMEOUT, "Router exit is not returning on process exit."
+    assert not await router.is_running(), "Router is still running after exit."
+    assert await router.wait_for_exit(0), "Router exit is not being detected."
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.asyncio
+async def test_router_output_capture() -> None:
+    router = FakeRouter()
+    total_lines = router.OUTPUT_BUFFER_SIZE * 5
+
+    stream = asyncio.StreamReader()
+    stream.feed_data(b"".join(f"line {i}\n".encode() for i in range(total_lines)))
+    stream.feed_data(b"x" * (2**17) + b"\n")
+    stream.feed_eof()
+    await router._capture_output(stream)
+
+    output = router.output()
+    assert len(output) == router.OUTPUT_BUFFER_SIZE, "Router output buffer is not bounded."
+    assert output[-2] == f"line {total_lines - 1}", "Router output buffer is not keeping the last lines."
+    assert router.output(10) == output[-10:], "Router output is not returning the last lines."
+    assert not router.output(0), "Router output is returning lines when none were asked."
+
+
+def test_link_stats_collector() -> None:
+    def v1_frame(sequence: int, system_id: int, component_id: int, payload: bytes) -> bytes:
+        return bytes([0xFE, len(payload), sequence, system_id, component_id, 0]) + payload + b"\x00\x00"
+
+    def v2_frame(sequence: int, system_id: int, component_id: int, payload: bytes, signed: bool = False) -> bytes:
+        header = bytes([0xFD, len(payload), int(signed), 0, sequence, system_id, component_id, 0x2C, 0x01, 0x00])
+        return header + payload + b"\x00\x00" + (b"\x00" * 13 if signed else b"")
+
+    frames = [v1_frame(0, 1, 1, b"\x01" * 9), v2_frame(1, 1, 1, b"\x02" * 20, signed=True), v2_frame(5, 1, 1, b"")]
+    parsed = [frame for frame, _size in parse_frames(b"".join(frames)) if frame is not None]
+    assert [frame.size for frame in parsed] == [len(frame) for frame in frames], "Frame sizes do not match."
+    assert parsed[1].message_id == 300, "MAVLink v2 message id does not match."
+
+    collector = LinkStatsCollector("127.0.0.1", 14002)
+    collector.datagram_received(b"".join(frames), ("127.0.0.1", 14002))
+    collector.datagram_received(b"garbage" + v1_frame(0, 255, 190, b""), ("127.0.0.1", 14002))
+
+    stats = collector.stats()
+    assert stats.messages == 4, "Total message count does not match."
+    assert stats.lost_messages == 3, "Lost messages do not match sequence gaps."
+    assert stats.invalid_bytes == len(b"garbage"), "Invalid bytes are not being accounted."
+    assert [(c.system_id, c.component_id) for c in stats.components] == [(1, 1), (255, 190)], "Components differ."
+    assert stats.components[0].bytes == sum(len(frame) for frame in frames), "Component bytes do not match."
+
+    # Duplicated frames are counted as messages, but not as lost ones
+    collector.datagram_received(v2_frame(5, 1, 1, b"") * 2, ("127.0.0.1", 14002))
+    stats = collector.stats()
+    assert stats.messages == 6, "Duplicated messages are not being counted."
+    assert stats.lost_messages == 3, "Duplicated messages are being counted as lost."
+
+
+def test_router_command_cache() -> None:
+    router = FakeRouter()
+    master_endpoint = Endpoint(
+        name="Master endpoint",
+        owner="pytest",
+        connection_type=EndpointType.UDPServer,
+        place="127.0.0.1",
+        argument=14990,
+    )
+    command = router.command(master_endpoint)
+    router.assemble_command = lambda _master_endpoint: "changed"  # type: ignore
+    assert router.command(master_endpoint) == command, "Command is being assembled again without changes."
+
+    router.add_endpoint(
+        Endpoint(name="Output", owner="pytest", connection_type=EndpointType.UDPClient, place="127.0.0.1", argument=1)
+    )
+    assert router.command(master_endpoint) == "changed", "Command cache is not invalidated by endpoint changes."
@@ -168,6 +168,32 @@ class FirmwareFormat(str, Enum):
     ELF = "ELF"
 
 
+class FirmwareInstallStage(str, Enum):
+    """Stages of the firmware install pipeline."""
+
+    Idle = "idle"
+    Validating = "validating"
+    Uploading = "uploading"
+    Copying = "copying"
+    Done = "done"
+    Failed = "failed"
+
+
+class FirmwareInstallProgress(BaseModel):
+    stage: FirmwareInstallStage = FirmwareInstallStage.Idle
+    copied_bytes: int = 0
+    total_bytes: int = 0
+    error: Optional[str] = None
+
+
+class LaunchPlan(BaseModel):
+    """Validated firmware and command line used to launch the autopilot process on Linux boards."""
+
+    key: str
+    firmware_path: Path
+    command_line: str
+
+
 class Serial(BaseModel):
     """Simplified representation of linux serial port configurations,
     gets transformed into command line arguments such as
@@ -0,0 +1,93 @@
+import pathlib
+import re
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+from typedefs import InterfaceClassification, InterfaceType
+
+SYSFS_NET_PATH = pathlib.Path("/sys/class/net")
+ARPHRD_ETHER = 1
+# Interfaces created by docker
+CONTAINER_INTERFACES = re.compile(r"docker|veth|br-")
+# Interfaces that are never configured: loopback, hamachi VPN and the ones created by docker
+IGNORED_INTERFACES = re.compile(r"lo|ham|docker|veth")
+
+
+def is_ignored_name(interface_name: str) -> bool:
+    return IGNORED_INTERFACES.match(interface_name) is not None
+
+
+def read_interface_type(path: pathlib.Path) -> InterfaceType:
+    """Classify an interface from its sysfs directory
+
+    Args:
+        path (pathlib.Path): Interface directory, e.g: /sys/class/net/eth0
+
+    Returns:
+        InterfaceType: Type of the interface
+    """
+    if (path / "wireless").exists() or (path / "phy80211").exists():
+        return InterfaceType.Wifi
+    if CONTAINER_INTERFACES.match(path.name):
+        return InterfaceType.Container
+    if not (path / "device").exists():
+        return InterfaceType.Virtual
+    # Gadget network devices are children of the UDC gadget, e.g: .../fe980000.usb/gadget.0/net/usb0
+    if any(part.startswith("gadget") for part in path.resolve().parts):
+        return InterfaceType.UsbGadget
+    if int((path / "type").read_text(encoding="utf-8")) == ARPHRD_ETHER:
+        return InterfaceType.Ethernet
+    return InterfaceType.Other
+
+
+class InterfaceClassifier:
+    """
+    Type of each interface, read once from sysfs and kept until the link is removed or recreated.
+    """
+
+    def __init__(self, sysfs_path: pathlib.Path = SYSFS_NET_PATH) -> None:
+        self._sysfs_path = sysfs_path
+        # ifindex -> classification, a recreated link gets a new index
+        self._cache: Dict[int, InterfaceClassification] = {}
+
+    def _read_index(self, interface_name: str) -> Optional[int]:
+        try:
+            return int((self._sysfs_path / interface_name / "ifindex").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def classify(self, interface_name: str, index: Optional[int] = None) -> Optional[InterfaceClassification]:
+        """Get the classification of an interface
+
+        Args:
+            interface_name (str): Interface name
+            index (int, optional): Interface index, read from sysfs if not provided
+
+        Returns:
+            Optional[InterfaceClassification]: The classification, None if the interface does not exist
+        """
+        index = index if index is not None else self._read_index(interface_name)
+        if index is None:
+            return None
+        classification = self._cache.get(index)
+        # Interfaces keep their index when renamed
+        if classification is not None and classification.name == interface_name:
+            return classification
+
+        try:
+            interface_type = read_interface_type(self._sysfs_path / interface_name)
+        except (OSError, ValueError) as error:
+            logger.warning(f"Failed to classify interface '{interface_name}'. {error}")
+            return None
+        classification = InterfaceClassification(
+            name=interface_name, index=index, type=interface_type, ignored=is_ignored_name(interface_name)
+        )
+        logger.debug(f"Interface '{interface_name}' ({index}) classified as {interface_type.value}.")
+        self._cache[index] = classification
+        return classification
+
+    def prune(self, indexes: Iterable[int]) -> None:
+        """Forget the interfaces that are not in indexes"""
+        for index in set(self._cache) - set(indexes):
+            del self._cache[index]
@@ -1,12 +1,17 @@
 import ipaddress
-from typing import List
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
 
 from commonwealth.utils.commands import run_command
-from commonwealth.utils.decorators import temporary_cache
 from loguru import logger
 from pydantic import BaseModel
 
 RESOLVCONF_FILE_PATH: str = "/etc/resolv.conf"
+# The host resolv.conf is mounted in the container, it is used to detect changes without going through the host.
+# It is a hard link, so changes made by replacing the host file are not seen through it.
+RESOLVCONF_HOST_MOUNT_PATH: str = "/etc/resolv.conf.host"
 
 
 class DnsData(BaseModel):
@@ -15,23 +20,54 @@ class DnsData(BaseModel):
 
 
 class Dns:
-    @staticmethod
-    @temporary_cache(timeout_seconds=1)
-    def retrieve_host_nameservers() -> DnsData:
-        """Retrieve the host's DNS configuration from `/etc/resolv.conf`"""
-        logger.debug(f"Retrieving DNS configuration from host {RESOLVCONF_FILE_PATH}...")
-
-        resolvconf_content = Dns._retrieve_host_file_content(RESOLVCONF_FILE_PATH)
-        is_locked = Dns._check_lock_host_file(RESOLVCONF_FILE_PATH)
-        nameservers = Dns._deserialize_resolvconf_content(resolvconf_content)
+    # Maximum age of the cached configuration, since not every change can be detected through the mounted file
+    FALLBACK_CACHE_TIMEOUT = 30.0
 
-        # Ignore invalid nameservers
-        nameservers = [nameserver for nameserver in nameservers if Dns._validate_nameserver(nameserver)]
+    def __init__(self, mount_path: str = RESOLVCONF_HOST_MOUNT_PATH) -> None:
+        self._mount_path = mount_path
+        self._cache: Optional[DnsData] = None
+        self._cache_signature: Optional[Tuple[int, int, int]] = None
+        self._cache_time = 0.0
+        self._lock = threading.Lock()
 
-        return DnsData(nameservers=nameservers, lock=is_locked)
+    def _mount_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self._mount_path)
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
 
-    @staticmethod
-    def update_host_nameservers(dns_data: DnsData) -> None:
+    def _is_cache_valid(self, signature: Optional[Tuple[int, int, int]]) -> bool:
+        if self._cache is None or time.monotonic() - self._cache_time >= self.FALLBACK_CACHE_TIMEOUT:
+            return False
+        return signature is None or signature == self._cache_signature
+
+    def _store(self, data: DnsData, signature: Optional[Tuple[int, int, int]]) -> None:
+        self._cache = data
+        self._cache_signature = signature
+        self._cache_time = time.monotonic()
+
+    def retrieve_host_nameservers(self) -> DnsData:
+        """Retrieve the host's DNS configuration from `/etc/resolv.conf`
+        The configuration is read from the host when the mounted file changes, and at least every
+        FALLBACK_CACHE_TIMEOUT seconds."""
+        with self._lock:
+            signature = self._mount_signature()
+            if self._is_cache_valid(signature):
+                assert self._cache is not None
+                return self._cache.copy()
+
+            logger.debug(f"Retrieving DNS configuration from host {RESOLVCONF_FILE_PATH}...")
+            resolvconf_content, is_locked = Dns._retrieve_host_file(RESOLVCONF_FILE_PATH)
+            nameservers = Dns._deserialize_resolvconf_content(resolvconf_content)
+
+            # Ignore invalid nameservers
+            nameservers = [nameserver for nameserver in nameservers if Dns._validate_nameserver(nameserver)]
+
+            self._store(DnsData(nameservers=nameservers, lock=is_locked), signature)
+            return DnsData(nameservers=nameservers, lock=is_locked)
+
+    def update_host_nameservers(self, dns_data: DnsData) -> None:
         """Update the host's DNS configuration from `/etc/resolv.conf`"""
         nameservers = dns_data.nameservers
         lock = dns_data.lock
@@ -44,46 +80,35 @@ class Dns:
         logger.debug(f"Updating DNS configuration from host {RESOLVCONF_FILE_PATH} w/ nameservers: {nameservers}")
 
         resolvconf_content = Dns._serialize_resolvconf_content(nameservers)
-        Dns._unlock_host_file(RESOLVCONF_FILE_PATH)
-        Dns._update_host_file_content(RESOLVCONF_FILE_PATH, resolvconf_content)
-        if lock:
-            Dns._lock_host_file(RESOLVCONF_FILE_PATH)
+        with self._lock:
+            try:
+                Dns._update_host_file(RESOLVCONF_FILE_PATH, resolvconf_content, lock)
+            except Exception:
+                self._cache = None
+                raise
+            self._store(DnsData(nameservers=nameservers, lock=lock), self._mount_signature())
 
         logger.debug("Successfully updated the DNS configuration")
 
     @staticmethod
-    def _retrieve_host_file_content(filename: str) -> str:
-        output = run_command(f"cat '{filename}'")
+    def _retrieve_host_file(filename: str) -> Tuple[str, bool]:
+        """Read the content and the lock of a file on the host using a single command"""
+        output = run_command(f"lsattr '{filename}' && cat '{filename}'")
         if output.returncode != 0:
             raise RuntimeError(f"Failed to read {filename} from the host: {output.stderr}")
 
-        return str(output.stdout)
-
-    @staticmethod
-    def _check_lock_host_file(filename: str) -> bool:
-        output = run_command(f"lsattr {filename}")
-        if output.returncode != 0:
-            raise RuntimeError(f"Failed to read the lock of file {filename} on the host: {output.stderr}")
-
-        file_attributes = list(output.stdout.split()[0])
+        attributes, _, content = str(output.stdout).partition("\n")
+        file_attributes = list(attributes.split()[0]) if attributes.split() else []
         is_locked = "i" in file_attributes
-        return is_locked
-
-    @staticmethod
-    def _lock_host_file(filename: str) -> None:
-        output = run_command(f"sudo chattr +i {filename}")
-        if output.returncode != 0:
-            raise RuntimeError(f"Failed to unlock the file {filename} on the host: {output.stderr}")
+        return content, is_locked
 
     @staticmethod
-    def _unlock_host_file(filename: str) -> None:
-        output = run_command(f"sudo chattr -i {filename}")
-        if output.returncode != 0:
-            raise RuntimeError(f"Failed to unlock the file {filename} on the host: {output.stderr}")
-
-    @staticmethod
-    def _update_host_file_content(filename: str, content: str) -> None:
-        output = run_command(f"echo '{content}' | sudo tee {filename}")
+    def _update_host_file(filename: str, content: str, lock: bool) -> None:
+        """Unlock, write and lock again if requested a file on the host using a single command"""
+        command = f"sudo chattr -i {filename} && echo '{content}' | sudo tee {filename} > /dev/null"
+        if lock:
+            command += f" && sudo chattr +i {filename}"
+        output = run_command(command)
         if output.returncode != 0:
             raise RuntimeError(f"Failed to update {filename} on the host: {output.stderr}")
 
@@ -0,0 +1,240 @@
+import asyncio
+import os
+import socket
+import statistics
+import struct
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from typedefs import LinkQuality, LinkQualityTarget, ProbeProtocol
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_HEADER = struct.Struct("!BBHHH")
+ICMP_PAYLOAD = b"blueos-link-quality"
+DNS_HEADER = struct.Struct("!HHHHHH")
+
+# (interface, protocol, host, port)
+ProbeKey = Tuple[str, ProbeProtocol, str, int]
+
+
+def checksum(data: bytes) -> int:
+    """Internet checksum, RFC 1071"""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return int(~total & 0xFFFF)
+
+
+def build_echo_request(identifier: int, sequence: int) -> bytes:
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    return ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum(header + ICMP_PAYLOAD), identifier, sequence) + ICMP_PAYLOAD
+
+
+def parse_echo_reply(packet: bytes) -> Optional[Tuple[int, int]]:
+    """Parse an ICMP echo reply received on a raw socket, which includes the IP header
+
+    Returns:
+        Identifier and sequence of the reply, None for any other packet
+    """
+    if not packet:
+        return None
+    header_length = (packet[0] & 0x0F) * 4
+    if len(packet) < header_length + ICMP_HEADER.size:
+        return None
+    icmp_type, _, _, identifier, sequence = ICMP_HEADER.unpack_from(packet, header_length)
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return identifier, sequence
+
+
+def build_dns_query(identifier: int) -> bytes:
+    # Recursion desired, single question for the root name servers ('.' NS IN), answered by any resolver
+    return DNS_HEADER.pack(identifier, 0x0100, 1, 0, 0, 0) + b"\x00" + struct.pack("!HH", 2, 1)
+
+
+def _open_socket(interface: str, protocol: ProbeProtocol) -> socket.socket:
+    if protocol == ProbeProtocol.ICMP:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        # Probes must leave through the measured interface, whatever the routing priorities are
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+        sock.setblocking(False)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+
+async def probe(interface: str, target: LinkQualityTarget, timeout: float) -> Optional[float]:
+    """Measure the round trip time to a target through an interface
+
+    Args:
+        interface (str): Interface to send the probe through
+        target (LinkQualityTarget): Host to probe
+        timeout (float): Time to wait for the reply, in seconds
+
+    Returns:
+        Optional[float]: Round trip time in milliseconds, None if there was no reply in time
+
+    Raises:
+        OSError: If the probe can't be sent through the interface
+    """
+    loop = asyncio.get_running_loop()
+    identifier = struct.unpack("!H", os.urandom(2))[0]
+    sock = _open_socket(interface, target.protocol)
+    try:
+        start = time.monotonic()
+        deadline = start + timeout
+        if target.protocol == ProbeProtocol.ICMP:
+            await loop.sock_sendto(sock, build_echo_request(identifier, 1), (target.host, 0))
+        else:
+            sock.connect((target.host, target.port))
+            await loop.sock_sendall(sock, build_dns_query(identifier))
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                if target.protocol == ProbeProtocol.ICMP:
+                    packet, (source, _) = await asyncio.wait_for(loop.sock_recvfrom(sock, 1500), remaining)
+                    # Raw sockets receive every ICMP packet of the interface
+                    if source != target.host or parse_echo_reply(packet) != (identifier, 1):
+                        continue
+                else:
+                    packet = await asyncio.wait_for(loop.sock_recv(sock, 1500), remaining)
+                    if len(packet) < DNS_HEADER.size or DNS_HEADER.unpack_from(packet)[0] != identifier:
+                        continue
+            except asyncio.TimeoutError:
+                return None
+            except ConnectionRefusedError:
+                # The host answered with port unreachable, which still measures the path
+                pass
+            return (time.monotonic() - start) * 1000
+    finally:
+        sock.close()
+
+
+class LinkProber:
+    """
+    Latency, jitter and loss of each interface to a set of targets, probing every interface at once.
+    """
+
+    # Number of probes the statistics are computed from
+    WINDOW_SIZE = 30
+    # Time to wait for a reply before considering the probe lost, in seconds
+    PROBE_TIMEOUT = 1.0
+    # Latency equivalent of a lost probe when ranking interfaces, in milliseconds
+    LOSS_PENALTY = 1000.0
+
+    def __init__(self) -> None:
+        # Round trip times of the last probes, None for lost ones
+        self._history: Dict[ProbeKey, Deque[Optional[float]]] = {}
+        self._updated: Dict[ProbeKey, float] = {}
+
+    async def _probe(self, interface: str, target: LinkQualityTarget) -> Optional[float]:
+        try:
+            return await probe(interface, target, self.PROBE_TIMEOUT)
+        except OSError as error:
+            logger.debug(f"Failed to probe {target.host} through {interface}: {error}")
+            return None
+
+    async def probe(self, interfaces: Iterable[str], targets: List[LinkQualityTarget]) -> None:
+        """Probe every target through every interface concurrently, adding one sample to each of them"""
+        jobs = [(interface, target) for interface in interfaces for target in targets]
+        results = await asyncio.gather(*(self._probe(interface, target) for interface, target in jobs))
+
+        timestamp = time.time()
+        present = set()
+        for (interface, target), rtt in zip(jobs, results):
+            key = (interface, target.protocol, target.host, target.port)
+            present.add(key)
+            self._history.setdefault(key, deque(maxlen=self.WINDOW_SIZE)).append(rtt)
+            self._updated[key] = timestamp
+
+        # Forget removed interfaces and targets
+        for key in set(self._history) - present:
+            del self._history[key]
+            del self._updated[key]
+
+    def clear(self) -> None:
+        self._history.clear()
+        self._updated.clear()
+
+    def quality(self, interface_name: Optional[str] = None) -> List[LinkQuality]:
+        result = []
+        for key, samples in self._history.items():
+            interface, protocol, host, port = key
+            if interface_name is not None and interface != interface_name:
+                continue
+            replies = [rtt for rtt in samples if rtt is not None]
+            result.append(
+                LinkQuality(
+                    interface=interface,
+                    target=LinkQualityTarget(host=host, protocol=protocol, port=port),
+                    latency=statistics.fmean(replies) if replies else None,
+                    jitter=(
+                        statistics.fmean(abs(current - previous) for previous, current in zip(replies, replies[1:]))
+                        if len(replies) > 1
+                        else None
+                    ),
+                    loss=1 - len(replies) / len(samples),
+                    samples=len(samples),
+                    timestamp=self._updated[key],
+                )
+            )
+        return result
+
+    def score(self, interface_name: str) -> Optional[float]:
+        """Expected delay through the interface averaged over the targets, in milliseconds, lower is better
+
+        Returns:
+            Optional[float]: The score, None while there are not enough samples to rank the interface
+        """
+        qualities = [quality for quality in self.quality(interface_name) if quality.samples >= self.WINDOW_SIZE]
+        if not qualities:
+            return None
+        return statistics.fmean(
+            ((quality.latency or 0) + (quality.jitter or 0)) * (1 - quality.loss) + self.LOSS_PENALTY * quality.loss
+            for quality in qualities
+        )
+
+    def ranking(self, interfaces: Iterable[str]) -> List[str]:
+        """Interfaces that can be ranked, from best to worst quality"""
+        scores: Dict[str, float] = {}
+        for interface in interfaces:
+            score = self.score(interface)
+            if score is not None:
+                scores[interface] = score
+        return sorted(scores, key=scores.__getitem__)
+
+    def reordered_priorities(self, priorities: Dict[str, int], interfaces: Iterable[str]) -> Optional[Dict[str, int]]:
+        """Reorder the priorities of the interfaces from the best to the worst measured quality
+
+        Args:
+            priorities (Dict[str, int]): Current priority of each interface
+            interfaces (Iterable[str]): Interfaces to reorder
+
+        Returns:
+            Optional[Dict[str, int]]: New priority of the ranked interfaces, best first, None if nothing changes
+        """
+        ranking = [name for name in self.ranking(interfaces) if name in priorities]
+        if len(ranking) < 2:
+            return None
+
+        # Reuse the metrics already in place, only the order of the interfaces changes
+        metrics = sorted(priorities[name] for name in ranking)
+        for i in range(1, len(metrics)):
+            metrics[i] = max(metrics[i], metrics[i - 1] + 1)
+        reordered = dict(zip(ranking, metrics))
+        if all(priorities[name] == reordered[name] for name in ranking):
+            return None
+        return reordered
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from loguru import logger
+from pyroute2 import IPRoute
+
+from api.traffic import TrafficAccounting
+from typedefs import InterfaceLinkStatistics, LinkStatistics
+
+COUNTERS = [
+    "rx_bytes",
+    "tx_bytes",
+    "rx_packets",
+    "tx_packets",
+    "rx_errors",
+    "tx_errors",
+    "rx_dropped",
+    "tx_dropped",
+]
+
+
+def link_statistics(link: Any, timestamp: float) -> LinkStatistics:
+    """Parse the carrier and counters of a link message
+
+    Args:
+        link: RTM_NEWLINK message
+        timestamp (float): Time of the sample
+
+    Returns:
+        LinkStatistics: Link statistics
+    """
+    stats = link.get_attr("IFLA_STATS64") or link.get_attr("IFLA_STATS") or {}
+    return LinkStatistics(
+        timestamp=timestamp,
+        connected=link.get_attr("IFLA_CARRIER", 0) != 0,
+        number_of_disconnections=link.get_attr("IFLA_CARRIER_DOWN_COUNT", 0),
+        **{counter: stats.get(counter, 0) for counter in COUNTERS},
+    )
+
+
+class LinkTable:
+    """
+    Carrier state, traffic counters and traffic rates of every link, all sampled from a single link dump.
+    """
+
+    # Time between statistics samples, in seconds, traffic rates are sampled every TrafficAccounting.SAMPLE_INTERVAL
+    SAMPLE_INTERVAL = 5.0
+    # Number of samples kept per interface, 10 minutes with the default interval
+    HISTORY_SIZE = 120
+
+    def __init__(self) -> None:
+        self._history: Dict[str, Deque[LinkStatistics]] = {}
+        self.traffic = TrafficAccounting()
+
+    def update(self, links: Iterable[Any], timestamp: Optional[float] = None) -> None:
+        timestamp = timestamp or time.time()
+        present = set()
+        for link in links:
+            name = link.get_attr("IFLA_IFNAME")
+            present.add(name)
+            history = self._history.setdefault(name, deque(maxlen=self.HISTORY_SIZE))
+            history.append(link_statistics(link, timestamp))
+
+        # Forget removed interfaces
+        for name in set(self._history) - present:
+            del self._history[name]
+
+    def latest(self, interface_name: str) -> Optional[LinkStatistics]:
+        history = self._history.get(interface_name)
+        return history[-1] if history else None
+
+    def statistics(self, interface_name: Optional[str] = None) -> List[InterfaceLinkStatistics]:
+        traffic = {interface.name: interface for interface in self.traffic.traffic(interface_name)}
+        return [
+            InterfaceLinkStatistics(name=name, samples=list(history), traffic=traffic.get(name))
+            for name, history in self._history.items()
+            if interface_name is None or name == interface_name
+        ]
+
+    async def run(self, ipr: IPRoute) -> None:
+        """Dump all links every TrafficAccounting.SAMPLE_INTERVAL, keeping a statistics sample every SAMPLE_INTERVAL"""
+        ticks_per_sample = max(round(self.SAMPLE_INTERVAL / self.traffic.SAMPLE_INTERVAL), 1)
+        tick = 0
+        next_sample = time.monotonic()
+        while True:
+            try:
+                links = list(ipr.get_links())
+                timestamp = time.time()
+                self.traffic.update(links, timestamp)
+                if tick % ticks_per_sample == 0:
+                    self.update(links, timestamp)
+            except Exception as error:
+                logger.error(f"Failed to sample link statistics. {error}")
+            tick += 1
+            # Keep a fixed rate whatever the time spent sampling, without catching up on missed samples
+            next_sample = max(next_sample + self.traffic.SAMPLE_INTERVAL, time.monotonic())
+            await asyncio.sleep(max(next_sample - time.monotonic(), 0))
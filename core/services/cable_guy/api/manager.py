@@ -1,38 +1,43 @@
 import asyncio
 import errno
+import math
 import re
 import subprocess
 import time
-from ipaddress import ip_network
+from contextlib import contextmanager
 from socket import AddressFamily
-from typing import Any, Dict, List, Optional, Set, Tuple, cast
+from typing import Dict, Iterator, List, Optional, Set, cast
 
-import psutil
 from commonwealth.settings.manager import PydanticManager
 from commonwealth.utils.decorators import temporary_cache
 from commonwealth.utils.DHCPDiscovery import DHCPDiscoveryError, discover_dhcp_servers
+from commonwealth.utils.DHCPLeases import DHCPLeaseIndex
 from commonwealth.utils.DHCPServerManager import Dnsmasq as DHCPServerManager
 from loguru import logger
-from pyroute2 import IW, NDB, IPRoute
+from pyroute2 import IPRoute
 from pyroute2.netlink.exceptions import NetlinkError
-from pyroute2.netlink.rtnl.ifaddrmsg import ifaddrmsg
 
 from api import dns, settings
+from api.classifier import InterfaceClassifier, is_ignored_name
+from api.linkquality import LinkProber
+from api.linkstats import LinkTable, link_statistics
+from api.netstate import NetworkMonitor, NetworkState, normalize_gateway, parse_route
+from api.planner import plan_configuration
 from config import SERVICE_NAME
 from networksetup import AbstractNetworkHandler, NetworkHandlerDetector
 from typedefs import (
     AddressMode,
     InterfaceAddress,
+    InterfaceClassification,
     InterfaceInfo,
+    InterfaceType,
+    LinkQualitySettings,
     NetworkInterface,
     NetworkInterfaceMetric,
     NetworkInterfaceMetricApi,
     Route,
 )
 
-# TODO: Replace this by `from pydantic import IPvAnyAddress, IPvAnyNetwork` once we update to pydantic v2
-from typedefs_pydantic_network_shin import IPvAnyAddress, IPvAnyNetwork
-
 __all__ = [
     "AddressMode",
     "EthernetManager",
@@ -43,17 +48,31 @@ __all__ = [
 
 
 class EthernetManager:
-    # RTNL interface
-    ndb = NDB(log="on")
-    # WIFI interface
-    iw = IW()
+    # Link carrier and traffic statistics
+    link_table = LinkTable()
+    # Receive and transmit rates history, sampled by the link table
+    traffic = link_table.traffic
+    # Latency, jitter and loss of the interfaces
+    link_prober = LinkProber()
+    # Type of each interface
+    classifier = InterfaceClassifier()
     # IP abstraction interface
     ipr = IPRoute()
     # DNS abstraction
     dns = dns.Dns()
+    # Leases granted by our DHCP servers
+    dhcp_leases = DHCPLeaseIndex()
     # Network handler for dhcpd and network manager
     network_handler: AbstractNetworkHandler
     config_mutex: asyncio.Lock = asyncio.Lock()
+    # Period of the watchdog full check, in case a netlink notification is lost
+    WATCHDOG_FULL_CHECK_INTERVAL = 60.0
+    # Minimum time between two watchdog reconciliations of the same interface, or of the interface priorities
+    WATCHDOG_RECONCILE_BACKOFF = 5.0
+    # Time between checks for changes in the DHCP servers lease files
+    DHCP_LEASES_REFRESH_INTERVAL = 1.0
+    # Minimum time between two automatic priority changes, to avoid flapping between links of similar quality
+    LINK_QUALITY_PRIORITY_INTERVAL = 30.0
 
     result: List[NetworkInterface] = []
 
@@ -65,6 +84,8 @@ class EthernetManager:
 
     def __init__(self) -> None:
         self._dhcp_servers: List[DHCPServerManager] = []
+        # While set, settings changes are only saved at the end of the transaction
+        self._settings_transaction_active = False
         # Make sure that default behavior changes will be persisted initially on the disk
         self._manager.save()
 
@@ -97,9 +118,30 @@ class EthernetManager:
         """Save actual configuration"""
         self._manager.save()
 
+    @contextmanager
+    def _settings_transaction(self) -> Iterator[None]:
+        """Save the settings once at the end of the block, or restore them if the block fails"""
+        if self._settings_transaction_active:
+            yield
+            return
+
+        backup = [interface.copy(deep=True) for interface in self._settings.content]
+        self._settings_transaction_active = True
+        try:
+            yield
+        except Exception:
+            self._settings.content = backup
+            raise
+        finally:
+            self._settings_transaction_active = False
+        self._manager.save()
+
     async def set_configuration(self, interface: NetworkInterface, watchdog_call: bool = False) -> None:
         """Modify hardware based in the configuration
 
+        Only the differences between the desired configuration and the current state are applied, as a single
+        transaction that is reverted if any change fails. Settings are saved once, at the end.
+
         Args:
             interface: NetworkInterface
             watchdog_call: Whether this is a watchdog call
@@ -107,106 +149,96 @@ class EthernetManager:
         async with self.config_mutex:
             if not watchdog_call:
                 await self.network_handler.cleanup_interface_connections(interface.name)
-            interfaces = self.get_interfaces()
-            valid_names = [interface.name for interface in interfaces]
+            state = self.snapshot()
+            valid_names = [interface.name for interface in self.get_interfaces(state=state)]
             if interface.name not in valid_names:
                 raise ValueError(f"Invalid interface name ('{interface.name}'). Valid names are: {valid_names}")
 
             logger.info(f"Setting configuration for interface '{interface.name}'.")
-            if interface.addresses:
-                # bring interface up
-                interface_index = self._get_interface_index(interface.name)
-                self.ipr.link("set", index=interface_index, state="up")
-            logger.info(f"Configuring addresses for interface '{interface.name}': {interface.addresses}.")
-            for address in interface.addresses:
-                if address.mode == AddressMode.Unmanaged:
-                    logger.info(f"Adding static IP '{address.ip}' to interface '{interface.name}'.")
-                    self.add_static_ip(interface.name, address.ip)
-                elif address.mode == AddressMode.Server:
-                    logger.info(f"Adding DHCP server with gateway '{address.ip}' to interface '{interface.name}'.")
-                    self.add_dhcp_server_to_interface(interface.name, address.ip)
-                elif address.mode == AddressMode.BackupServer:
-                    logger.info(
-                        f"Adding backup DHCP server with gateway '{address.ip}' to interface '{interface.name}'."
-                    )
-                    self.add_dhcp_server_to_interface(interface.name, address.ip, backup=True)
-            # Even if it happened to receive more than one dynamic IP, only one trigger is necessary
-            if any(address.mode == AddressMode.Client for address in interface.addresses):
-                logger.info(f"Triggering dynamic IP acquisition for interface '{interface.name}'.")
-                self.trigger_dynamic_ip_acquisition(interface.name)
-
-            # Handle routes configuration
-            self._set_routes_configuration(interface)
-
-    def _set_routes_configuration(self, interface: NetworkInterface) -> None:
-        try:
-            current_routes = self.get_routes(interface.name, ignore_unmanaged=True)
-            desired_routes = interface.routes
-
-            # Remove old routes
-            for current_route in current_routes:
-                if current_route not in desired_routes:
-                    self.remove_route(interface.name, current_route)
+            plan = plan_configuration(self, interface, state)
+            logger.info(f"Applying {len(plan)} changes to interface '{interface.name}'.")
+            with self._settings_transaction():
+                await plan.execute()
+                saved_interface = self.get_saved_interface_by_name(interface.name)
+                if saved_interface is None:
+                    saved_interface = NetworkInterface(name=interface.name, addresses=[], routes=[])
+                saved_interface.routes = list(interface.routes)
+                self._update_interface_settings(interface.name, saved_interface)
+
+    def get_interfaces_classification(self, state: Optional[NetworkState] = None) -> List[InterfaceClassification]:
+        """Get the type of every interface
 
-            # Add new routes
-            for desired_route in desired_routes:
-                if desired_route not in current_routes:
-                    self.add_route(interface.name, desired_route)
+        Args:
+            state (NetworkState, optional): Network state to read from, a new snapshot is taken if not provided
 
-        except Exception as error:
-            logger.error(f"Routes configuration failed: {error}")
+        Returns:
+            List[InterfaceClassification]: Classification of each interface
+        """
+        state = state or self.snapshot()
+        self.classifier.prune(state.links)
+        result = []
+        for name in state.interface_names():
+            classification = self.classifier.classify(name, state.index(name))
+            if classification is not None:
+                result.append(classification)
+        return result
 
-    def _get_wifi_interfaces(self) -> List[str]:
+    def _get_wifi_interfaces(self, state: Optional[NetworkState] = None) -> List[str]:
         """Get wifi interface list
 
+        Args:
+            state (NetworkState, optional): Network state to read from, a new snapshot is taken if not provided
+
         Returns:
             list: List with the name of the wifi interfaces
         """
-        interfaces = self.iw.list_dev()
-        result = []
-        for interface in interfaces:
-            for flag, value in interface["attrs"]:
-                # Extract interface name from IFNAME flag
-                if flag == "NL80211_ATTR_IFNAME":
-                    result += [value]
-        return result
+        return [
+            classification.name
+            for classification in self.get_interfaces_classification(state)
+            if classification.type == InterfaceType.Wifi
+        ]
 
-    def is_valid_interface_name(self, interface_name: str, filter_wifi: bool = False) -> bool:
+    def is_valid_interface_name(
+        self, interface_name: str, filter_wifi: bool = False, state: Optional[NetworkState] = None
+    ) -> bool:
         """Check if an interface name is valid
 
         Args:
             interface_name (str): Network interface name
             filter_wifi (boolean, optional): Enable wifi interface filtering
+            state (NetworkState, optional): Network state to get the interface index from
 
         Returns:
             bool: True if valid, False if not
         """
-        blacklist = ["lo", "ham.*", "docker.*", "veth.*"]
-        if filter_wifi:
-            wifi_interfaces = self._get_wifi_interfaces()
-            blacklist += wifi_interfaces
-
         if not interface_name:
             logger.error("Interface name cannot be blank or null.")
             return False
 
-        for pattern in blacklist:
-            if re.match(pattern, interface_name):
-                return False
+        classification = self.classifier.classify(interface_name, state.index(interface_name) if state else None)
+        # Interfaces that don't exist can only be checked by name
+        if classification is None:
+            return not is_ignored_name(interface_name)
 
-        return True
+        if classification.ignored:
+            return False
+
+        return not (filter_wifi and classification.type == InterfaceType.Wifi)
 
-    def validate_interface_data(self, interface: NetworkInterface, filter_wifi: bool = False) -> bool:
+    def validate_interface_data(
+        self, interface: NetworkInterface, filter_wifi: bool = False, state: Optional[NetworkState] = None
+    ) -> bool:
         """Check if interface configuration is valid
 
         Args:
             interface: NetworkInterface instance
             filter_wifi (boolean, optional): Enable wifi interface filtering
+            state (NetworkState, optional): Network state to get the interface index from
 
         Returns:
             bool: True if valid, False if not
         """
-        return self.is_valid_interface_name(interface.name, filter_wifi)
+        return self.is_valid_interface_name(interface.name, filter_wifi, state)
 
     @staticmethod
     def _is_server_address_present(interface: NetworkInterface) -> bool:
@@ -224,29 +256,25 @@ class EthernetManager:
         """
         return re.match(r"\d+.\d+.\d+.\d+", ip) is not None
 
-    def is_static_ip(self, ip: str) -> bool:
+    def snapshot(self) -> NetworkState:
+        """Dump links, addresses and routes once, to be shared by everything that reads the network state
+
+        Returns:
+            NetworkState: Current network state
+        """
+        return NetworkState.dump(self.ipr)
+
+    def is_static_ip(self, ip: str, state: Optional[NetworkState] = None) -> bool:
         """Check if ip address is static or dynamic
-            For more information: https://code.woboq.org/qt5/include/linux/if_addr.h.html
-                https://www.systutorials.com/docs/linux/man/8-ip-address/
 
         Args:
             ip (str): ip address
+            state (NetworkState, optional): Network state to read from, a new snapshot is taken if not provided
 
         Returns:
             bool: true if static false if not
         """
-        for address in list(self.ipr.get_addr()):
-
-            def get_item(items: List[Tuple[str, Any]], name: str) -> Any:
-                return [value for key, value in items if key == name][0]
-
-            if get_item(address["attrs"], "IFA_ADDRESS") != ip:
-                continue
-
-            flags = get_item(address["attrs"], "IFA_FLAGS")
-            result = "IFA_F_PERMANENT" in ifaddrmsg.flags2names(flags)
-            return result
-        return False
+        return (state or self.snapshot()).is_static_ip(ip)
 
     def _get_interface_index(self, interface_name: str) -> int:
         """Get interface index for internal usage
@@ -282,25 +310,36 @@ class EthernetManager:
         self.ipr.link("set", index=interface_index, state=interface_state)
         logger.info(f"Setting interface {interface_name} to '{interface_state}' state.")
 
-    def trigger_dynamic_ip_acquisition(self, interface_name: str) -> None:
-        """Trigger external DHCP servers to possibly acquire a dynamic IP by restarting the interface.
+    def _request_dynamic_ip(self, interface_name: str) -> bool:
+        """Ask the network handler for a dynamic IP, without touching the shared netlink socket so it can run outside
+        of the event loop thread
 
-        Args:
-            interface_name (str): Interface name
+        Returns:
+            bool: False if the handler can't do it and the interface has to be restarted instead
         """
         try:
             self.network_handler.trigger_dynamic_ip_acquisition(interface_name)
-            return
         except NotImplementedError as error:
             logger.info(f"Handler does not support triggering dynamic IP acquisition. {error}")
             logger.info(f"Restarting interface {interface_name} to trigger dynamic IP acquisition.")
-            self.enable_interface(interface_name, enable=False)
-            time.sleep(1)
-            self.enable_interface(interface_name, enable=True)
+            return False
         except Exception as error:
             logger.error(f"Failed to trigger dynamic IP acquisition for interface {interface_name}. {error}")
-        finally:
-            self.add_static_ip(interface_name, "0.0.0.0", mode=AddressMode.Client)
+        return True
+
+    async def trigger_dynamic_ip_acquisition(self, interface_name: str) -> None:
+        """Trigger external DHCP servers to possibly acquire a dynamic IP, restarting the interface if the handler
+        can't do it. The DHCP negotiation can take a few seconds so it runs in a thread, the interface restart and
+        settings changes are still done from the event loop thread.
+
+        Args:
+            interface_name (str): Interface name
+        """
+        if not await asyncio.to_thread(self._request_dynamic_ip, interface_name):
+            self.enable_interface(interface_name, enable=False)
+            await asyncio.sleep(1)
+            self.enable_interface(interface_name, enable=True)
+        self.add_static_ip(interface_name, "0.0.0.0", mode=AddressMode.Client)
 
     def _update_interface_settings(self, interface_name: str, updated_interface: NetworkInterface) -> None:
         """Helper method to update interface settings in a consistent way.
@@ -312,7 +351,8 @@ class EthernetManager:
         # Filter out the old interface configuration and append the new one
         self._settings.content = [interface for interface in self._settings.content if interface.name != interface_name]
         self._settings.content.append(updated_interface)
-        self._manager.save()
+        if not self._settings_transaction_active:
+            self._manager.save()
 
     def add_static_ip(self, interface_name: str, ip: str, mode: AddressMode = AddressMode.Unmanaged) -> None:
         """Set ip address for a specific interface and saves it to the settings file
@@ -360,8 +400,8 @@ class EthernetManager:
         static_ip = self.is_static_ip(ip_address)
         try:
             if (
-                self._is_dhcp_server_running_on_interface(interface_name)
-                and self._dhcp_server_on_interface(interface_name).ipv4_gateway == ip_address
+                self.is_dhcp_server_running_on_interface(interface_name)
+                and self.dhcp_server_on_interface(interface_name).ipv4_gateway == ip_address
             ):
                 self.remove_dhcp_server_from_interface(interface_name)
             self.network_handler.remove_static_ip(interface_name, ip_address)
@@ -392,85 +432,97 @@ class EthernetManager:
         return next((i for i in self._settings.content if i.name == name), None)
 
     # pylint: disable=too-many-locals
-    def get_interfaces(self, filter_wifi: bool = False) -> List[NetworkInterface]:
+    def get_interfaces(
+        self, filter_wifi: bool = False, state: Optional[NetworkState] = None, names: Optional[Set[str]] = None
+    ) -> List[NetworkInterface]:
         """Get interfaces information
 
         Args:
             filter_wifi (boolean, optional): Enable wifi interface filtering
+            state (NetworkState, optional): Network state to read from, a new snapshot is taken if not provided
+            names (Set[str], optional): Only get the interfaces with these names
 
         Returns:
             List of NetworkInterface instances available
         """
+        state = state or self.snapshot()
+        self.classifier.prune(state.links)
         result = []
-        for interface, addresses in psutil.net_if_addrs().items():
+        for interface in state.interface_names():
+            if names is not None and interface not in names:
+                continue
             # We don't care about virtual ethernet interfaces
             ## Virtual interfaces are created by programs such as docker
             ## and they are an abstraction of real interfaces, the ones that we want to configure.
-            if not self.is_valid_interface_name(interface, filter_wifi):
+            if not self.is_valid_interface_name(interface, filter_wifi, state):
                 continue
 
             valid_addresses = []
-            for address in addresses:
-                # We just care about IPV4 addresses
-                if not address.family == AddressFamily.AF_INET:
-                    continue
-
-                valid_ip = EthernetManager.weak_is_ip_address(address.address)
-                ip = address.address if valid_ip else "undefined"
+            # We just care about IPV4 addresses, the only ones kept by the state
+            for address in state.interface_addresses(interface):
+                valid_ip = EthernetManager.weak_is_ip_address(address)
+                ip = address if valid_ip else "undefined"
 
-                is_static_ip = self.is_static_ip(ip)
+                is_static_ip = state.is_static_ip(ip)
 
                 # Populate our output item
                 if (
-                    self._is_dhcp_server_running_on_interface(interface)
-                    and self._dhcp_server_on_interface(interface).ipv4_gateway == ip
+                    self.is_dhcp_server_running_on_interface(interface)
+                    and self.dhcp_server_on_interface(interface).ipv4_gateway == ip
                 ):
                     mode = AddressMode.Server
-                    if self._dhcp_server_on_interface(interface).is_backup_server:
+                    if self.dhcp_server_on_interface(interface).is_backup_server:
                         mode = AddressMode.BackupServer
                 else:
                     mode = AddressMode.Unmanaged if is_static_ip and valid_ip else AddressMode.Client
                 valid_addresses.append(InterfaceAddress(ip=ip, mode=mode))
-            info = self.get_interface_info(interface)
+            info = self.get_interface_info(interface, state)
             saved_interface = self.get_saved_interface_by_name(interface)
             # Get priority from saved interface or from current interface metrics, defaulting to None if neither exists
             priority = None
             if saved_interface and saved_interface.priority is not None:
                 priority = saved_interface.priority
             else:
-                interface_metric = self.get_interface_priority(interface)
+                interface_metric = self.get_interface_priority(interface, state)
                 if interface_metric:
                     priority = interface_metric.priority
 
-            routes = self.get_routes(interface, ignore_unmanaged=False)
+            routes = self.get_routes(interface, ignore_unmanaged=False, state=state)
 
             interface_data = NetworkInterface(
                 name=interface, addresses=valid_addresses, info=info, priority=priority, routes=list(routes)
             )
             # Check if it's valid and add to the result
-            if self.validate_interface_data(interface_data, filter_wifi):
+            if self.validate_interface_data(interface_data, filter_wifi, state):
                 result += [interface_data]
 
         return result
 
-    def get_ethernet_interfaces(self) -> List[NetworkInterface]:
+    def get_ethernet_interfaces(
+        self, state: Optional[NetworkState] = None, names: Optional[Set[str]] = None
+    ) -> List[NetworkInterface]:
         """Get ethernet interfaces information
 
+        Args:
+            state (NetworkState, optional): Network state to read from, a new snapshot is taken if not provided
+            names (Set[str], optional): Only get the interfaces with these names
+
         Returns:
             List of NetworkInterface instances available
         """
-        return self.get_interfaces(filter_wifi=True)
+        return self.get_interfaces(filter_wifi=True, state=state, names=names)
 
-    def get_interface_ndb(self, interface_name: str) -> Any:
-        """Get interface NDB information for interface
+    def get_link_quality_settings(self) -> LinkQualitySettings:
+        return self._settings.link_quality
 
-        Args:
-            interface_name (str): Interface name
+    def set_link_quality_settings(self, link_quality: LinkQualitySettings) -> None:
+        """Set the link quality probing targets and policy
 
-        Returns:
-            pyroute2.ndb.objects.interface.Interface: pyroute2 interface object
+        Args:
+            link_quality (LinkQualitySettings): New settings
         """
-        return self.ndb.interfaces.dump().filter(ifname=interface_name)[0]
+        self._settings.link_quality = link_quality
+        self.save()
 
     @temporary_cache(timeout_seconds=1)
     def get_interfaces_priority(self) -> List[NetworkInterfaceMetric]:
@@ -487,45 +539,9 @@ class EthernetManager:
         Returns:
             List[NetworkInterfaceMetric]: A list of priority metrics for each active interface.
         """
-
-        interfaces = self.ipr.get_links()
-        # I hope that you are not here to move this code to IPv6.
-        # If that is the case, you'll need to figure out a way to handle
-        # priorities between interfaces, between IP categories.
-        # GLHF
-        routes = self.ipr.get_routes(family=AddressFamily.AF_INET)
-
-        # First find interfaces with default routes
-        interfaces_with_default_routes = set()
-        for route in routes:
-            dst = route.get_attr("RTA_DST")
-            oif = route.get_attr("RTA_OIF")
-            if dst is None and oif is not None:  # Default route
-                interfaces_with_default_routes.add(oif)
-
-        # Generate a dict of index to network name, but only for interfaces that are UP and RUNNING
-        # IFF_UP flag is 0x1, IFF_RUNNING is 0x40 in Linux
-        name_dict = {
-            iface["index"]: iface.get_attr("IFLA_IFNAME")
-            for iface in interfaces
-            if (iface["flags"] & 0x1) and (iface["flags"] & 0x40) and iface["index"] in interfaces_with_default_routes
-        }
-
-        # Get metrics for default routes of active interfaces
-        interface_metrics: Dict[int, int] = {}
-        for route in routes:
-            oif = route.get_attr("RTA_OIF")
-            if oif in name_dict and route.get_attr("RTA_DST") is None:  # Only default routes
-                metric = route.get_attr("RTA_PRIORITY", 0)
-                # Keep the highest metric for each interface
-                if oif not in interface_metrics or metric > interface_metrics[oif]:
-                    interface_metrics[oif] = metric
-
-        # Create the list of interface metrics
-        return [
-            NetworkInterfaceMetric(index=index, name=name, priority=interface_metrics.get(index, 0))
-            for index, name in name_dict.items()
-        ]
+        return NetworkState(
+            links=self.ipr.get_links(), routes=self.ipr.get_routes(family=AddressFamily.AF_INET)
+        ).priorities()
 
     def set_interfaces_priority(self, interfaces: List[NetworkInterfaceMetricApi]) -> None:
         """Sets network interface priority. This is an abstraction function for different
@@ -546,17 +562,20 @@ class EthernetManager:
             saved_interface.priority = interface.priority
             self._update_interface_settings(interface.name, saved_interface)
 
-    def get_interface_priority(self, interface_name: str) -> Optional[NetworkInterfaceMetric]:
+    def get_interface_priority(
+        self, interface_name: str, state: Optional[NetworkState] = None
+    ) -> Optional[NetworkInterfaceMetric]:
         """Get the priority metric for a network interface.
 
         Args:
             interface_name (str): The name of the network interface.
+            state (NetworkState, optional): Network state to read from, cached priorities are used if not provided
 
         Returns:
             Optional[NetworkInterfaceMetric]: The priority metric for the interface, or None if no metric found.
         """
         metric: NetworkInterfaceMetric
-        for metric in self.get_interfaces_priority():
+        for metric in state.priorities() if state else self.get_interfaces_priority():
             if interface_name == metric.name:
                 return metric
 
@@ -582,21 +601,26 @@ class EthernetManager:
         if result.returncode != 0:
             raise RuntimeError(f"Failed to change network priority {name}")
 
-    def get_interface_info(self, interface_name: str) -> InterfaceInfo:
+    def get_interface_info(self, interface_name: str, state: Optional[NetworkState] = None) -> InterfaceInfo:
         """Get interface info field
 
         Args:
             interface_name (str): Interface name
+            state (NetworkState, optional): Network state to read from, a new snapshot is taken if not provided
 
         Returns:
             InterfaceInfo object
         """
-        metric = self.get_interface_priority(interface_name)
+        state = state or self.snapshot()
+        metric = self.get_interface_priority(interface_name, state)
         priority = metric.priority if metric else 0
-        interface = self.get_interface_ndb(interface_name)
+        link = state.link(interface_name)
+        if link is None:
+            raise ValueError(f"No interface with name '{interface_name}' is present.")
+        statistics = link_statistics(link, time.time())
         return InterfaceInfo(
-            connected=interface.carrier != 0,
-            number_of_disconnections=interface.carrier_down_count,
+            connected=statistics.connected,
+            number_of_disconnections=statistics.number_of_disconnections,
             priority=priority,
         )
 
@@ -606,11 +630,11 @@ class EthernetManager:
     def remove_route(self, interface_name: str, route: Route) -> None:
         self._execute_route("del", interface_name, route)
 
-    def _execute_route(self, action: str, interface_name: str, route: Route) -> None:
-        try:
+    def apply_route(self, action: str, interface_name: str, interface_index: Optional[int], route: Route) -> None:
+        if interface_index is None:
             interface_index = self._get_interface_index(interface_name)
-            gateway = self.__class__._normalize_gateway(route.destination_parsed, route.next_hop_parsed)
-
+        gateway = normalize_gateway(route.destination_parsed, route.next_hop_parsed)
+        try:
             self.ipr.route(
                 action,
                 oif=interface_index,
@@ -618,32 +642,38 @@ class EthernetManager:
                 gateway=str(gateway) if gateway else None,
                 metrics={"metric": route.priority} if route.priority else None,
             )
-
-            act = "Removed" if action == "del" else "Added" if action == "add" else action
-            logger.info(f"{act} route to {route.destination_parsed} via {gateway} on {interface_name}")
         except NetlinkError as e:
-            if e.code == errno.EEXIST and action == "add":
-                logger.debug(
-                    f"Route {route.destination_parsed} via {gateway} on {interface_name} already exists, ignoring"
-                )
+            if (e.code == errno.EEXIST and action == "add") or (e.code == errno.ESRCH and action == "del"):
+                logger.debug(f"Route {route.destination_parsed} via {gateway} on {interface_name} is already {action}")
                 return
-
-        except Exception as e:
             act = "Remove" if action == "del" else "Add" if action == "add" else action
             logger.error(f"Failed to {act} route {route.destination_parsed} via {gateway} on {interface_name}: {e}")
             raise
 
+        act = "Removed" if action == "del" else "Added" if action == "add" else action
+        logger.info(f"{act} route to {route.destination_parsed} via {gateway} on {interface_name}")
+
+    def _execute_route(self, action: str, interface_name: str, route: Route) -> None:
+        self.apply_route(action, interface_name, None, route)
+
         # Update settings
-        current_interface = self.get_interface_by_name(interface_name)
-        for current_route in current_interface.routes:
-            if current_route.destination_parsed == route.destination_parsed and current_route.gateway == route.gateway:
-                current_route.managed = route.managed
-        self._update_interface_settings(interface_name, current_interface)
+        saved_interface = self.get_saved_interface_by_name(interface_name)
+        if saved_interface is None:
+            saved_interface = NetworkInterface(name=interface_name, addresses=[], routes=[])
+        saved_interface.routes = [saved_route for saved_route in saved_interface.routes if saved_route != route]
+        if action == "add":
+            saved_interface.routes.append(route)
+        self._update_interface_settings(interface_name, saved_interface)
 
-    def get_routes(self, interface_name: str, ignore_unmanaged: bool = True) -> Set[Route]:
+    def get_routes(
+        self, interface_name: str, ignore_unmanaged: bool = True, state: Optional[NetworkState] = None
+    ) -> Set[Route]:
         try:
-            interface_index = self._get_interface_index(interface_name)
-            raw_routes = self.ipr.get_routes(oif=interface_index)
+            if state is not None:
+                raw_routes = state.interface_routes(interface_name)
+            else:
+                interface_index = self._get_interface_index(interface_name)
+                raw_routes = self.ipr.get_routes(oif=interface_index)
         except Exception as err:
             logger.error(f"Failed to get routes for {interface_name}: {err}")
             return set()
@@ -654,7 +684,7 @@ class EthernetManager:
         routes: Set[Route] = set()
         for raw_route in raw_routes:
             try:
-                route = self._parse_route(raw_route)
+                route = parse_route(raw_route)
 
             except Exception as err:
                 logger.error(f"Failed to parse route record {raw_route}: {err}")
@@ -672,53 +702,8 @@ class EthernetManager:
 
         return routes
 
-    def _parse_route(
-        self,
-        raw_route: Any,
-    ) -> Route:
-        raw_destination: Optional[str] = raw_route.get_attr("RTA_DST")
-        raw_prefixlen: int = raw_route["dst_len"]
-        raw_gateway: Optional[str] = raw_route.get_attr("RTA_GATEWAY")
-        raw_priority: int = raw_route.get_attr("RTA_PRIORITY")
-
-        # Parse destination
-        if raw_destination is None:
-            net = "0.0.0.0/0" if raw_route["family"] == AddressFamily.AF_INET else "::/0"
-        else:
-            net = f"{raw_destination}/{raw_prefixlen}"
-        destination = IPvAnyNetwork(ip_network(net))
-
-        # Parse gateway
-        gateway = (
-            self.__class__._normalize_gateway(destination, IPvAnyAddress(raw_gateway))
-            if raw_gateway is not None
-            else None
-        )
-
-        route = Route(
-            destination=str(destination),
-            gateway=str(gateway) if gateway else None,
-            priority=raw_priority,
-        )
-
-        return route
-
-    @staticmethod
-    def _normalize_gateway(destination: IPvAnyNetwork, gateway: Optional[IPvAnyAddress]) -> Optional[IPvAnyAddress]:
-        if gateway is None:
-            return None
-
-        if destination.version == 4 and gateway.version != 4:
-            raise ValueError(f"Gateway {gateway} must be IPv4 for destination {destination}")
-
-        if destination.version == 6 and gateway.version != 6:
-            raise ValueError(f"Gateway {gateway} must be IPv6 for destination {destination}")
-
-        return gateway
-
     def _is_ip_on_interface(self, interface_name: str, ip_address: str) -> bool:
-        interface = self.get_interface_by_name(interface_name)
-        return any(True for address in interface.addresses if address.ip == ip_address)
+        return ip_address in self.snapshot().interface_addresses(interface_name)
 
     def _is_ip_saved_on_interface(self, interface_name: str, ip_address: str) -> bool:
         interface = self.get_saved_interface_by_name(interface_name)
@@ -726,15 +711,15 @@ class EthernetManager:
             return False
         return any(True for address in interface.addresses if address.ip == ip_address)
 
-    def _dhcp_server_on_interface(self, interface_name: str) -> DHCPServerManager:
+    def dhcp_server_on_interface(self, interface_name: str) -> DHCPServerManager:
         try:
             return next(dhcp_server for dhcp_server in self._dhcp_servers if dhcp_server.interface == interface_name)
         except StopIteration as error:
             raise ValueError(f"No DHCP server running on interface {interface_name}.") from error
 
-    def _is_dhcp_server_running_on_interface(self, interface_name: str) -> bool:
+    def is_dhcp_server_running_on_interface(self, interface_name: str) -> bool:
         try:
-            return bool(self._dhcp_server_on_interface(interface_name))
+            return bool(self.dhcp_server_on_interface(interface_name))
         except Exception:
             return False
 
@@ -746,7 +731,8 @@ class EthernetManager:
         """
         logger.info(f"Removing DHCP server from interface '{interface_name}'.")
         try:
-            self._dhcp_servers.remove(self._dhcp_server_on_interface(interface_name))
+            self._dhcp_servers.remove(self.dhcp_server_on_interface(interface_name))
+            self.dhcp_leases.release(interface_name)
         except ValueError:
             # If the interface does not have a DHCP server running on, no need to raise
             pass
@@ -780,8 +766,8 @@ class EthernetManager:
         """
         Adds a DHCP server to an interface and saves it to the settings file
         """
-        if self._is_dhcp_server_running_on_interface(interface_name):
-            dhcp_on_interface = self._dhcp_server_on_interface(interface_name)
+        if self.is_dhcp_server_running_on_interface(interface_name):
+            dhcp_on_interface = self.dhcp_server_on_interface(interface_name)
             if (
                 dhcp_on_interface.ipv4_gateway == ipv4_gateway
                 and dhcp_on_interface.is_backup_server == backup
@@ -808,6 +794,64 @@ class EthernetManager:
 
         self._update_interface_settings(interface_name, saved_interface)
 
+    async def watch_dhcp_leases(self) -> None:
+        """Keep the DHCP lease index up to date with the lease files of the running DHCP servers"""
+        while True:
+            for dhcp_server in self._dhcp_servers:
+                self.dhcp_leases.refresh(dhcp_server.interface, dhcp_server.lease_file)
+            await asyncio.sleep(self.DHCP_LEASES_REFRESH_INTERVAL)
+
+    def _probed_interfaces(self, state: NetworkState) -> List[str]:
+        return [
+            name
+            for name in state.interface_names()
+            if self.is_valid_interface_name(name, state=state)
+            and any(":" not in ip for ip in state.interface_addresses(name))
+        ]
+
+    def _apply_link_quality_priorities(self, state: NetworkState, interfaces: List[str]) -> bool:
+        """Reorder the priorities of the interfaces from the best to the worst measured quality
+
+        Returns:
+            bool: True if the priorities were changed
+        """
+        current_priorities = {metric.name: metric.priority for metric in state.priorities()}
+        desired_priorities = self.link_prober.reordered_priorities(current_priorities, interfaces)
+        if desired_priorities is None:
+            return False
+
+        logger.info(f"Reordering interfaces priorities from link quality: {', '.join(desired_priorities)}")
+        self.set_interfaces_priority(
+            [NetworkInterfaceMetricApi(name=name, priority=priority) for name, priority in desired_priorities.items()]
+        )
+        return True
+
+    async def probe_link_quality(self) -> None:
+        """Probe the quality of every interface with an IPv4 address when enabled, reordering their priorities if
+        automatic priority is enabled as well"""
+        last_reorder = -math.inf
+        while True:
+            link_quality = self._settings.link_quality
+            if not link_quality.enabled:
+                # Don't report measurements that are no longer updated
+                self.link_prober.clear()
+                await asyncio.sleep(link_quality.interval)
+                continue
+            try:
+                state = self.snapshot()
+                interfaces = self._probed_interfaces(state)
+                await self.link_prober.probe(interfaces, link_quality.targets)
+                now = time.monotonic()
+                if (
+                    link_quality.automatic_priority
+                    and now - last_reorder >= self.LINK_QUALITY_PRIORITY_INTERVAL
+                    and self._apply_link_quality_priorities(state, interfaces)
+                ):
+                    last_reorder = now
+            except Exception as error:
+                logger.error(f"Failed to probe link quality. {error}")
+            await asyncio.sleep(link_quality.interval)
+
     def stop(self) -> None:
         """Perform steps necessary to properly stop the manager."""
         for dhcp_server in self._dhcp_servers:
@@ -816,17 +860,21 @@ class EthernetManager:
     def __del__(self) -> None:
         self.stop()
 
-    def priorities_mismatch(self) -> List[NetworkInterface]:
+    def priorities_mismatch(self, state: Optional[NetworkState] = None) -> List[NetworkInterface]:
         """Check if the current interface priorities differ from the saved ones.
         Uses sets for order-independent comparison of NetworkInterfaceMetric objects,
         which compare only name and priority fields.
 
+        Args:
+            state (NetworkState, optional): Network state to read from, cached priorities are used if not provided
+
         Returns:
             bool: True if priorities don't match, False if they do
         """
 
         mismatched_interfaces = []
-        current_priorities = {interface.name: interface.priority for interface in self.get_interfaces_priority()}
+        metrics = state.priorities() if state else self.get_interfaces_priority()
+        current_priorities = {interface.name: interface.priority for interface in metrics}
 
         for interface in self._settings.content:
             if interface.priority is None:
@@ -839,15 +887,21 @@ class EthernetManager:
 
         return mismatched_interfaces
 
-    def config_mismatch(self) -> Set[NetworkInterface]:
+    def config_mismatch(
+        self, state: Optional[NetworkState] = None, names: Optional[Set[str]] = None
+    ) -> Set[NetworkInterface]:
         """Check if the current interface config differs from the saved ones.
 
+        Args:
+            state (NetworkState, optional): Network state to read from, a new snapshot is taken if not provided
+            names (Set[str], optional): Only check the interfaces with these names
+
         Returns:
             bool: True if config doesn't match, False if it does
         """
 
         mismatches: Set[NetworkInterface] = set()
-        current_interfaces = self.get_ethernet_interfaces()
+        current_interfaces = self.get_ethernet_interfaces(state, names)
         if len(self._settings.content) == 0:
             logger.debug("No saved configuration found")
             logger.debug(f"Current configuration: {self._settings}")
@@ -880,20 +934,46 @@ class EthernetManager:
 
     async def watchdog(self) -> None:
         """
-        periodically checks the interfaces states against the saved settings,
-        if there is a mismatch, it will apply the saved settings
+        checks the interfaces states against the saved settings whenever netlink reports a change on them,
+        if there is a mismatch, it will apply the saved settings.
+        All interfaces are also checked periodically, in case a notification is lost.
         """
+        monitor = NetworkMonitor()
+        monitor.start(self.ipr)
+        last_applied: Dict[str, float] = {}
+        last_priorities_applied = -math.inf
+        # Interfaces that changed and were not checked yet
+        pending: Optional[Set[str]] = None
+        next_full_check = time.monotonic() + self.WATCHDOG_FULL_CHECK_INTERVAL
         while True:
             try:
-                mismatches = self.config_mismatch()
-                if mismatches:
-                    logger.warning("Interface config mismatch, applying saved settings.")
-                    logger.debug(f"Mismatches: {mismatches}")
-                    for interface in mismatches:
-                        logger.info(f"Applying saved settings for {interface.name}")
-                        await self.set_configuration(interface, watchdog_call=True)
-                priority_mismatch = self.priorities_mismatch()
-                if priority_mismatch:
+                now = time.monotonic()
+                if now >= next_full_check:
+                    monitor.reload(self.ipr)
+                    pending = None
+                    next_full_check = now + self.WATCHDOG_FULL_CHECK_INTERVAL
+
+                mismatches = self.config_mismatch(monitor.state, pending)
+                pending = set()
+                applied = False
+                for interface in mismatches:
+                    # Give the previous configuration time to settle, e.g: a DHCP client that is still negotiating
+                    if now - last_applied.get(interface.name, -math.inf) < self.WATCHDOG_RECONCILE_BACKOFF:
+                        pending.add(interface.name)
+                        continue
+                    logger.warning(f"Interface {interface.name} config mismatch, applying saved settings.")
+                    logger.debug(f"Mismatch: {interface}")
+                    last_applied[interface.name] = now
+                    applied = True
+                    await self.set_configuration(interface, watchdog_call=True)
+
+                # Notifications of the configuration that was just applied are not processed yet
+                priority_mismatch = self.priorities_mismatch(self.snapshot() if applied else monitor.state)
+                # Routes of the previous reconciliation may still be changing, e.g: a DHCP client adding its own
+                priorities_deferred = (
+                    priority_mismatch and now - last_priorities_applied < self.WATCHDOG_RECONCILE_BACKOFF
+                )
+                if priority_mismatch and not priorities_deferred:
                     logger.warning("Interface priorities mismatch, applying saved settings.")
                     priorities = [
                         NetworkInterfaceMetricApi(name=interface.name, priority=interface.priority)
@@ -901,7 +981,20 @@ class EthernetManager:
                         if interface.priority is not None
                     ]
                     self.set_interfaces_priority(priorities)
-                await asyncio.sleep(5)
+                    last_priorities_applied = now
+
+                timeout = next_full_check - time.monotonic()
+                if pending:
+                    oldest = min(last_applied[name] for name in pending)
+                    timeout = min(timeout, oldest + self.WATCHDOG_RECONCILE_BACKOFF - time.monotonic())
+                if priorities_deferred:
+                    timeout = min(timeout, last_priorities_applied + self.WATCHDOG_RECONCILE_BACKOFF - time.monotonic())
+                changed = await monitor.changes(max(timeout, 0))
+                if changed is None:
+                    next_full_check = 0
+                else:
+                    pending |= changed
             except Exception as error:
                 logger.error(f"Error in watchdog: {error}")
+                pending = None
                 await asyncio.sleep(5)
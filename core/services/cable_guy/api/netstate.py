@@ -0,0 +1,328 @@
+import asyncio
+from ipaddress import ip_network
+from socket import AddressFamily
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, cast
+
+from loguru import logger
+from pyroute2 import IPRoute
+from pyroute2.netlink.rtnl import (
+    RTMGRP_IPV4_IFADDR,
+    RTMGRP_IPV4_ROUTE,
+    RTMGRP_IPV6_ROUTE,
+    RTMGRP_LINK,
+)
+from pyroute2.netlink.rtnl.ifaddrmsg import ifaddrmsg
+
+from typedefs import NetworkInterfaceMetric, Route
+
+# TODO: Replace this by `from pydantic import IPvAnyAddress, IPvAnyNetwork` once we update to pydantic v2
+from typedefs_pydantic_network_shin import IPvAnyAddress, IPvAnyNetwork
+
+# Linux interface flags, see include/uapi/linux/if.h
+IFF_UP = 0x1
+IFF_RUNNING = 0x40
+
+RouteKey = Tuple[int, Optional[str], int, Optional[str], Optional[int], int]
+
+
+def address_ip(address: Any) -> Optional[str]:
+    # IFA_ADDRESS is the peer address on point-to-point links, IFA_LOCAL is always the local one
+    return cast(Optional[str], address.get_attr("IFA_LOCAL") or address.get_attr("IFA_ADDRESS"))
+
+
+def route_key(route: Any) -> RouteKey:
+    return (
+        route["family"],
+        route.get_attr("RTA_DST"),
+        route["dst_len"],
+        route.get_attr("RTA_GATEWAY"),
+        route.get_attr("RTA_PRIORITY"),
+        route.get_attr("RTA_TABLE", route["table"]),
+    )
+
+
+def normalize_gateway(destination: IPvAnyNetwork, gateway: Optional[IPvAnyAddress]) -> Optional[IPvAnyAddress]:
+    if gateway is None:
+        return None
+
+    if destination.version == 4 and gateway.version != 4:
+        raise ValueError(f"Gateway {gateway} must be IPv4 for destination {destination}")
+
+    if destination.version == 6 and gateway.version != 6:
+        raise ValueError(f"Gateway {gateway} must be IPv6 for destination {destination}")
+
+    return gateway
+
+
+def parse_route(raw_route: Any) -> Route:
+    raw_destination: Optional[str] = raw_route.get_attr("RTA_DST")
+    raw_prefixlen: int = raw_route["dst_len"]
+    raw_gateway: Optional[str] = raw_route.get_attr("RTA_GATEWAY")
+    raw_priority: int = raw_route.get_attr("RTA_PRIORITY")
+
+    # Parse destination
+    if raw_destination is None:
+        net = "0.0.0.0/0" if raw_route["family"] == AddressFamily.AF_INET else "::/0"
+    else:
+        net = f"{raw_destination}/{raw_prefixlen}"
+    destination = IPvAnyNetwork(ip_network(net))
+
+    # Parse gateway
+    gateway = normalize_gateway(destination, IPvAnyAddress(raw_gateway)) if raw_gateway is not None else None
+
+    return Route(
+        destination=str(destination),
+        gateway=str(gateway) if gateway else None,
+        priority=raw_priority,
+    )
+
+
+class NetworkState:
+    """
+    Links, IPv4 addresses and routes of the host indexed by interface index and IP.
+    Built from a single netlink dump of each table, so reading it does not talk to the kernel.
+    """
+
+    def __init__(self, links: Iterable[Any] = (), addresses: Iterable[Any] = (), routes: Iterable[Any] = ()) -> None:
+        self.links: Dict[int, Any] = {}
+        self._indexes: Dict[str, int] = {}
+        # Interface index -> IP -> address message
+        self.addresses: Dict[int, Dict[str, Any]] = {}
+        self._addresses_by_ip: Dict[str, Any] = {}
+        # Interface index -> route key -> route message
+        self.routes: Dict[int, Dict[RouteKey, Any]] = {}
+
+        for link in links:
+            self.set_link(link)
+        for address in addresses:
+            self.set_address(address)
+        for route in routes:
+            self.set_route(route)
+
+    @classmethod
+    def dump(cls, ipr: IPRoute) -> "NetworkState":
+        # Routes of all families are kept since interfaces also report their IPv6 routes
+        return cls(ipr.get_links(), ipr.get_addr(family=AddressFamily.AF_INET), ipr.get_routes())
+
+    def set_link(self, link: Any) -> None:
+        index = link["index"]
+        previous = self.links.get(index)
+        if previous is not None:
+            self._indexes.pop(previous.get_attr("IFLA_IFNAME"), None)
+        self.links[index] = link
+        self._indexes[link.get_attr("IFLA_IFNAME")] = index
+
+    def remove_link(self, link: Any) -> None:
+        index = link["index"]
+        previous = self.links.pop(index, None)
+        if previous is not None:
+            self._indexes.pop(previous.get_attr("IFLA_IFNAME"), None)
+        for ip in self.addresses.pop(index, {}):
+            self._addresses_by_ip.pop(ip, None)
+        self.routes.pop(index, None)
+
+    def set_address(self, address: Any) -> None:
+        ip = address_ip(address)
+        if ip is None:
+            return
+        self.addresses.setdefault(address["index"], {})[ip] = address
+        self._addresses_by_ip[ip] = address
+
+    def remove_address(self, address: Any) -> None:
+        ip = address_ip(address)
+        if ip is None:
+            return
+        self.addresses.get(address["index"], {}).pop(ip, None)
+        if ip in self._addresses_by_ip and self._addresses_by_ip[ip]["index"] == address["index"]:
+            self._addresses_by_ip.pop(ip)
+
+    def set_route(self, route: Any) -> None:
+        oif = route.get_attr("RTA_OIF")
+        if oif is not None:
+            self.routes.setdefault(oif, {})[route_key(route)] = route
+
+    def remove_route(self, route: Any) -> None:
+        oif = route.get_attr("RTA_OIF")
+        if oif is not None:
+            self.routes.get(oif, {}).pop(route_key(route), None)
+
+    def apply(self, message: Any) -> Optional[str]:
+        """Apply a netlink notification to the state
+
+        Args:
+            message: RTM_NEWLINK/DELLINK/NEWADDR/DELADDR/NEWROUTE/DELROUTE message
+
+        Returns:
+            Optional[str]: Name of the interface the message is about, if known
+        """
+        event = message["event"]
+        if event in ("RTM_NEWLINK", "RTM_DELLINK"):
+            name = message.get_attr("IFLA_IFNAME") or self.name(message["index"])
+            if event == "RTM_NEWLINK":
+                self.set_link(message)
+            else:
+                self.remove_link(message)
+            return name
+        if event in ("RTM_NEWADDR", "RTM_DELADDR"):
+            if message["family"] != AddressFamily.AF_INET:
+                return None
+            if event == "RTM_NEWADDR":
+                self.set_address(message)
+            else:
+                self.remove_address(message)
+            return self.name(message["index"])
+        if event in ("RTM_NEWROUTE", "RTM_DELROUTE"):
+            if event == "RTM_NEWROUTE":
+                self.set_route(message)
+            else:
+                self.remove_route(message)
+            oif = message.get_attr("RTA_OIF")
+            return self.name(oif) if oif is not None else None
+        return None
+
+    def index(self, interface_name: str) -> Optional[int]:
+        return self._indexes.get(interface_name)
+
+    def name(self, index: int) -> Optional[str]:
+        link = self.links.get(index)
+        return link.get_attr("IFLA_IFNAME") if link is not None else None
+
+    def interface_names(self) -> List[str]:
+        return [self.links[index].get_attr("IFLA_IFNAME") for index in sorted(self.links)]
+
+    def link(self, interface_name: str) -> Optional[Any]:
+        index = self.index(interface_name)
+        return self.links.get(index) if index is not None else None
+
+    def interface_addresses(self, interface_name: str) -> List[str]:
+        index = self.index(interface_name)
+        return list(self.addresses.get(index, {})) if index is not None else []
+
+    def interface_routes(self, interface_name: str) -> List[Any]:
+        index = self.index(interface_name)
+        return list(self.routes.get(index, {}).values()) if index is not None else []
+
+    def is_static_ip(self, ip: str) -> bool:
+        """Check if ip address is static or dynamic
+            For more information: https://code.woboq.org/qt5/include/linux/if_addr.h.html
+                https://www.systutorials.com/docs/linux/man/8-ip-address/
+
+        Args:
+            ip (str): ip address
+
+        Returns:
+            bool: true if static false if not
+        """
+        address = self._addresses_by_ip.get(ip)
+        if address is None:
+            return False
+        flags = address.get_attr("IFA_FLAGS", address["flags"])
+        return "IFA_F_PERMANENT" in ifaddrmsg.flags2names(flags)
+
+    def priorities(self) -> List[NetworkInterfaceMetric]:
+        """Get the priority metrics for all network interfaces that are UP and RUNNING.
+
+        Returns:
+            List[NetworkInterfaceMetric]: A list of priority metrics for each active interface.
+        """
+        # I hope that you are not here to move this code to IPv6.
+        # If that is the case, you'll need to figure out a way to handle
+        # priorities between interfaces, between IP categories.
+        # GLHF
+        metrics: List[NetworkInterfaceMetric] = []
+        for index in sorted(self.links):
+            link = self.links[index]
+            if not (link["flags"] & IFF_UP and link["flags"] & IFF_RUNNING):
+                continue
+
+            # Keep the highest metric of the default routes of each interface
+            default_metrics = [
+                route.get_attr("RTA_PRIORITY", 0)
+                for route in self.routes.get(index, {}).values()
+                if route["family"] == AddressFamily.AF_INET and route.get_attr("RTA_DST") is None
+            ]
+            if default_metrics:
+                metrics.append(
+                    NetworkInterfaceMetric(
+                        index=index, name=link.get_attr("IFLA_IFNAME"), priority=max(default_metrics)
+                    )
+                )
+        return metrics
+
+
+class NetworkMonitor:
+    """
+    Keeps a NetworkState current from netlink notifications and reports which interfaces changed.
+    """
+
+    GROUPS = RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE
+    # Time to wait for related notifications (e.g: an address and its routes) before reporting a change
+    DEBOUNCE_TIME = 0.05
+
+    def __init__(self) -> None:
+        self.state = NetworkState()
+        self._socket: Optional[IPRoute] = None
+        self._changed: Set[str] = set()
+        self._event = asyncio.Event()
+        # Set when notifications were lost and the state must be dumped again
+        self._resync = False
+
+    def start(self, ipr: IPRoute) -> None:
+        """Subscribe to netlink notifications and dump the initial state
+
+        Args:
+            ipr (IPRoute): Socket used to dump the state, notifications are received in a dedicated one
+        """
+        self._socket = IPRoute()
+        self._socket.bind(groups=self.GROUPS)
+        # Subscribe before dumping so no change is lost in between, replayed notifications are harmless
+        self.reload(ipr)
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._read)
+
+    def stop(self) -> None:
+        if self._socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+
+    def reload(self, ipr: IPRoute) -> None:
+        self.state = NetworkState.dump(ipr)
+        self._resync = False
+
+    def _read(self) -> None:
+        assert self._socket is not None
+        try:
+            messages = self._socket.get()
+        except Exception as error:
+            # Usually ENOBUFS, the kernel dropped notifications because they were not read fast enough
+            logger.warning(f"Failed to read netlink notifications, state will be reloaded. {error}")
+            self._resync = True
+            self._event.set()
+            return
+
+        for message in messages:
+            name = self.state.apply(message)
+            if name is not None:
+                self._changed.add(name)
+        if self._changed:
+            self._event.set()
+
+    async def changes(self, timeout: float) -> Optional[Set[str]]:
+        """Wait for interfaces to change
+
+        Args:
+            timeout (float): Maximum time to wait, in seconds
+
+        Returns:
+            Optional[Set[str]]: Names of the interfaces that changed, empty on timeout and None if the state needs
+                to be reloaded
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return set()
+        await asyncio.sleep(self.DEBOUNCE_TIME)
+        self._event.clear()
+        changed, self._changed = self._changed, set()
+        return None if self._resync else changed
@@ -0,0 +1,146 @@
+import inspect
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+
+from loguru import logger
+
+from api.netstate import NetworkState
+from typedefs import AddressMode, NetworkInterface
+
+if TYPE_CHECKING:
+    from api.manager import EthernetManager
+
+
+@dataclass
+class ConfigurationStep:
+    description: str
+    # May return an awaitable, which is awaited before the next step
+    apply: Callable[[], Any]
+    # Reverts apply, None if there is nothing to revert
+    undo: Optional[Callable[[], Any]] = None
+
+
+class ConfigurationPlan:
+    """
+    Changes needed to bring an interface to its desired configuration, applied as a single transaction:
+    if a step fails, the steps already applied are reverted in reverse order.
+    """
+
+    def __init__(self, interface_name: str) -> None:
+        self.interface_name = interface_name
+        self.steps: List[ConfigurationStep] = []
+
+    def add(self, description: str, apply: Callable[[], Any], undo: Optional[Callable[[], Any]] = None) -> None:
+        self.steps.append(ConfigurationStep(description, apply, undo))
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    @staticmethod
+    async def _run(function: Callable[[], Any]) -> None:
+        result = function()
+        if inspect.isawaitable(result):
+            await result
+
+    async def _rollback(self, applied: List[ConfigurationStep]) -> None:
+        for step in reversed(applied):
+            if step.undo is None:
+                continue
+            try:
+                logger.info(f"Reverting '{step.description}' on interface '{self.interface_name}'.")
+                await self._run(step.undo)
+            except Exception as error:
+                logger.error(f"Failed to revert '{step.description}' on interface '{self.interface_name}'. {error}")
+
+    async def execute(self) -> None:
+        applied: List[ConfigurationStep] = []
+        for step in self.steps:
+            try:
+                logger.info(f"Applying '{step.description}' on interface '{self.interface_name}'.")
+                await self._run(step.apply)
+            except Exception as error:
+                logger.error(f"Failed to apply '{step.description}' on interface '{self.interface_name}'. {error}")
+                await self._rollback(applied)
+                raise RuntimeError(
+                    f"Failed to configure interface '{self.interface_name}' ({step.description}), changes reverted."
+                ) from error
+            applied.append(step)
+
+
+def revert_dhcp_server(
+    manager: "EthernetManager", interface_name: str, keep_ip: bool, previous: Optional[Tuple[str, bool]]
+) -> None:
+    ip = manager.dhcp_server_on_interface(interface_name).ipv4_gateway
+    manager.remove_dhcp_server_from_interface(interface_name)
+    if not keep_ip:
+        manager.network_handler.remove_static_ip(interface_name, str(ip))
+    if previous is not None:
+        manager.add_dhcp_server_to_interface(interface_name, *previous)
+
+
+def plan_configuration(
+    manager: "EthernetManager", interface: NetworkInterface, state: NetworkState
+) -> ConfigurationPlan:
+    """Compute the changes needed to bring an interface from its current state to the desired configuration
+
+    Args:
+        manager (EthernetManager): Manager the changes are applied through
+        interface (NetworkInterface): Desired configuration
+        state (NetworkState): Current network state
+
+    Returns:
+        ConfigurationPlan: Changes to be applied
+    """
+    name = interface.name
+    plan = ConfigurationPlan(name)
+    current_ips = set(state.interface_addresses(name))
+
+    if interface.addresses:
+        plan.add("bring interface up", partial(manager.enable_interface, name))
+
+    for address in interface.addresses:
+        # Addresses that are already present are only recorded in the settings
+        undo_ip = (
+            None if address.ip in current_ips else partial(manager.network_handler.remove_static_ip, name, address.ip)
+        )
+        if address.mode == AddressMode.Unmanaged:
+            plan.add(f"add static IP {address.ip}", partial(manager.add_static_ip, name, address.ip), undo_ip)
+        elif address.mode in [AddressMode.Server, AddressMode.BackupServer]:
+            backup = address.mode == AddressMode.BackupServer
+            previous = None
+            if manager.is_dhcp_server_running_on_interface(name):
+                server = manager.dhcp_server_on_interface(name)
+                previous = (str(server.ipv4_gateway), server.is_backup_server)
+            if previous == (address.ip, backup) and address.ip in current_ips:
+                continue
+            plan.add(
+                f"add {'backup ' if backup else ''}DHCP server with gateway {address.ip}",
+                partial(manager.add_dhcp_server_to_interface, name, address.ip, backup),
+                partial(revert_dhcp_server, manager, name, address.ip in current_ips, previous),
+            )
+
+    # Even if it happened to receive more than one dynamic IP, only one trigger is necessary
+    if any(address.mode == AddressMode.Client for address in interface.addresses):
+        plan.add("trigger dynamic IP acquisition", partial(manager.trigger_dynamic_ip_acquisition, name))
+
+    index = state.index(name)
+    current_routes = manager.get_routes(name, ignore_unmanaged=False, state=state)
+    managed_routes = {route for route in current_routes if route.managed}
+    for route in managed_routes:
+        if route not in interface.routes:
+            plan.add(
+                f"remove route to {route.destination} via {route.gateway}",
+                partial(manager.apply_route, "del", name, index, route),
+                partial(manager.apply_route, "add", name, index, route),
+            )
+    for route in interface.routes:
+        # Unmanaged routes that already exist are only recorded in the settings
+        if route not in current_routes:
+            plan.add(
+                f"add route to {route.destination} via {route.gateway}",
+                partial(manager.apply_route, "add", name, index, route),
+                partial(manager.apply_route, "del", name, index, route),
+            )
+
+    return plan
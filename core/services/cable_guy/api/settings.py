@@ -5,7 +5,12 @@ from typing import Any, Dict, Sequence
 from commonwealth.settings.settings import PydanticSettings
 
 from config import DEFAULT_NETWORK_INTERFACES
-from typedefs import AddressMode, NetworkInterface, NetworkInterfaceV1
+from typedefs import (
+    AddressMode,
+    LinkQualitySettings,
+    NetworkInterface,
+    NetworkInterfaceV1,
+)
 
 
 def sanitize_old_settings_file(path: pathlib.Path) -> None:
@@ -59,6 +64,8 @@ class SettingsV1(PydanticSettings):
 
 class SettingsV2(SettingsV1):
     content: Sequence[NetworkInterface] = DEFAULT_NETWORK_INTERFACES
+    # Optional with a default, so previous settings files are still valid
+    link_quality: LinkQualitySettings = LinkQualitySettings()
 
     def migrate(self, data: Dict[str, Any]) -> None:
         if data["VERSION"] == SettingsV2.STATIC_VERSION:
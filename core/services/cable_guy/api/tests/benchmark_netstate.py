@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compares reading interfaces through one NetworkState snapshot against the previous per address and per interface
+netlink dumps, using a stubbed IPRoute with many interfaces and addresses.
+
+Run with: python -m api.tests.benchmark_netstate
+"""
+
+import argparse
+import time
+from socket import AddressFamily
+from typing import Any, Callable, List
+
+from pyroute2.netlink.rtnl.ifaddrmsg import ifaddrmsg
+from pyroute2.netlink.rtnl.ifinfmsg import ifinfmsg
+from pyroute2.netlink.rtnl.rtmsg import rtmsg
+
+from api.netstate import NetworkState
+
+
+class StubIPRoute:
+    def __init__(self, interfaces: int, addresses: int, dump_latency: float) -> None:
+        self.dumps = 0
+        self.dump_latency = dump_latency
+        self.links: List[Any] = []
+        self.addresses: List[Any] = []
+        self.routes: List[Any] = []
+        for index in range(1, interfaces + 1):
+            link = ifinfmsg()
+            link["index"] = index
+            link["flags"] = 0x41
+            link["attrs"] = [("IFLA_IFNAME", f"eth{index}"), ("IFLA_CARRIER", 1)]
+            self.links.append(link)
+
+            for host in range(1, addresses + 1):
+                address = ifaddrmsg()
+                address["index"] = index
+                address["family"] = AddressFamily.AF_INET
+                address["flags"] = 0x80
+                ip = f"10.{index // 256}.{index % 256}.{host}"
+                address["attrs"] = [("IFA_ADDRESS", ip), ("IFA_LOCAL", ip), ("IFA_FLAGS", 0x80)]
+                self.addresses.append(address)
+
+            route = rtmsg()
+            route["family"] = AddressFamily.AF_INET
+            route["dst_len"] = 0
+            route["table"] = 254
+            route["attrs"] = [("RTA_OIF", index), ("RTA_PRIORITY", 100 + index), ("RTA_GATEWAY", f"10.0.{index}.254")]
+            self.routes.append(route)
+
+    def _dump(self, messages: List[Any], predicate: Callable[[Any], bool]) -> List[Any]:
+        self.dumps += 1
+        time.sleep(self.dump_latency)
+        return [message for message in messages if predicate(message)]
+
+    def get_links(self) -> List[Any]:
+        return self._dump(self.links, lambda _: True)
+
+    def get_addr(self, family: int = 0) -> List[Any]:
+        return self._dump(self.addresses, lambda message: not family or message["family"] == family)
+
+    def get_routes(self, family: int = 255, oif: Any = None) -> List[Any]:
+        return self._dump(
+            self.routes,
+            lambda message: family in (255, message["family"]) and (oif is None or message.get_attr("RTA_OIF") == oif),
+        )
+
+    def link_lookup(self, ifname: str) -> List[int]:
+        return [link["index"] for link in self._dump(self.links, lambda link: link.get_attr("IFLA_IFNAME") == ifname)]
+
+
+def per_call_lookup(ipr: StubIPRoute) -> int:
+    """Mimics the lookups done before NetworkState: an address dump per address and a route dump per interface"""
+    found = 0
+    # Priorities were cached, so links and routes were dumped once per request
+    ipr.get_links()
+    ipr.get_routes(family=AddressFamily.AF_INET)
+    for link in ipr.get_links():
+        name = link.get_attr("IFLA_IFNAME")
+        index = link["index"]
+        for address in [address for address in ipr.addresses if address["index"] == index]:
+            ip = address.get_attr("IFA_ADDRESS")
+            found += any(item.get_attr("IFA_ADDRESS") == ip for item in ipr.get_addr())
+        found += len(ipr.get_routes(oif=ipr.link_lookup(ifname=name)[0]))
+    return found
+
+
+def snapshot_lookup(ipr: StubIPRoute) -> int:
+    found = 0
+    state = NetworkState.dump(ipr)  # type: ignore
+    state.priorities()
+    for name in state.interface_names():
+        found += sum(state.is_static_ip(ip) for ip in state.interface_addresses(name))
+        found += len(state.interface_routes(name))
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interfaces", type=int, default=32, help="Number of stubbed interfaces")
+    parser.add_argument("--addresses", type=int, default=8, help="Number of IPv4 addresses per interface")
+    parser.add_argument("--dump-latency", type=float, default=0.0002, help="Seconds spent by each netlink dump")
+    args = parser.parse_args()
+
+    for name, lookup in [("per call", per_call_lookup), ("snapshot", snapshot_lookup)]:
+        ipr = StubIPRoute(args.interfaces, args.addresses, args.dump_latency)
+        start = time.perf_counter()
+        found = lookup(ipr)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<9}: {ipr.dumps:>6} dumps {elapsed * 1000:>9.2f} ms ({found} entries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from typing import Callable, List
+
+import pytest
+
+from api.planner import ConfigurationPlan
+
+
+def recorder(calls: List[str], name: str) -> Callable[[], None]:
+    def record() -> None:
+        calls.append(name)
+
+    return record
+
+
+def failing(calls: List[str], name: str) -> Callable[[], None]:
+    def fail() -> None:
+        calls.append(name)
+        raise OSError(f"{name} failed")
+
+    return fail
+
+
+@pytest.mark.asyncio
+async def test_plan_applies_every_step() -> None:
+    calls: List[str] = []
+    plan = ConfigurationPlan("eth0")
+    plan.add("first", recorder(calls, "apply first"), recorder(calls, "undo first"))
+
+    async def second() -> None:
+        calls.append("apply second")
+
+    plan.add("second", second)
+    await plan.execute()
+    assert len(plan) == 2
+    assert calls == ["apply first", "apply second"]
+
+
+@pytest.mark.asyncio
+async def test_plan_rolls_back_applied_steps_in_reverse_order() -> None:
+    calls: List[str] = []
+    plan = ConfigurationPlan("eth0")
+    plan.add("first", recorder(calls, "apply first"), recorder(calls, "undo first"))
+    plan.add("second", recorder(calls, "apply second"))
+    plan.add("third", recorder(calls, "apply third"), recorder(calls, "undo third"))
+    plan.add("fourth", failing(calls, "apply fourth"), recorder(calls, "undo fourth"))
+    plan.add("fifth", recorder(calls, "apply fifth"), recorder(calls, "undo fifth"))
+
+    with pytest.raises(RuntimeError, match="fourth") as error:
+        await plan.execute()
+    assert isinstance(error.value.__cause__, OSError)
+    # The failed step and the ones after it are not reverted, steps without undo are skipped
+    assert calls == ["apply first", "apply second", "apply third", "apply fourth", "undo third", "undo first"]
+
+
+@pytest.mark.asyncio
+async def test_plan_rollback_continues_after_undo_failure() -> None:
+    calls: List[str] = []
+    plan = ConfigurationPlan("eth0")
+    plan.add("first", recorder(calls, "apply first"), recorder(calls, "undo first"))
+    plan.add("second", recorder(calls, "apply second"), failing(calls, "undo second"))
+    plan.add("third", failing(calls, "apply third"))
+
+    with pytest.raises(RuntimeError):
+        await plan.execute()
+    assert calls == ["apply first", "apply second", "apply third", "undo second", "undo first"]
@@ -0,0 +1,163 @@
+import json
+import time
+from array import array
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Tuple
+
+from commonwealth.utils.streaming import Broadcaster
+
+from typedefs import InterfaceTraffic, TrafficRate, TrafficWindow
+
+
+class RateRing:
+    """
+    Fixed size ring buffer of receive and transmit rates, backed by arrays so its memory never grows.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._rx = array("d", bytes(8 * capacity))
+        self._tx = array("d", bytes(8 * capacity))
+        # Position of the next sample and number of valid samples
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, rx: float, tx: float) -> None:
+        self._timestamps[self._next] = timestamp
+        self._rx[self._next] = rx
+        self._tx[self._next] = tx
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def latest(self) -> Optional[TrafficRate]:
+        if not self._size:
+            return None
+        position = self._next - 1
+        return TrafficRate(timestamp=self._timestamps[position], rx=self._rx[position], tx=self._tx[position])
+
+    def _positions(self, since: float) -> Iterable[int]:
+        """Positions of the samples newer than since, newest first"""
+        for i in range(1, self._size + 1):
+            position = (self._next - i) % self.capacity
+            if self._timestamps[position] < since:
+                return
+            yield position
+
+    def history(self, since: float) -> List[TrafficRate]:
+        return [
+            TrafficRate(timestamp=self._timestamps[position], rx=self._rx[position], tx=self._tx[position])
+            for position in reversed(list(self._positions(since)))
+        ]
+
+    def window(self, seconds: int, now: float) -> TrafficWindow:
+        rx_total = tx_total = 0.0
+        rx_min = tx_min = float("inf")
+        rx_max = tx_max = 0.0
+        samples = 0
+        for position in self._positions(now - seconds):
+            rx, tx = self._rx[position], self._tx[position]
+            rx_total += rx
+            tx_total += tx
+            rx_min, rx_max = min(rx_min, rx), max(rx_max, rx)
+            tx_min, tx_max = min(tx_min, tx), max(tx_max, tx)
+            samples += 1
+        if not samples:
+            return TrafficWindow(window=seconds)
+        return TrafficWindow(
+            window=seconds,
+            samples=samples,
+            rx_min=rx_min,
+            rx_avg=rx_total / samples,
+            rx_max=rx_max,
+            tx_min=tx_min,
+            tx_avg=tx_total / samples,
+            tx_max=tx_max,
+        )
+
+
+class TrafficAccounting:
+    """
+    Receive and transmit rates of every link, computed from the link counters sampled by LinkTable.
+    """
+
+    # Time between samples, in seconds
+    SAMPLE_INTERVAL = 1.0
+    # Number of rates kept per interface, one hour with the default interval
+    HISTORY_SIZE = 3600
+    # Windows of the rate summaries, in seconds
+    WINDOWS = [10, 60, 300, 3600]
+    # Samples buffered for each stream subscriber before the oldest ones are dropped
+    QUEUE_SIZE = 10
+
+    def __init__(self) -> None:
+        self._rings: Dict[str, RateRing] = {}
+        # Index, monotonic time and byte counters of the last sample of each interface
+        self._counters: Dict[str, Tuple[int, float, int, int]] = {}
+        self._samples: Broadcaster[str] = Broadcaster(self.QUEUE_SIZE)
+
+    def update(self, links: Iterable[Any], timestamp: Optional[float] = None, now: Optional[float] = None) -> None:
+        """Add a rate sample from a link dump
+
+        Args:
+            links: RTM_NEWLINK messages
+            timestamp (float, optional): Wall clock time of the dump, only used to label the samples
+            now (float, optional): Monotonic time of the dump, used to compute the rates
+        """
+        timestamp = timestamp or time.time()
+        now = now or time.monotonic()
+        rates: Dict[str, Dict[str, float]] = {}
+        present = set()
+        for link in links:
+            name = link.get_attr("IFLA_IFNAME")
+            present.add(name)
+            stats = link.get_attr("IFLA_STATS64") or link.get_attr("IFLA_STATS") or {}
+            counters = (link["index"], now, stats.get("rx_bytes", 0), stats.get("tx_bytes", 0))
+            previous = self._counters.get(name)
+            self._counters[name] = counters
+            # The first sample, or the link was recreated with the same name
+            if previous is None or previous[0] != counters[0]:
+                continue
+
+            elapsed = now - previous[1]
+            # Counters going backwards were reset, rates are unknown for this sample
+            if elapsed <= 0 or counters[2] < previous[2] or counters[3] < previous[3]:
+                continue
+            rx = (counters[2] - previous[2]) / elapsed
+            tx = (counters[3] - previous[3]) / elapsed
+            self._rings.setdefault(name, RateRing(self.HISTORY_SIZE)).append(timestamp, rx, tx)
+            rates[name] = {"rx": rx, "tx": tx}
+
+        # Forget removed interfaces
+        for name in set(self._counters) - present:
+            del self._counters[name]
+            self._rings.pop(name, None)
+
+        if self._samples.subscribers:
+            # Encoded once for every subscriber, so watching clients don't add to the sampling cost
+            self._samples.publish(json.dumps({"timestamp": timestamp, "interfaces": rates}) + "\n")
+
+    def traffic(self, interface_name: Optional[str] = None, now: Optional[float] = None) -> List[InterfaceTraffic]:
+        now = now or time.time()
+        return [
+            InterfaceTraffic(
+                name=name,
+                current=ring.latest(),
+                windows=[ring.window(seconds, now) for seconds in self.WINDOWS],
+            )
+            for name, ring in self._rings.items()
+            if interface_name is None or name == interface_name
+        ]
+
+    def history(self, interface_name: str, seconds: int, now: Optional[float] = None) -> List[TrafficRate]:
+        ring = self._rings.get(interface_name)
+        if ring is None:
+            raise ValueError(f"No traffic samples for interface '{interface_name}'.")
+        return ring.history((now or time.time()) - seconds)
+
+    async def stream(self) -> AsyncGenerator[str, None]:
+        """Yields the rates of all interfaces as a JSON line after every sample"""
+        async for sample in self._samples.listen():
+            yield sample
@@ -3,13 +3,14 @@ import asyncio
 import logging
 import os
 import sys
-from typing import Any, List
+from typing import Any, AsyncGenerator, List, Optional
 
 from commonwealth.utils.apis import GenericErrorHandlingRoute, PrettyJSONResponse
 from commonwealth.utils.decorators import temporary_cache
+from commonwealth.utils.DHCPLeases import DHCPLease, DHCPLeaseFilter
 from commonwealth.utils.logs import InterceptHandler, init_logger
 from fastapi import Body, FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi_versioning import VersionedFastAPI, version
 from loguru import logger
 from uvicorn import Config, Server
@@ -17,7 +18,14 @@ from uvicorn import Config, Server
 from api.dns import DnsData
 from api.manager import EthernetManager, NetworkInterface, NetworkInterfaceMetricApi
 from config import SERVICE_NAME
-from typedefs import Route
+from typedefs import (
+    InterfaceClassification,
+    InterfaceLinkStatistics,
+    LinkQuality,
+    LinkQualitySettings,
+    Route,
+    TrafficRate,
+)
 
 logging.basicConfig(handlers=[InterceptHandler()], level=0)
 init_logger(SERVICE_NAME)
@@ -58,6 +66,42 @@ def retrieve_interfaces() -> Any:
     return manager.get_interfaces()
 
 
+@app.get(
+    "/interfaces/classification",
+    response_model=List[InterfaceClassification],
+    summary="Retrieve the type of each network interface.",
+)
+@version(1, 0)
+def retrieve_interfaces_classification() -> Any:
+    """REST API endpoint to retrieve whether each interface is ethernet, wifi, usb gadget, container or virtual."""
+    return manager.get_interfaces_classification()
+
+
+@app.get(
+    "/link_statistics",
+    response_model=List[InterfaceLinkStatistics],
+    summary="Retrieve carrier, traffic counters history and traffic rates of the interfaces.",
+)
+@version(1, 0)
+def retrieve_link_statistics(interface_name: Optional[str] = None) -> Any:
+    """REST API endpoint to retrieve the link statistics of all interfaces or of a single one."""
+    return manager.link_table.statistics(interface_name)
+
+
+@app.get("/traffic/history", response_model=List[TrafficRate], summary="Retrieve traffic rates of an interface.")
+@version(1, 0)
+def retrieve_traffic_history(interface_name: str, seconds: int = 60) -> Any:
+    """REST API endpoint to retrieve the receive and transmit rates of an interface over the last seconds."""
+    return manager.traffic.history(interface_name, seconds)
+
+
+@app.get("/traffic/stream", summary="Stream interfaces traffic rates.")
+@version(1, 0)
+async def stream_traffic() -> StreamingResponse:
+    """REST API endpoint to follow the receive and transmit rates of all interfaces, one JSON sample per line."""
+    return StreamingResponse(manager.traffic.stream(), media_type="application/x-ndjson")
+
+
 @app.post("/set_interfaces_priority", summary="Set interface priority")
 @version(1, 0)
 def set_interfaces_priority(interfaces: List[NetworkInterfaceMetricApi]) -> Any:
@@ -99,12 +143,60 @@ def remove_dhcp_server(interface_name: str) -> Any:
 
 @app.post("/dynamic_ip", summary="Trigger reception of dynamic IP.")
 @version(1, 0)
-def trigger_dynamic_ip_acquisition(interface_name: str) -> Any:
+async def trigger_dynamic_ip_acquisition(interface_name: str) -> Any:
     """REST API endpoint to trigger interface to receive a new dynamic IP."""
-    manager.trigger_dynamic_ip_acquisition(interface_name)
+    await manager.trigger_dynamic_ip_acquisition(interface_name)
     manager.save()
 
 
+@app.get("/link_quality", response_model=List[LinkQuality], summary="Retrieve measured interfaces quality.")
+@version(1, 0)
+def retrieve_link_quality(interface_name: Optional[str] = None) -> Any:
+    """REST API endpoint to retrieve latency, jitter and loss of the interfaces to each probed target."""
+    return manager.link_prober.quality(interface_name)
+
+
+@app.get("/link_quality/settings", response_model=LinkQualitySettings, summary="Retrieve link quality settings.")
+@version(1, 0)
+def retrieve_link_quality_settings() -> Any:
+    """REST API endpoint to retrieve the link quality probing targets and policy."""
+    return manager.get_link_quality_settings()
+
+
+@app.post("/link_quality/settings", summary="Update link quality settings.")
+@version(1, 0)
+def update_link_quality_settings(link_quality: LinkQualitySettings) -> Any:
+    """REST API endpoint to update the link quality probing targets and policy."""
+    manager.set_link_quality_settings(link_quality)
+
+
+@app.get("/dhcp/leases", response_model=List[DHCPLease], summary="Retrieve leases granted by local DHCP servers.")
+@version(1, 0)
+def retrieve_dhcp_leases(
+    interface_name: Optional[str] = None,
+    mac: Optional[str] = None,
+    ip: Optional[str] = None,
+    hostname: Optional[str] = None,
+    active_only: bool = False,
+) -> Any:
+    """REST API endpoint to retrieve the clients of the local DHCP servers, optionally filtered."""
+    return manager.dhcp_leases.leases(
+        DHCPLeaseFilter(interface=interface_name, mac=mac, ip=ip, hostname=hostname, active_only=active_only)
+    )
+
+
+@app.get("/dhcp/leases/stream", summary="Stream lease events of local DHCP servers.")
+@version(1, 0)
+async def stream_dhcp_leases() -> StreamingResponse:
+    """REST API endpoint to follow DHCP lease events, one JSON event per line, starting with the active leases."""
+
+    async def events() -> AsyncGenerator[str, None]:
+        async for event in manager.dhcp_leases.events():
+            yield event.json() + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.get("/host_dns", summary="Retrieve host DNS configuration.")
 @version(1, 0)
 def retrieve_host_dns() -> Any:
@@ -176,4 +268,7 @@ if __name__ == "__main__":
     server = Server(config)
     loop.run_until_complete(manager.initialize())
     loop.create_task(manager.watchdog())
+    loop.create_task(manager.link_table.run(manager.ipr))
+    loop.create_task(manager.watch_dhcp_leases())
+    loop.create_task(manager.probe_link_quality())
     loop.run_until_complete(server.serve())
@@ -1,8 +1,8 @@
 from enum import Enum
 from ipaddress import ip_network
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, root_validator
 
 # TODO: Replace this by `from pydantic import IPvAnyAddress, IPvAnyNetwork` once we update to pydantic v2
 from typedefs_pydantic_network_shin import IPvAnyAddress, IPvAnyNetwork
@@ -29,12 +29,80 @@ class InterfaceAddress(BaseModel):
         return hash(self.mode) + hash(self.ip)
 
 
+class InterfaceType(str, Enum):
+    Ethernet = "ethernet"
+    Wifi = "wifi"
+    UsbGadget = "usb_gadget"
+    # Docker bridges and veth pairs
+    Container = "container"
+    # Interfaces without a device, e.g: loopback, bridges and VPNs
+    Virtual = "virtual"
+    # Hardware that is neither ethernet nor wifi, e.g: CAN and raw IP modems
+    Other = "other"
+
+
+class InterfaceClassification(BaseModel):
+    name: str
+    index: int
+    type: InterfaceType
+    # Interfaces that are never configured, like loopback and the ones created by docker
+    ignored: bool
+
+
 class InterfaceInfo(BaseModel):
     connected: bool
     number_of_disconnections: int
     priority: int
 
 
+class LinkStatistics(BaseModel):
+    timestamp: float
+    connected: bool
+    number_of_disconnections: int
+    rx_bytes: int
+    tx_bytes: int
+    rx_packets: int
+    tx_packets: int
+    rx_errors: int
+    tx_errors: int
+    rx_dropped: int
+    tx_dropped: int
+
+
+class TrafficRate(BaseModel):
+    timestamp: float
+    # Bytes per second
+    rx: float
+    tx: float
+
+
+class TrafficWindow(BaseModel):
+    # Seconds
+    window: int
+    samples: int = 0
+    # Bytes per second
+    rx_min: float = 0
+    rx_avg: float = 0
+    rx_max: float = 0
+    tx_min: float = 0
+    tx_avg: float = 0
+    tx_max: float = 0
+
+
+class InterfaceTraffic(BaseModel):
+    name: str
+    current: Optional[TrafficRate] = None
+    windows: List[TrafficWindow]
+
+
+class InterfaceLinkStatistics(BaseModel):
+    name: str
+    # Oldest first
+    samples: List[LinkStatistics]
+    # None until two samples were taken
+    traffic: Optional[InterfaceTraffic] = None
+
+
 class Route(BaseModel):
     destination: str  # TODO: change this to IPvAnyNetwork from pydantic v2
     gateway: Optional[str] = None  # TODO: change this to IPvAnyAddress from pydantic v2
@@ -108,3 +176,49 @@ class NetworkInterfaceMetric(BaseModel):
 class NetworkInterfaceMetricApi(BaseModel):
     name: str
     priority: int
+
+
+class ProbeProtocol(str, Enum):
+    ICMP = "icmp"
+    # DNS query, for networks that filter ICMP
+    UDP = "udp"
+
+
+class LinkQualityTarget(BaseModel):
+    # IPv4 address
+    host: str
+    protocol: ProbeProtocol = ProbeProtocol.ICMP
+    # Only used by UDP probes
+    port: int = 53
+
+
+class LinkQualitySettings(BaseModel):
+    # Probing sends traffic through every interface, including metered ones, so it must be enabled explicitly
+    enabled: bool = False
+    targets: List[LinkQualityTarget] = [
+        LinkQualityTarget(host="1.1.1.1"),
+        LinkQualityTarget(host="8.8.8.8"),
+    ]
+    # Time between probe rounds, in seconds
+    interval: float = Field(2.0, ge=0.5)
+    # Reorder the interfaces priorities from the measured quality
+    automatic_priority: bool = False
+
+    @root_validator(skip_on_failure=True)
+    @classmethod
+    def check_targets(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        if values["automatic_priority"] and not values["targets"]:
+            raise ValueError("Automatic priority requires at least one target to measure the interfaces.")
+        return values
+
+
+class LinkQuality(BaseModel):
+    interface: str
+    target: LinkQualityTarget
+    # Round trip time average and mean deviation between consecutive replies, in milliseconds
+    latency: Optional[float] = None
+    jitter: Optional[float] = None
+    # Fraction of the probes without reply, from 0 to 1
+    loss: float
+    samples: int
+    timestamp: float
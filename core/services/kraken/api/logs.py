@@ -0,0 +1,26 @@
+from typing import Optional
+
+from commonwealth.utils.streaming import SSEEncoder, streamer, timeout_streamer
+from fastapi.responses import StreamingResponse
+
+from harbor import ContainerManager
+from harbor.models import LogFraming
+
+
+def log_response(
+    container_name: str, timeout: Optional[int], framing: LogFraming, tail: Optional[int] = None
+) -> StreamingResponse:
+    if framing == LogFraming.RAW:
+        return StreamingResponse(
+            ContainerManager.get_container_log_by_name(container_name, timeout, tail), media_type="text/plain"
+        )
+    if framing == LogFraming.SSE:
+        stream = ContainerManager.get_container_log_by_name(container_name, timeout, tail)
+        encoder = SSEEncoder()
+        return StreamingResponse(streamer(stream, encoder=encoder), media_type=encoder.media_type)
+
+    stream = ContainerManager.get_container_log_by_name(container_name, tail=tail)
+    if timeout is not None:
+        return StreamingResponse(timeout_streamer(stream, timeout=timeout), media_type="text/plain")
+
+    return StreamingResponse(streamer(stream, heartbeats=0.1), media_type="text/plain")
@@ -1,13 +1,14 @@
 from typing import Any, List, Optional, cast
 
-from commonwealth.utils.streaming import streamer, timeout_streamer
 from fastapi import APIRouter, status
 from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi_versioning import versioned_api_route
 
+from api.logs import log_response
 from extension.extension import Extension
 from extension.models import ExtensionSource
 from harbor import ContainerManager
+from harbor.models import LogFraming
 from manifest import ManifestManager
 from manifest.models import RepositoryEntry
 
@@ -37,17 +38,20 @@ async def list_containers() -> Any:
 
 
 @index_router_v1.get("/log", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
-async def log_containers(container_name: str, timeout: Optional[int] = None) -> StreamingResponse:
+async def log_containers(
+    container_name: str,
+    timeout: Optional[int] = None,
+    framing: LogFraming = LogFraming.ENVELOPE,
+    tail: Optional[int] = None,
+) -> StreamingResponse:
     """
-    Fetch logs of a given container.
+    Fetch logs of a given container, starting with its last tail lines, 500 by default, or its whole history with a
+    negative tail. Streams with up to 500 tail lines share a single docker log stream, use tail=0 to only follow new
+    lines, e.g. when reconnecting.
     If timeout is provided, the stream will be closed after no log line is received for the given timeout.
+    Framing can be "raw" or "sse" to receive plain lines or server-sent events instead of the base64 JSON envelope.
     """
-    stream = ContainerManager.get_container_log_by_name(container_name)
-
-    if timeout is not None:
-        return StreamingResponse(timeout_streamer(stream, timeout=timeout), media_type="text/plain")
-
-    return StreamingResponse(streamer(stream, heartbeats=0.1), media_type="text/plain")
+    return log_response(container_name, timeout, framing, tail)
 
 
 @index_router_v1.get("/stats", status_code=status.HTTP_200_OK)
@@ -1,14 +1,19 @@
 from functools import wraps
 from typing import Any, Callable, Optional, Tuple
 
-from commonwealth.utils.streaming import streamer, timeout_streamer
 from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import StreamingResponse
 from fastapi_versioning import versioned_api_route
 
+from api.logs import log_response
 from harbor import ContainerManager
 from harbor.exceptions import ContainerNotFound
-from harbor.models import ContainerModel, ContainerUsageModel
+from harbor.models import (
+    ContainerModel,
+    ContainerUsageModel,
+    ContainerUsageSampleModel,
+    LogFraming,
+)
 
 container_router_v2 = APIRouter(
     prefix="/container",
@@ -51,17 +56,20 @@ async def fetch_container(container_name: str) -> ContainerModel:
 
 @container_router_v2.get("/{container_name}/log", status_code=status.HTTP_200_OK)
 @container_to_http_exception
-async def fetch_log_by_container_name(container_name: str, timeout: Optional[int] = None) -> StreamingResponse:
+async def fetch_log_by_container_name(
+    container_name: str,
+    timeout: Optional[int] = None,
+    framing: LogFraming = LogFraming.ENVELOPE,
+    tail: Optional[int] = None,
+) -> StreamingResponse:
     """
-    Fetch logs of a given container.
+    Fetch logs of a given container, starting with its last tail lines, 500 by default, or its whole history with a
+    negative tail. Streams with up to 500 tail lines share a single docker log stream, use tail=0 to only follow new
+    lines, e.g. when reconnecting.
     If timeout is provided, the stream will be closed after no log line is received for the given timeout.
+    Framing can be "raw" or "sse" to receive plain lines or server-sent events instead of the base64 JSON envelope.
     """
-    stream = ContainerManager.get_container_log_by_name(container_name)
-
-    if timeout is not None:
-        return StreamingResponse(timeout_streamer(stream, timeout=timeout), media_type="text/plain")
-
-    return StreamingResponse(streamer(stream, heartbeats=0.1), media_type="text/plain")
+    return log_response(container_name, timeout, framing, tail)
 
 
 @container_router_v2.get("/stats", status_code=status.HTTP_200_OK)
@@ -80,3 +88,12 @@ async def fetch_stats_by_container_name(container_name: str) -> ContainerUsageMo
     List stats of a given running containers.
     """
     return await ContainerManager.get_container_stats_by_name(container_name)
+
+
+@container_router_v2.get("/{container_name}/stats/history", status_code=status.HTTP_200_OK)
+@container_to_http_exception
+async def fetch_stats_history_by_container_name(container_name: str) -> list[ContainerUsageSampleModel]:
+    """
+    List the recent stats samples of a given running container, oldest first.
+    """
+    return await ContainerManager.get_container_stats_history_by_name(container_name)
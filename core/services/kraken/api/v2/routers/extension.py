@@ -1,19 +1,24 @@
 import asyncio
 from functools import wraps
-from typing import Any, Callable, List, Tuple, cast
+from typing import Any, AsyncGenerator, Callable, List, Optional, Set, Tuple, cast
 
 from commonwealth.utils.streaming import streamer
 from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import Response, StreamingResponse
 from fastapi_versioning import versioned_api_route
+from loguru import logger
 
+from extension.admission import ResourceBudget
 from extension.exceptions import (
+    ExtensionInstallInProgress,
+    ExtensionInsufficientResources,
     ExtensionInsufficientStorage,
     ExtensionNotFound,
     ExtensionNotRunning,
 )
 from extension.extension import Extension
 from extension.models import ExtensionSource
+from extension.pull import PullProgress, PullStatus, PullTracker
 
 extension_router_v2 = APIRouter(
     prefix="/extension",
@@ -34,6 +39,8 @@ def extension_to_http_exception(endpoint: Callable[..., Any]) -> Callable[..., A
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)) from error
         except ExtensionInsufficientStorage as error:
             raise HTTPException(status_code=status.HTTP_507_INSUFFICIENT_STORAGE, detail=str(error)) from error
+        except (ExtensionInsufficientResources, ExtensionInstallInProgress) as error:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error)) from error
         except HTTPException as error:
             raise error
         except Exception as error:
@@ -42,6 +49,64 @@ def extension_to_http_exception(endpoint: Callable[..., Any]) -> Callable[..., A
     return wrapper
 
 
+# Keeps installs running in background while clients only follow their progress
+background_installs: Set["asyncio.Task[None]"] = set()
+
+
+async def progress_lines(tracker: PullTracker) -> AsyncGenerator[str, None]:
+    async for progress in tracker.watch():
+        yield progress.json() + "\n"
+
+
+async def run_install(install_stream: AsyncGenerator[bytes, None]) -> None:
+    try:
+        async for _ in install_stream:
+            pass
+    except Exception as error:
+        # Clients learn about the failure through the pull progress
+        logger.warning(f"Background install failed: {error}")
+
+
+def install_response(
+    extension: Extension, compact: bool, purge: Optional[bool] = None, atomic: bool = False
+) -> StreamingResponse:
+    """
+    Streams the raw docker pull messages, or newline separated aggregated progress events when compact is set.
+    Compact installs keep running if the client disconnects and can be followed again with the progress endpoints.
+    """
+    in_flight = PullTracker.get(extension.unique_entry)
+    if in_flight is not None and in_flight.status == PullStatus.PULLING:
+        # Only one pull per version, compact clients follow the ongoing one
+        if not compact:
+            raise ExtensionInstallInProgress(f"Extension {extension.identifier}:{extension.tag} is being installed")
+        return StreamingResponse(progress_lines(in_flight), media_type="application/x-ndjson")
+
+    # Reject before streaming so clients get a proper status code, the disk is reserved once the install runs
+    extension.check_admission()
+
+    # Streamed installs only start tracking once the client reads the stream, compact ones are always run
+    tracker = extension.begin_pull_tracking() if compact else None
+    if purge is None:
+        install_stream = extension.install(atomic=atomic, tracker=tracker)
+    else:
+        install_stream = extension.update(purge, tracker=tracker)
+
+    if tracker is None:
+        return StreamingResponse(streamer(install_stream))
+
+    task = asyncio.create_task(run_install(install_stream))
+    background_installs.add(task)
+    task.add_done_callback(background_installs.discard)
+    return StreamingResponse(progress_lines(tracker), media_type="application/x-ndjson")
+
+
+def get_pull_tracker(identifier: str, tag: str) -> PullTracker:
+    tracker = PullTracker.get(f"{identifier}{tag}")
+    if tracker is None:
+        raise ExtensionNotFound(f"No install of extension {identifier}:{tag} was started")
+    return tracker
+
+
 @extension_router_v2.get("/", status_code=status.HTTP_200_OK)
 @extension_to_http_exception
 async def fetch() -> list[ExtensionSource]:
@@ -52,6 +117,15 @@ async def fetch() -> list[ExtensionSource]:
     return [ext.source for ext in extensions]
 
 
+@extension_router_v2.get("/resources", status_code=status.HTTP_200_OK)
+@extension_to_http_exception
+async def fetch_resource_budget() -> ResourceBudget:
+    """
+    Storage reserved by ongoing installs and memory and CPU committed by enabled extensions against their budgets.
+    """
+    return Extension.resource_budget()
+
+
 @extension_router_v2.get("/{identifier}/details", status_code=status.HTTP_200_OK)
 @extension_to_http_exception
 async def fetch_by_identifier(identifier: str) -> list[ExtensionSource]:
@@ -74,33 +148,51 @@ async def fetch_by_identifier_and_tag(identifier: str, tag: str) -> ExtensionSou
 
 @extension_router_v2.post("/", status_code=status.HTTP_201_CREATED)
 @extension_to_http_exception
-async def install(body: ExtensionSource) -> StreamingResponse:
+async def install(body: ExtensionSource, compact: bool = False) -> StreamingResponse:
     """
     Install an extension by a custom source instead of the valid manifests, be careful with this endpoint because it
     can install incompatible extensions. Make sure to check the extension source before installing it.
     """
     extension = Extension(body)
-    return StreamingResponse(streamer(extension.install(atomic=True)))
+    return install_response(extension, compact, atomic=True)
 
 
 @extension_router_v2.post("/{identifier}/install", status_code=status.HTTP_201_CREATED)
 @extension_to_http_exception
-async def install_by_identifier(identifier: str, stable: bool = True) -> StreamingResponse:
+async def install_by_identifier(identifier: str, stable: bool = True, compact: bool = False) -> StreamingResponse:
     """
     Install latest version of an extension by its identifier using one of the current manifests.
     """
     extension: Extension = await Extension.from_latest(identifier, stable)
-    return StreamingResponse(streamer(extension.install()))
+    return install_response(extension, compact)
 
 
 @extension_router_v2.post("/{identifier}/{tag}/install", status_code=status.HTTP_201_CREATED)
 @extension_to_http_exception
-async def install_by_identifier_and_tag(identifier: str, tag: str) -> StreamingResponse:
+async def install_by_identifier_and_tag(identifier: str, tag: str, compact: bool = False) -> StreamingResponse:
     """
     Install a specific version of an extension by its identifier and tag using one of the current manifests.
     """
     extension = cast(Extension, await Extension.from_manifest(identifier, tag))
-    return StreamingResponse(streamer(extension.install()))
+    return install_response(extension, compact)
+
+
+@extension_router_v2.get("/{identifier}/{tag}/install/progress", status_code=status.HTTP_200_OK)
+@extension_to_http_exception
+async def fetch_install_progress(identifier: str, tag: str) -> PullProgress:
+    """
+    Aggregated image pull progress of the last install of a given extension version.
+    """
+    return get_pull_tracker(identifier, tag).progress()
+
+
+@extension_router_v2.get("/{identifier}/{tag}/install/progress/stream", status_code=status.HTTP_200_OK)
+@extension_to_http_exception
+async def follow_install_progress(identifier: str, tag: str) -> StreamingResponse:
+    """
+    Follow the aggregated image pull progress of a given extension version as newline separated JSON events.
+    """
+    return StreamingResponse(progress_lines(get_pull_tracker(identifier, tag)), media_type="application/x-ndjson")
 
 
 @extension_router_v2.post("/{identifier}/{tag}/enable", status_code=status.HTTP_204_NO_CONTENT)
@@ -135,24 +227,26 @@ async def restart(identifier: str) -> None:
 
 @extension_router_v2.put("/{identifier}", status_code=status.HTTP_200_OK)
 @extension_to_http_exception
-async def update_to_latest(identifier: str, purge: bool = True, stable: bool = True) -> StreamingResponse:
+async def update_to_latest(
+    identifier: str, purge: bool = True, stable: bool = True, compact: bool = False
+) -> StreamingResponse:
     """
     Update a given extension by its identifier to latest (stable or not) version on the higher priority manifest and
     by default purge all other tags, if purge is set to false it will keep all other versions disabled only.
     """
     extension = await Extension.from_latest(identifier, stable)
-    return StreamingResponse(streamer(extension.update(purge)))
+    return install_response(extension, compact, purge=purge)
 
 
 @extension_router_v2.put("/{identifier}/{tag}", status_code=status.HTTP_200_OK)
 @extension_to_http_exception
-async def update_to_tag(identifier: str, tag: str, purge: bool = True) -> Response:
+async def update_to_tag(identifier: str, tag: str, purge: bool = True, compact: bool = False) -> Response:
     """
     Update a given extension by its identifier and tag to latest version on the higher priority manifest and by default
     purge all other tags, if purge is set to false it will keep all other versions disabled only.
     """
     extension = cast(Extension, await Extension.from_manifest(identifier, tag))
-    return StreamingResponse(streamer(extension.update(purge)))
+    return install_response(extension, compact, purge=purge)
 
 
 @extension_router_v2.delete("/{identifier}", status_code=status.HTTP_202_ACCEPTED)
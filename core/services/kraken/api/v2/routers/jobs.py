@@ -33,9 +33,13 @@ def jobs_to_http_exception(endpoint: Callable[..., Any]) -> Callable[..., Any]:
 @jobs_router_v2.post("/{route:path}", status_code=status.HTTP_202_ACCEPTED)
 @jobs_to_http_exception
 async def create(
-    route: str, body: dict[str, Any] = Body(...), method: JobMethod = JobMethod.POST, retries: int = 5
+    route: str,
+    body: dict[str, Any] = Body(...),
+    method: JobMethod = JobMethod.POST,
+    retries: int = 5,
+    priority: int = 0,
 ) -> Job:
-    job = Job(id=str(uuid.uuid4()), route=route, method=method, body=body, retries=retries)
+    job = Job(id=str(uuid.uuid4()), route=route, method=method, body=body, retries=retries, priority=priority)
     JobsManager.add(job)
     return job
 
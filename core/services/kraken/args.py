@@ -11,11 +11,23 @@ class CommandLineArgs:
         debug (bool): Enable debug mode
         host (str): Host to server kraken on
         port (int): Port to server kraken on
+        max_concurrent_starts (int): Maximum number of dead extensions being started at the same time
+        max_concurrent_pulls (int): Maximum number of dead extension images being pulled at the same time
+        disk_margin (int): Storage in MB that must remain free after all ongoing extension pulls finish
+        memory_budget_ratio (float): Fraction of the total memory that can be committed to extensions
+        cpu_budget_ratio (float): Fraction of the CPUs that can be committed to extensions
     """
 
+    # pylint: disable=too-many-instance-attributes
+
     debug: bool
     host: str
     port: int
+    max_concurrent_starts: int
+    max_concurrent_pulls: int
+    disk_margin: int
+    memory_budget_ratio: float
+    cpu_budget_ratio: float
 
     @staticmethod
     def from_args() -> "CommandLineArgs":
@@ -24,8 +36,47 @@ class CommandLineArgs:
         parser.add_argument("--debug", action="store_true", default=False, help="Enable debug mode")
         parser.add_argument("--host", type=str, default="0.0.0.0", help="Host to server kraken on")
         parser.add_argument("--port", type=int, default=9134, help="Port to server kraken on")
+        parser.add_argument(
+            "--max-concurrent-starts",
+            type=int,
+            default=4,
+            help="Maximum number of dead extensions being started at the same time",
+        )
+        parser.add_argument(
+            "--max-concurrent-pulls",
+            type=int,
+            default=1,
+            help="Maximum number of dead extension images being pulled at the same time",
+        )
+        parser.add_argument(
+            "--disk-margin",
+            type=int,
+            default=256,
+            help="Storage in MB that must remain free after all ongoing extension pulls finish",
+        )
+        parser.add_argument(
+            "--memory-budget-ratio",
+            type=float,
+            default=0.8,
+            help="Fraction of the total memory that can be committed to extensions",
+        )
+        parser.add_argument(
+            "--cpu-budget-ratio",
+            type=float,
+            default=1.0,
+            help="Fraction of the CPUs that can be committed to extensions",
+        )
 
         args = parser.parse_args()
-        client_args = CommandLineArgs(debug=args.debug, host=args.host, port=args.port)
+        client_args = CommandLineArgs(
+            debug=args.debug,
+            host=args.host,
+            port=args.port,
+            max_concurrent_starts=args.max_concurrent_starts,
+            max_concurrent_pulls=args.max_concurrent_pulls,
+            disk_margin=args.disk_margin,
+            memory_budget_ratio=args.memory_budget_ratio,
+            cpu_budget_ratio=args.cpu_budget_ratio,
+        )
 
         return client_args
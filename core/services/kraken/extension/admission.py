@@ -0,0 +1,129 @@
+import os
+from typing import Any, Dict, List, Tuple
+
+import psutil
+from pydantic import BaseModel
+
+from extension.exceptions import (
+    ExtensionInsufficientResources,
+    ExtensionInsufficientStorage,
+)
+from utils import has_enough_disk_space
+
+
+class ResourceBudget(BaseModel):
+    disk_free: int
+    disk_reserved: int
+    disk_margin: int
+    memory_total: int
+    memory_budget: int
+    memory_committed: int
+    cpu_total: float
+    cpu_budget: float
+    cpu_committed: float
+    # Extensions being installed and the disk they have reserved
+    reservations: Dict[str, int]
+
+
+class AdmissionController:
+    """
+    Decides if an extension can be installed given the disk being used by ongoing pulls and the memory and CPU limits
+    (HostConfig) of the already enabled extensions. Extensions without limits are not accounted for.
+    """
+
+    # Disk that must remain free after all ongoing pulls finish
+    DISK_MARGIN = 256 * 2**20
+    # Fraction of the total memory and CPUs that can be committed to extensions
+    MEMORY_BUDGET_RATIO = 0.8
+    CPU_BUDGET_RATIO = 1.0
+
+    _disk_reservations: Dict[str, int] = {}
+
+    @classmethod
+    def configure(cls, disk_margin: int, memory_budget_ratio: float, cpu_budget_ratio: float) -> None:
+        cls.DISK_MARGIN = disk_margin
+        cls.MEMORY_BUDGET_RATIO = memory_budget_ratio
+        cls.CPU_BUDGET_RATIO = cpu_budget_ratio
+
+    @staticmethod
+    def limits(permissions: Any) -> Tuple[int, float]:
+        """
+        Memory in bytes and number of CPUs an extension is limited to by its permissions.
+        """
+        host_config = (permissions or {}).get("HostConfig") or {}
+        memory = int(host_config.get("Memory") or 0)
+
+        cpus = 0.0
+        if host_config.get("NanoCpus"):
+            cpus = host_config["NanoCpus"] / 1e9
+        elif host_config.get("CpuQuota") and host_config.get("CpuPeriod"):
+            cpus = host_config["CpuQuota"] / host_config["CpuPeriod"]
+        return memory, cpus
+
+    @classmethod
+    def _committed(cls, committed_permissions: List[Any]) -> Tuple[int, float]:
+        limits = [cls.limits(permissions) for permissions in committed_permissions]
+        return sum(memory for memory, _ in limits), sum(cpus for _, cpus in limits)
+
+    @classmethod
+    def _budgets(cls) -> Tuple[int, float]:
+        memory_budget = int(psutil.virtual_memory().total * cls.MEMORY_BUDGET_RATIO)
+        cpu_budget = (os.cpu_count() or 1) * cls.CPU_BUDGET_RATIO
+        return memory_budget, cpu_budget
+
+    @classmethod
+    def has_disk_space(cls, required_bytes: int) -> bool:
+        reserved = sum(cls._disk_reservations.values())
+        return has_enough_disk_space(required_bytes=required_bytes + reserved + cls.DISK_MARGIN)
+
+    @classmethod
+    def check_disk(cls, name: str, required_bytes: int) -> None:
+        if not cls.has_disk_space(required_bytes):
+            raise ExtensionInsufficientStorage(
+                f"Extension {name} requires at least {required_bytes / 2**20} MB free in storage, "
+                f"plus {sum(cls._disk_reservations.values()) / 2**20} MB reserved by ongoing installs."
+            )
+
+    @classmethod
+    def check_resources(cls, name: str, permissions: Any, committed_permissions: List[Any]) -> None:
+        memory, cpus = cls.limits(permissions)
+        committed_memory, committed_cpus = cls._committed(committed_permissions)
+        memory_budget, cpu_budget = cls._budgets()
+
+        if memory and committed_memory + memory > memory_budget:
+            raise ExtensionInsufficientResources(
+                f"Extension {name} requires {memory / 2**20} MB of memory but only "
+                f"{max(memory_budget - committed_memory, 0) / 2**20} MB are left for extensions."
+            )
+        if cpus and committed_cpus + cpus > cpu_budget:
+            raise ExtensionInsufficientResources(
+                f"Extension {name} requires {cpus} CPUs but only {max(cpu_budget - committed_cpus, 0)} are left "
+                "for extensions."
+            )
+
+    @classmethod
+    def reserve_disk(cls, key: str, name: str, required_bytes: int) -> None:
+        cls._disk_reservations.pop(key, None)
+        cls.check_disk(name, required_bytes)
+        cls._disk_reservations[key] = required_bytes
+
+    @classmethod
+    def release_disk(cls, key: str) -> None:
+        cls._disk_reservations.pop(key, None)
+
+    @classmethod
+    def budget(cls, committed_permissions: List[Any]) -> ResourceBudget:
+        committed_memory, committed_cpus = cls._committed(committed_permissions)
+        memory_budget, cpu_budget = cls._budgets()
+        return ResourceBudget(
+            disk_free=psutil.disk_usage("/").free,
+            disk_reserved=sum(cls._disk_reservations.values()),
+            disk_margin=cls.DISK_MARGIN,
+            memory_total=psutil.virtual_memory().total,
+            memory_budget=memory_budget,
+            memory_committed=committed_memory,
+            cpu_total=float(os.cpu_count() or 1),
+            cpu_budget=cpu_budget,
+            cpu_committed=committed_cpus,
+            reservations=dict(cls._disk_reservations),
+        )
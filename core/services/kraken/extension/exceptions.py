@@ -16,3 +16,11 @@ class IncompatibleExtension(Exception):
 
 class ExtensionInsufficientStorage(Exception):
     pass
+
+
+class ExtensionInsufficientResources(Exception):
+    pass
+
+
+class ExtensionInstallInProgress(Exception):
+    pass
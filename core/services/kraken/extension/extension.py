@@ -2,26 +2,28 @@ import asyncio
 import base64
 import json
 import time
-from typing import AsyncGenerator, Dict, List, Literal, Optional, Tuple, cast
+from typing import Any, AsyncGenerator, Dict, List, Literal, Optional, Tuple, cast
 
+from aiodocker import Docker
 from commonwealth.settings.manager import Manager
 from loguru import logger
 
 from config import SERVICE_NAME
+from extension.admission import AdmissionController, ResourceBudget
 from extension.exceptions import (
-    ExtensionInsufficientStorage,
     ExtensionNotFound,
     ExtensionNotRunning,
     ExtensionPullFailed,
     IncompatibleExtension,
 )
 from extension.models import ExtensionSource
+from extension.pull import PullStatus, PullTracker
+from extension.registry import ExtensionRegistry
 from harbor import ContainerManager, DockerCtx
 from harbor.exceptions import ContainerNotFound
 from manifest import ManifestManager
-from manifest.models import ExtensionVersion
+from manifest.models import ExtensionVersion, Image, RepositoryEntry
 from settings import ExtensionSettings, SettingsV2
-from utils import has_enough_disk_space
 
 
 class Extension:
@@ -36,10 +38,13 @@ class Extension:
 
     _manager: Manager = Manager(SERVICE_NAME, SettingsV2)
     _settings = _manager.settings
+    _registry = ExtensionRegistry()
 
-    def __init__(self, source: ExtensionSource, digest: Optional[str] = None) -> None:
+    def __init__(self, source: ExtensionSource, digest: Optional[str] = None, required_size: int = 0) -> None:
         self.source = source
         self.digest = digest
+        # Expanded size of the image, when known from the manifest
+        self.required_size = required_size
 
     @property
     def identifier(self) -> str:
@@ -77,20 +82,28 @@ class Extension:
     def reset_start_attempt(cls, key: str) -> None:
         cls.start_attempts.pop(key, None)
 
+    @classmethod
+    def registry(cls) -> ExtensionRegistry:
+        extensions = cast(List[ExtensionSettings], cls._settings.extensions)
+        if cls._registry.is_stale(extensions):
+            cls._registry.rebuild(extensions)
+        return cls._registry
+
     @classmethod
     def _fetch_settings(
         cls, identifier: Optional[str] = None, tag: Optional[str] = None
     ) -> List[ExtensionSettings] | ExtensionSettings:
-        extensions: List[ExtensionSettings] = [
-            ext
-            for ext in cast(List[ExtensionSettings], cls._settings.extensions)
-            if (identifier is None or ext.identifier == identifier) and (tag is None or ext.tag == tag)
-        ]
+        registry = cls.registry()
 
         if identifier is not None and tag is not None:
-            if not extensions:
+            extension = registry.get(identifier, tag)
+            if extension is None:
                 raise ExtensionNotFound(f"Extension {identifier}:{tag} not found")
-            return extensions[0]
+            return extension
+
+        extensions = registry.all() if identifier is None else registry.by_identifier(identifier)
+        if tag is not None:
+            extensions = [ext for ext in extensions if ext.tag == tag]
         return extensions
 
     def _save_settings(self, extension: Optional[ExtensionSettings] = None) -> None:
@@ -101,6 +114,7 @@ class Extension:
         ]
         if extension:
             self._settings.extensions.append(extension)
+        self._registry.rebuild(self._settings.extensions)
         self._manager.save()
 
     @classmethod
@@ -126,7 +140,75 @@ class Extension:
         finally:
             cls.unlock(container_name)
 
-    async def install(self, clear_remaining_tags: bool = True, atomic: bool = False) -> AsyncGenerator[bytes, None]:
+    async def _is_digest_available(self, client: Docker) -> bool:
+        if not self.digest:
+            return False
+        try:
+            image = await client.images.inspect(f"{self.source.docker}:{self.tag}")
+        except Exception:
+            return False
+        return any(repo_digest.endswith(f"@{self.digest}") for repo_digest in image.get("RepoDigests") or [])
+
+    def begin_pull_tracking(self) -> PullTracker:
+        return PullTracker.begin(self.unique_entry, self.identifier, self.tag)
+
+    @classmethod
+    def _committed_permissions(cls, excluded_identifier: Optional[str] = None) -> List[Any]:
+        registry = cls.registry()
+        return [
+            registry.permissions(ext) for ext in registry.all() if ext.enabled and ext.identifier != excluded_identifier
+        ]
+
+    @classmethod
+    def resource_budget(cls) -> ResourceBudget:
+        return AdmissionController.budget(cls._committed_permissions())
+
+    def check_admission(self) -> None:
+        """
+        Raises if installing this extension would exceed the storage, memory or CPU budgets.
+        """
+        name = f"{self.identifier}:{self.tag}"
+        permissions = json.loads(self.source.user_permissions or self.source.permissions or "{}")
+        # Other tags of the same extension are disabled during install, so they do not count
+        AdmissionController.check_resources(name, permissions, self._committed_permissions(self.identifier))
+        AdmissionController.check_disk(name, self.required_size)
+
+    def reserve(self) -> None:
+        """
+        Checks admission and reserves the disk needed by the install, the reservation is released when it ends.
+        """
+        self.check_admission()
+        AdmissionController.reserve_disk(self.unique_entry, f"{self.identifier}:{self.tag}", self.required_size)
+
+    async def install(
+        self,
+        clear_remaining_tags: bool = True,
+        atomic: bool = False,
+        tracker: Optional[PullTracker] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Pulls and enables the extension. The disk is only reserved once the stream is consumed, so a stream that is
+        never iterated holds no reservation.
+        """
+        tracker = tracker or self.begin_pull_tracking()
+        # Whatever happens the tracker must end, watchers of the install follow it until then
+        try:
+            self.reserve()
+            async for data in self._install(clear_remaining_tags, atomic, tracker):
+                yield data
+        except Exception as error:
+            if tracker.status == PullStatus.PULLING:
+                tracker.finish(str(error))
+            raise
+        finally:
+            # Stream consumer went away before the pull ended
+            if tracker.status == PullStatus.PULLING:
+                tracker.finish("Pull was interrupted")
+            AdmissionController.release_disk(self.unique_entry)
+
+    async def _install(
+        self, clear_remaining_tags: bool, atomic: bool, tracker: PullTracker
+    ) -> AsyncGenerator[bytes, None]:
         logger.info(f"Installing extension {self.identifier}:{self.tag}")
 
         # First we should make sure no other tag is running
@@ -160,15 +242,22 @@ class Extension:
 
             tag = f"{self.source.docker}:{self.tag}" + (f"@{self.digest}" if self.digest else "")
             async with DockerCtx() as client:
-                async for line in client.images.pull(
-                    tag, repo=self.source.docker, tag=self.tag, auth=docker_auth, stream=True
-                ):
-                    # TODO - Plug Error detection from docker image here
-                    yield json.dumps(line).encode("utf-8")
+                # Nothing needs to be downloaded if the exact image is already present
+                if await self._is_digest_available(client):
+                    logger.info(f"Image of extension {self.identifier}:{self.tag} is already present, skipping pull")
+                else:
+                    async for line in client.images.pull(
+                        tag, repo=self.source.docker, tag=self.tag, auth=docker_auth, stream=True
+                    ):
+                        tracker.update(line)
+                        yield json.dumps(line).encode("utf-8")
+                        if tracker.error:
+                            raise ExtensionPullFailed(tracker.error)
                 # Make sure to add correct tag if a digest was used since docker messes up the tag
                 if self.digest:
                     await client.images.tag(tag, f"{self.source.docker}:{self.tag}")
         except Exception as error:
+            tracker.finish(str(error))
             # In case of some external installs kraken shouldn't try to install it again so we remove from settings
             if atomic:
                 await self.uninstall()
@@ -186,9 +275,13 @@ class Extension:
             to_clear: List[Extension] = cast(List[Extension], await self.from_settings(self.identifier))
             to_clear = [version for version in to_clear if version.source.tag != self.tag]
             await asyncio.gather(*(version.uninstall() for version in to_clear))
+        # Watchers only see the install done once the other tags are gone
+        tracker.finish()
 
-    async def update(self, clear_remaining_tags: bool) -> AsyncGenerator[bytes, None]:
-        async for data in self.install(clear_remaining_tags):
+    async def update(
+        self, clear_remaining_tags: bool, tracker: Optional[PullTracker] = None
+    ) -> AsyncGenerator[bytes, None]:
+        async for data in self.install(clear_remaining_tags, tracker=tracker):
             yield data
 
     async def uninstall(self) -> None:
@@ -208,7 +301,32 @@ class Extension:
             # If its other exception we should just ignore since the main loop will take care
             pass
 
-    async def start(self) -> None:
+    async def is_image_available(self) -> bool:
+        async with DockerCtx() as client:
+            try:
+                await client.images.inspect(self.settings.fullname())
+                return True
+            except Exception:
+                return False
+
+    async def pull_image(self) -> None:
+        img_name = self.settings.fullname()
+        try:
+            logger.info(f"Image not found locally, going to pull extension {self.identifier}:{self.tag}")
+            self.lock(self.unique_entry)
+
+            tag = img_name + (f"@{self.digest}" if self.digest else "")
+            async with DockerCtx() as client:
+                await client.images.pull(tag, repo=self.source.docker, tag=self.tag)
+                # Make sure to add correct tag if a digest was used since docker messes up the tag
+                if self.digest:
+                    await client.images.tag(tag, img_name)
+        except Exception as error:
+            raise ExtensionPullFailed(f"Failed to pull extension {self.identifier}:{self.tag}") from error
+        finally:
+            self.unlock(self.unique_entry)
+
+    async def start(self, image_available: bool = False) -> None:
         logger.info(f"Starting extension {self.identifier}:{self.tag}")
         # Since some exts may keep restarting, we should keep track of attempts to start and avoid flooding
         # kraken main loop with start attempts
@@ -227,23 +345,11 @@ class Extension:
         config["HostConfig"]["LogConfig"] = {"Type": "json-file", "Config": {"max-size": "20m", "max-file": "3"}}
 
         try:
-            async with DockerCtx() as client:
-                # Checks if image exists locally, if not tries to pull it
-                try:
-                    await client.images.inspect(img_name)
-                except Exception:
-                    try:
-                        logger.info(f"Image not found locally, going to pull extension {self.identifier}:{self.tag}")
-                        self.lock(self.unique_entry)
-
-                        tag = img_name + (f"@{self.digest}" if self.digest else "")
-                        await client.images.pull(tag, repo=self.source.docker, tag=self.tag)
-                        # Make sure to add correct tag if a digest was used since docker messes up the tag
-                        if self.digest:
-                            await client.images.tag(tag, img_name)
-                    except Exception as error:
-                        raise ExtensionPullFailed(f"Failed to pull extension {self.identifier}:{self.tag}") from error
+            # Checks if image exists locally, if not tries to pull it
+            if not image_available and not await self.is_image_available():
+                await self.pull_image()
 
+            async with DockerCtx() as client:
                 container = await client.containers.create_or_replace(name=ext.container_name(), config=config)  # type: ignore
                 await container.start()
                 logger.info(f"Extension {self.identifier}:{self.tag} started")
@@ -251,8 +357,6 @@ class Extension:
         except Exception as error:
             logger.warning(f"Failed to start extension {self.identifier}:{self.tag}: {error}")
             raise ExtensionPullFailed(f"Failed to start extension {self.identifier}:{self.tag}: {error}") from error
-        finally:
-            self.unlock(self.unique_entry)
 
     async def restart(self) -> None:
         # Just kill the container and let the orchestrator restart it
@@ -297,22 +401,13 @@ class Extension:
             raise ExtensionNotFound(f"Extension {identifier} not found")
 
         if tag is None:
-            return [
-                Extension(
-                    ExtensionSource.from_repository_version(entry, v),
-                    Extension.get_compatible_digest(v, identifier),
-                )
-                for _, v in entry.versions.items()
-            ]
+            return [Extension._from_repository_version(entry, v) for _, v in entry.versions.items()]
 
         version = await manifest.fetch_extension_version(identifier, tag)
         if not version:
             raise ExtensionNotFound(f"Extension {identifier}:{tag} not found")
 
-        return Extension(
-            ExtensionSource.from_repository_version(entry, version),
-            Extension.get_compatible_digest(version, identifier),
-        )
+        return Extension._from_repository_version(entry, version)
 
     @classmethod
     async def from_running(cls, identifier: str) -> "Extension":
@@ -336,22 +431,30 @@ class Extension:
         if not version:
             raise ExtensionNotFound(f"Extension {identifier} has no" + ("stable" if stable else "") + "versions")
 
+        return Extension._from_repository_version(entry, version)
+
+    @staticmethod
+    def _from_repository_version(entry: RepositoryEntry, version: ExtensionVersion) -> "Extension":
         return Extension(
             ExtensionSource.from_repository_version(entry, version),
-            Extension.get_compatible_digest(version, identifier),
+            Extension.get_compatible_digest(version, entry.identifier),
+            Extension.get_compatible_image(version, entry.identifier).expanded_size,
         )
 
     @staticmethod
-    def get_compatible_digest(version: ExtensionVersion, identifier: str, validate_size: bool = True) -> str:
+    def get_compatible_image(version: ExtensionVersion, identifier: str) -> Image:
         compatible_images = [image for image in version.images if image.compatible]
 
         if not compatible_images or compatible_images[0].digest is None:
             raise IncompatibleExtension(f"Extension {identifier}:{version.tag} has no compatible images")
 
-        required_size = compatible_images[0].expanded_size
-        if validate_size and not has_enough_disk_space(required_bytes=required_size):
-            raise ExtensionInsufficientStorage(
-                f"Extension {identifier}:{version.tag} requires at least {required_size / 2**20} MB free in storage."
-            )
+        return compatible_images[0]
+
+    @staticmethod
+    def get_compatible_digest(version: ExtensionVersion, identifier: str, validate_size: bool = True) -> str:
+        image = Extension.get_compatible_image(version, identifier)
+
+        if validate_size:
+            AdmissionController.check_disk(f"{identifier}:{version.tag}", image.expanded_size)
 
-        return compatible_images[0].digest
+        return cast(str, image.digest)
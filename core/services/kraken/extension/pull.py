@@ -0,0 +1,157 @@
+import asyncio
+import time
+from enum import StrEnum
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from pydantic import BaseModel
+
+
+class PullStatus(StrEnum):
+    PULLING = "pulling"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class PullProgress(BaseModel):
+    identifier: str
+    tag: str
+    status: PullStatus
+    layers: int
+    layers_done: int
+    layers_cached: int
+    bytes_done: int
+    bytes_total: int
+    # Estimated remaining seconds, only known once some bytes were downloaded
+    eta: Optional[float] = None
+    error: Optional[str] = None
+
+
+class PullLayer:
+    def __init__(self) -> None:
+        self.current = 0
+        self.total = 0
+        self.cached = False
+        self.done = False
+
+
+class PullTracker:
+    """
+    Aggregates the per-layer messages of a docker pull stream so any number of clients can follow the same pull.
+    """
+
+    # Identity, outcome, layers and change notification are all needed to report the pull to its watchers
+    # pylint: disable=too-many-instance-attributes
+
+    # Minimum time between progress events sent to watchers
+    PROGRESS_INTERVAL = 0.5
+    # Time the outcome of a finished pull stays available to the progress endpoints
+    RETENTION = 60.0
+
+    # Ongoing and recently finished pull of each extension, by unique entry
+    _trackers: Dict[str, "PullTracker"] = {}
+
+    def __init__(self, key: str, identifier: str, tag: str) -> None:
+        self.key = key
+        self.identifier = identifier
+        self.tag = tag
+        self.status = PullStatus.PULLING
+        self.error: Optional[str] = None
+        self._layers: Dict[str, PullLayer] = {}
+        self._started_at = time.monotonic()
+        # Replaced on every change so each watcher is woken up regardless of when it last checked
+        self._changed = asyncio.Event()
+        self._version = 0
+
+    @classmethod
+    def begin(cls, key: str, identifier: str, tag: str) -> "PullTracker":
+        tracker = PullTracker(key, identifier, tag)
+        cls._trackers[key] = tracker
+        return tracker
+
+    @classmethod
+    def get(cls, key: str) -> Optional["PullTracker"]:
+        return cls._trackers.get(key)
+
+    @classmethod
+    def _forget(cls, tracker: "PullTracker") -> None:
+        # A newer pull of the same extension may have replaced it
+        if cls._trackers.get(tracker.key) is tracker:
+            del cls._trackers[tracker.key]
+
+    def update(self, line: Dict[str, Any]) -> None:
+        if "error" in line:
+            self.error = str(line["error"])
+            self._notify()
+            return
+
+        layer_id = line.get("id")
+        status = str(line.get("status", ""))
+        # Lines without id are about the image as a whole (e.g: "Pulling from", "Digest", "Status")
+        if not layer_id or status.startswith("Pulling from"):
+            return
+
+        layer = self._layers.setdefault(layer_id, PullLayer())
+        detail = line.get("progressDetail") or {}
+        if status == "Downloading":
+            layer.current = detail.get("current", layer.current)
+            layer.total = detail.get("total", layer.total)
+        elif status == "Download complete":
+            layer.current = layer.total
+        elif status == "Already exists":
+            layer.cached = True
+            layer.done = True
+        elif status == "Pull complete":
+            layer.current = layer.total
+            layer.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.error = error or self.error
+        self.status = PullStatus.FAILED if error else PullStatus.DONE
+        self._notify()
+        try:
+            asyncio.get_running_loop().call_later(self.RETENTION, PullTracker._forget, self)
+        except RuntimeError:
+            PullTracker._forget(self)
+
+    def progress(self) -> PullProgress:
+        layers = self._layers.values()
+        bytes_done = sum(layer.current for layer in layers)
+        bytes_total = sum(layer.total for layer in layers)
+
+        eta = None
+        elapsed = time.monotonic() - self._started_at
+        if self.status == PullStatus.PULLING and bytes_done > 0 and elapsed > 0:
+            eta = (bytes_total - bytes_done) / (bytes_done / elapsed)
+
+        return PullProgress(
+            identifier=self.identifier,
+            tag=self.tag,
+            status=self.status,
+            layers=len(self._layers),
+            layers_done=sum(1 for layer in layers if layer.done),
+            layers_cached=sum(1 for layer in layers if layer.cached),
+            bytes_done=bytes_done,
+            bytes_total=bytes_total,
+            eta=eta,
+            error=self.error,
+        )
+
+    async def watch(self) -> AsyncGenerator[PullProgress, None]:
+        """
+        Yields the aggregated progress whenever it changes, at most once every PROGRESS_INTERVAL, until the pull ends.
+        """
+        version: Optional[int] = None
+        while True:
+            if version == self._version:
+                await self._changed.wait()
+            version = self._version
+            yield self.progress()
+            if self.status != PullStatus.PULLING:
+                return
+            await asyncio.sleep(self.PROGRESS_INTERVAL)
@@ -0,0 +1,56 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from settings import ExtensionSettings
+
+
+class ExtensionRegistry:
+    """
+    Indexes over the extension settings list, rebuilt every time the list is replaced.
+    """
+
+    def __init__(self) -> None:
+        self._source: Optional[List[ExtensionSettings]] = None
+        self._by_entry: Dict[Tuple[str, str], ExtensionSettings] = {}
+        self._by_identifier: Dict[str, List[ExtensionSettings]] = {}
+        self._by_container_name: Dict[str, ExtensionSettings] = {}
+        # Parsed permissions together with the raw JSON they were parsed from
+        self._permissions: Dict[Tuple[str, str], Tuple[str, Any]] = {}
+
+    def is_stale(self, extensions: List[ExtensionSettings]) -> bool:
+        return extensions is not self._source
+
+    def rebuild(self, extensions: List[ExtensionSettings]) -> None:
+        self._source = extensions
+        self._by_entry = {}
+        self._by_identifier = {}
+        self._by_container_name = {}
+        for extension in extensions:
+            self._by_entry.setdefault((extension.identifier, extension.tag), extension)
+            self._by_identifier.setdefault(extension.identifier, []).append(extension)
+            self._by_container_name.setdefault(extension.container_name(), extension)
+        self._permissions = {key: value for key, value in self._permissions.items() if key in self._by_entry}
+
+    def all(self) -> List[ExtensionSettings]:
+        return list(self._source or [])
+
+    def get(self, identifier: str, tag: str) -> Optional[ExtensionSettings]:
+        return self._by_entry.get((identifier, tag))
+
+    def by_identifier(self, identifier: str) -> List[ExtensionSettings]:
+        return list(self._by_identifier.get(identifier, []))
+
+    def container_names(self) -> Set[str]:
+        return set(self._by_container_name.keys())
+
+    def permissions(self, extension: ExtensionSettings) -> Any:
+        """
+        Parsed permissions of the extension, shared between callers so it must not be modified.
+        Use ExtensionSettings.settings() to get a copy that can be changed.
+        """
+        key = (extension.identifier, extension.tag)
+        raw = extension.user_permissions or extension.permissions
+        cached = self._permissions.get(key)
+        if cached is None or cached[0] != raw:
+            cached = (raw, extension.settings())
+            self._permissions[key] = cached
+        return cached[1]
@@ -1,5 +1,8 @@
 # pylint: disable=W0406
+from harbor.cache import ContainerCache
 from harbor.container import ContainerManager
 from harbor.contexts import DockerCtx
+from harbor.logs import ContainerLogHub
+from harbor.stats import ContainerStatsSampler
 
-__all__ = ["ContainerManager", "DockerCtx"]
+__all__ = ["ContainerCache", "ContainerLogHub", "ContainerManager", "ContainerStatsSampler", "DockerCtx"]
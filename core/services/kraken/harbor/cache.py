@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from aiodocker import Docker
+from loguru import logger
+
+from harbor.contexts import DockerCtx
+from harbor.models import ContainerModel
+
+
+class ContainerCache:
+    """
+    In-memory table of running containers, kept up to date by the docker events stream.
+    A full listing is done after every (re)connection and periodically as a safety net for missed events.
+    """
+
+    # Time between full reconciliations with the daemon
+    RECONCILE_INTERVAL = 60.0
+    # Time to wait before reconnecting after the events stream ends or fails
+    RECONNECT_DELAY = 5.0
+    # Actions that may change the state of a running container and require it to be fetched again
+    REFRESH_ACTIONS = {"create", "start", "restart", "unpause", "rename", "update"}
+    # Actions after which a container is no longer running, "kill" is left out since signals may not stop it
+    REMOVE_ACTIONS = {"die", "destroy", "pause"}
+    # Maximum age of the statuses returned to readers, they include the uptime of each container
+    STATUS_MAX_AGE = 10.0
+
+    _containers: Dict[str, ContainerModel] = {}
+    _synced: bool = False
+    # Incremented on every event so reconciliations racing with events can be discarded
+    _generation: int = 0
+    _is_running: bool = True
+    _status_updated: float = 0.0
+    _status_lock = asyncio.Lock()
+
+    @staticmethod
+    def _to_model(container: Dict[str, Any]) -> ContainerModel:
+        return ContainerModel(
+            name=container["Names"][0],
+            image=container["Image"],
+            image_id=container["ImageID"],
+            status=container["Status"],
+        )
+
+    @classmethod
+    async def _list_running(
+        cls, client: Docker, filters: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[str, ContainerModel]:
+        containers = await client.containers.list(filters={"status": ["running"], **(filters or {})})  # type: ignore
+        return {container["Id"]: cls._to_model(container) for container in containers}
+
+    @classmethod
+    def is_synced(cls) -> bool:
+        return cls._synced
+
+    @classmethod
+    def containers(cls) -> List[ContainerModel]:
+        return list(cls._containers.values())
+
+    @classmethod
+    def get_by_name(cls, container_name: str) -> Optional[ContainerModel]:
+        # Docker name filters match substrings, exact matches are preferred
+        name = f"/{container_name.lstrip('/')}"
+        containers = cls._containers.values()
+        return next((container for container in containers if container.name == name), None) or next(
+            (container for container in containers if container_name in container.name), None
+        )
+
+    @classmethod
+    async def reconcile(cls) -> None:
+        generation = cls._generation
+        containers = await cls._list_running(DockerCtx.client())
+        # Events processed during the listing are newer than the listing itself
+        if generation != cls._generation:
+            return
+        cls._containers = containers
+        cls._status_updated = time.monotonic()
+
+    @classmethod
+    async def refresh_status(cls) -> None:
+        """Reconcile when the cached statuses are older than STATUS_MAX_AGE, events don't update the uptime"""
+        async with cls._status_lock:
+            if time.monotonic() - cls._status_updated >= cls.STATUS_MAX_AGE:
+                await cls.reconcile()
+
+    @classmethod
+    async def _handle_event(cls, event: Dict[str, Any]) -> None:
+        cls._generation += 1
+        action = event.get("Action", "")
+        container_id = event.get("Actor", {}).get("ID") or event.get("id")
+        if not container_id:
+            return
+
+        if action in cls.REMOVE_ACTIONS:
+            cls._containers.pop(container_id, None)
+        elif action in cls.REFRESH_ACTIONS or action.startswith("health_status"):
+            containers = await cls._list_running(DockerCtx.client(), {"id": [container_id]})
+            if container_id in containers:
+                cls._containers[container_id] = containers[container_id]
+            else:
+                cls._containers.pop(container_id, None)
+
+    @classmethod
+    async def _follow_events(cls) -> None:
+        client = DockerCtx.client()
+        subscriber = client.events.subscribe(create_task=False)  # type: ignore
+        events_task = asyncio.create_task(
+            client.events.run(filters=json.dumps({"type": ["container"]}))  # type: ignore
+        )
+        try:
+            # Listing after subscribing guarantees no event is lost between both
+            await cls.reconcile()
+            cls._synced = True
+            logger.info(f"Container cache synced with {len(cls._containers)} running containers.")
+
+            next_reconcile = time.monotonic() + cls.RECONCILE_INTERVAL
+            while cls._is_running:
+                if time.monotonic() >= next_reconcile:
+                    await cls.reconcile()
+                    next_reconcile = time.monotonic() + cls.RECONCILE_INTERVAL
+                try:
+                    event = await asyncio.wait_for(
+                        subscriber.get(), timeout=max(0.0, next_reconcile - time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    continue
+                # The daemon closed the stream
+                if event is None:
+                    break
+                await cls._handle_event(event)
+        finally:
+            cls._synced = False
+            events_task.cancel()
+            try:
+                await events_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    @classmethod
+    async def start(cls) -> None:
+        while cls._is_running:
+            try:
+                await cls._follow_events()
+                logger.warning("Docker events stream ended.")
+            except Exception as error:
+                logger.error(f"Unable to follow docker events: {error}")
+            await asyncio.sleep(cls.RECONNECT_DELAY)
+
+    @classmethod
+    def stop(cls) -> None:
+        cls._is_running = False
@@ -1,5 +1,5 @@
 import asyncio
-from typing import AsyncGenerator, Dict, List, cast
+from typing import AsyncGenerator, Dict, List, Optional, cast
 
 import psutil
 from aiodocker import Docker
@@ -8,9 +8,12 @@ from commonwealth.utils.apis import StackedHTTPException
 from fastapi import status
 from loguru import logger
 
+from harbor.cache import ContainerCache
 from harbor.contexts import DockerCtx
 from harbor.exceptions import ContainerNotFound
-from harbor.models import ContainerModel, ContainerUsageModel
+from harbor.logs import ContainerLogHub
+from harbor.models import ContainerModel, ContainerUsageModel, ContainerUsageSampleModel
+from harbor.stats import ContainerStatsSampler, usage_from_stats
 
 
 class ContainerManager:
@@ -31,7 +34,6 @@ class ContainerManager:
             await container.wait()
 
     @staticmethod
-    # pylint: disable=too-many-locals
     async def _get_stats_from_containers(containers: List[DockerContainer]) -> Dict[str, ContainerUsageModel]:
         result: Dict[str, ContainerUsageModel] = {}
 
@@ -50,43 +52,17 @@ class ContainerManager:
 
         total_disk_size = psutil.disk_usage("/").total
         for stats, show in zip(container_stats, container_shows):
-            # Based over: https://github.com/docker/cli/blob/v20.10.20/cli/command/container/stats_helpers.go
-            cpu_percent = 0
-
-            previous_cpu = stats.get("precpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0)
-            previous_system_cpu = stats.get("precpu_stats", {}).get("system_cpu_usage", 0)
-
-            cpu_total = stats.get("cpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0)
-            cpu_delta = cpu_total - previous_cpu
-
-            cpu_system = stats.get("cpu_stats", {}).get("system_cpu_usage", 0)
-            system_delta = cpu_system - previous_system_cpu
-
-            if system_delta > 0.0 and cpu_delta > 0.0:
-                cpu_percent = (cpu_delta / system_delta) * 100.0
-
-            try:
-                memory_usage = 100 * stats["memory_stats"]["usage"] / stats["memory_stats"]["limit"]
-            except KeyError:
-                memory_usage = "N/A"
-
-            try:
-                disk_usage = 100 * show["SizeRootFs"] / total_disk_size
-            except KeyError:
-                disk_usage = "N/A"
-
             name = stats.get("name", "unknown").replace("/", "")
-
-            result[name] = ContainerUsageModel(
-                cpu=cpu_percent,
-                memory=memory_usage,
-                disk=disk_usage,
-            )
+            result[name] = usage_from_stats(stats, show.get("SizeRootFs"), total_disk_size)
 
         return result
 
     @staticmethod
     async def get_running_containers() -> List[ContainerModel]:
+        if ContainerCache.is_synced():
+            await ContainerCache.refresh_status()
+            return ContainerCache.containers()
+
         async with DockerCtx() as client:
             containers = await client.containers.list(filters={"status": ["running"]})  # type: ignore
 
@@ -102,6 +78,13 @@ class ContainerManager:
 
     @classmethod
     async def get_running_container_by_name(cls, container_name: str) -> ContainerModel:
+        if ContainerCache.is_synced():
+            await ContainerCache.refresh_status()
+            cached = ContainerCache.get_by_name(container_name)
+            if cached is not None:
+                return cached
+
+        # Only running containers are cached, stopped ones are still looked up on the daemon
         async with DockerCtx() as client:
             container = await cls.get_raw_container_by_name(client, container_name)
 
@@ -113,19 +96,23 @@ class ContainerManager:
             )
 
     @classmethod
-    async def get_container_log_by_name(cls, container_name: str) -> AsyncGenerator[str, None]:
+    async def get_container_log_by_name(
+        cls, container_name: str, timeout: Optional[float] = None, tail: Optional[int] = None
+    ) -> AsyncGenerator[str, None]:
         async with DockerCtx() as client:
             try:
                 container = await cls.get_raw_container_by_name(client, container_name)
             except ContainerNotFound as error:
                 raise StackedHTTPException(status_code=status.HTTP_404_NOT_FOUND, error=error) from error
 
-            async for log_line in container.log(stdout=True, stderr=True, follow=True, stream=True):  # type: ignore
-                yield log_line
-            logger.info(f"Finished streaming logs for {container_name}")
+        async for log_line in ContainerLogHub.subscribe(container, container["Names"][0].lstrip("/"), timeout, tail):
+            yield log_line
 
     @classmethod
     async def get_containers_stats(cls) -> Dict[str, ContainerUsageModel]:
+        if ContainerStatsSampler.is_sampling():
+            return await ContainerStatsSampler.usage()
+
         async with DockerCtx() as client:
             containers = await client.containers.list()  # type: ignore
 
@@ -133,9 +120,17 @@ class ContainerManager:
 
     @classmethod
     async def get_container_stats_by_name(cls, container_name: str) -> ContainerUsageModel:
+        usage = await ContainerStatsSampler.usage_by_name(container_name)
+        if usage is not None:
+            return usage
+
         async with DockerCtx() as client:
             container = await cls.get_raw_container_by_name(client, container_name)
 
             result = await cls._get_stats_from_containers([container])
 
             return next(iter(result.values()))
+
+    @staticmethod
+    async def get_container_stats_history_by_name(container_name: str) -> List[ContainerUsageSampleModel]:
+        return ContainerStatsSampler.history_by_name(container_name)
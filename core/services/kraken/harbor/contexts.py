@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional
 
 from aiodocker import Docker
 
@@ -6,13 +6,25 @@ from aiodocker import Docker
 class DockerCtx:
     """
     Context manager for Docker clients.
+    All contexts share a single client that lives for the whole process, call DockerCtx.close() on shutdown.
     """
 
-    def __init__(self) -> None:
-        self._client: Docker = Docker()
+    _client: Optional[Docker] = None
+
+    @classmethod
+    def client(cls) -> Docker:
+        if cls._client is None:
+            cls._client = Docker()
+        return cls._client
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._client is not None:
+            client, cls._client = cls._client, None
+            await client.close()
 
     async def __aenter__(self) -> Docker:
-        return self._client
+        return self.client()
 
     async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
-        await self._client.close()
+        pass
@@ -0,0 +1,132 @@
+import asyncio
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Deque, Dict, Optional, Set
+
+from aiodocker.containers import DockerContainer
+from commonwealth.utils.streaming import Broadcaster
+from loguru import logger
+
+
+async def _next_line(lines: AsyncIterator[str], timeout: Optional[float]) -> Optional[str]:
+    try:
+        return await asyncio.wait_for(anext(lines), timeout=timeout)
+    except (asyncio.TimeoutError, StopAsyncIteration):
+        return None
+
+
+class LogChannel(Broadcaster[Optional[str]]):
+    """
+    Single docker log stream of a container, shared by all of its subscribers. None is published when it ends.
+    """
+
+    def __init__(self, name: str, tail_size: int, queue_size: int) -> None:
+        super().__init__(queue_size)
+        self.name = name
+        self.tail: Deque[str] = deque(maxlen=tail_size)
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    def publish(self, message: Optional[str]) -> None:
+        if message is not None:
+            self.tail.append(message)
+        super().publish(message)
+
+    def subscribe_tail(self, tail: int) -> "asyncio.Queue[Optional[str]]":
+        # Late joiners start with the most recent lines
+        count = min(tail, len(self.tail), self.queue_size)
+        return self.subscribe(list(self.tail)[len(self.tail) - count :])
+
+
+class ContainerLogHub:
+    """
+    Keeps at most one docker log stream per container and fans it out to every subscriber, late joiners get their
+    past lines from the tail kept by the stream. Only subscribers asking for more history than that tail get a docker
+    stream of their own.
+    """
+
+    # Lines kept for late joiners, the longest tail served from the shared stream
+    TAIL_SIZE = 500
+    # Lines buffered for each subscriber before the oldest ones are dropped
+    QUEUE_SIZE = 1000
+    # Time the docker stream is kept open after the last subscriber leaves
+    LINGER_TIME = 10.0
+
+    _channels: Dict[str, LogChannel] = {}
+    _release_tasks: Set["asyncio.Task[None]"] = set()
+
+    @classmethod
+    async def _follow(cls, container: DockerContainer, channel: LogChannel, tail: int) -> None:
+        try:
+            async for line in container.log(stdout=True, stderr=True, follow=True, tail=tail):  # type: ignore
+                channel.publish(line)
+            logger.info(f"Finished streaming logs for {channel.name}")
+        except Exception as error:
+            logger.warning(f"Log stream of {channel.name} failed: {error}")
+        finally:
+            if cls._channels.get(channel.name) is channel:
+                cls._channels.pop(channel.name)
+            channel.publish(None)
+
+    @classmethod
+    async def _release(cls, channel: LogChannel) -> None:
+        await asyncio.sleep(cls.LINGER_TIME)
+        if not channel.subscribers and channel.task is not None:
+            channel.task.cancel()
+
+    @staticmethod
+    async def _own_stream(container: DockerContainer, tail: int, timeout: Optional[float]) -> AsyncGenerator[str, None]:
+        lines = container.log(stdout=True, stderr=True, follow=True, tail="all" if tail < 0 else tail)  # type: ignore
+        try:
+            while (line := await _next_line(lines, timeout)) is not None:
+                yield line
+        finally:
+            await lines.aclose()
+
+    @classmethod
+    async def _shared_stream(
+        cls, container: DockerContainer, name: str, tail: int, timeout: Optional[float]
+    ) -> AsyncGenerator[str, None]:
+        channel = cls._channels.get(name)
+        if channel is None:
+            channel = LogChannel(name, cls.TAIL_SIZE, cls.QUEUE_SIZE)
+            cls._channels[name] = channel
+            # The first subscriber receives its tail from docker, before the stream starts publishing
+            queue = channel.subscribe()
+            channel.task = asyncio.create_task(cls._follow(container, channel, tail))
+        else:
+            queue = channel.subscribe_tail(tail)
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    return
+                if line is None:
+                    return
+                yield line
+        finally:
+            channel.unsubscribe(queue)
+            if not channel.subscribers:
+                task = asyncio.create_task(cls._release(channel))
+                cls._release_tasks.add(task)
+                task.add_done_callback(cls._release_tasks.discard)
+
+    @classmethod
+    async def subscribe(
+        cls, container: DockerContainer, name: str, timeout: Optional[float] = None, tail: Optional[int] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Yields the last tail lines of the container log, TAIL_SIZE if not provided, followed by new ones until the
+        container stops. If timeout is provided, it also stops after no line is received for the given timeout.
+        Tails up to TAIL_SIZE share a single docker stream, a late joiner gets at most the lines kept since it started.
+        Longer tails, or the whole history with a negative tail, need a docker stream of their own.
+        """
+        tail = cls.TAIL_SIZE if tail is None else tail
+        if 0 <= tail <= cls.TAIL_SIZE:
+            stream = cls._shared_stream(container, name, tail, timeout)
+        else:
+            stream = cls._own_stream(container, tail, timeout)
+        try:
+            async for line in stream:
+                yield line
+        finally:
+            await stream.aclose()
@@ -1,3 +1,5 @@
+from enum import StrEnum
+
 from pydantic import BaseModel
 
 
@@ -12,3 +14,16 @@ class ContainerUsageModel(BaseModel):
     cpu: float
     memory: float | str
     disk: int | str
+
+
+class ContainerUsageSampleModel(ContainerUsageModel):
+    timestamp: float
+
+
+class LogFraming(StrEnum):
+    # JSON envelope with base64 data, as done by commonwealth streamer
+    ENVELOPE = "envelope"
+    # Log lines as they are
+    RAW = "raw"
+    # Server-sent events, one event per line
+    SSE = "sse"
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import psutil
+from loguru import logger
+
+from harbor.cache import ContainerCache
+from harbor.contexts import DockerCtx
+from harbor.exceptions import ContainerNotFound
+from harbor.models import ContainerUsageModel, ContainerUsageSampleModel
+
+
+def usage_from_stats(stats: Dict[str, Any], size_root_fs: Optional[int], total_disk_size: int) -> ContainerUsageModel:
+    # Based over: https://github.com/docker/cli/blob/v20.10.20/cli/command/container/stats_helpers.go
+    cpu_percent = 0.0
+
+    previous_cpu = stats.get("precpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0)
+    previous_system_cpu = stats.get("precpu_stats", {}).get("system_cpu_usage", 0)
+
+    cpu_total = stats.get("cpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0)
+    cpu_delta = cpu_total - previous_cpu
+
+    cpu_system = stats.get("cpu_stats", {}).get("system_cpu_usage", 0)
+    system_delta = cpu_system - previous_system_cpu
+
+    if system_delta > 0.0 and cpu_delta > 0.0:
+        cpu_percent = (cpu_delta / system_delta) * 100.0
+
+    memory_usage: float | str
+    try:
+        memory_usage = 100 * stats["memory_stats"]["usage"] / stats["memory_stats"]["limit"]
+    except (KeyError, ZeroDivisionError):
+        memory_usage = "N/A"
+
+    disk_usage: float | str = "N/A" if size_root_fs is None else 100 * size_root_fs / total_disk_size
+
+    return ContainerUsageModel(cpu=cpu_percent, memory=memory_usage, disk=disk_usage)
+
+
+class ContainerStatsSampler:
+    """
+    Keeps one streaming stats request per running container and a bounded history of the computed usage.
+    Disk usage requires docker to walk the whole container filesystem, so it is refreshed on a much slower cadence.
+    """
+
+    # Samples kept per container, docker streams stats about once per second
+    HISTORY_SIZE = 300
+    # Time between checks for started or stopped containers
+    SYNC_INTERVAL = 5.0
+    # Time between disk usage refreshes
+    DISK_REFRESH_INTERVAL = 300.0
+
+    _tasks: Dict[str, "asyncio.Task[None]"] = {}
+    _history: Dict[str, Deque[ContainerUsageSampleModel]] = {}
+    _size_root_fs: Dict[str, int] = {}
+    _is_running: bool = True
+
+    @classmethod
+    async def _fetch_usage(cls, name: str, total_disk_size: int) -> Optional[ContainerUsageModel]:
+        # Disk usage is left to the background refresh, walking the container filesystem is too slow for a request
+        container = DockerCtx.client().containers.container(name)  # type: ignore
+        try:
+            stats = await container.stats(stream=False)  # type: ignore
+        except Exception as error:
+            logger.debug(f"Unable to fetch usage of {name}: {error}")
+            return None
+        return usage_from_stats(stats[0], cls._size_root_fs.get(name), total_disk_size) if stats else None
+
+    @classmethod
+    async def usage(cls) -> Dict[str, ContainerUsageModel]:
+        result = {name: ContainerUsageModel(**history[-1].dict()) for name, history in cls._history.items() if history}
+        # Containers whose stream did not deliver its first sample yet are fetched directly
+        pending = [name for name in cls._tasks if name not in result]
+        if pending:
+            total_disk_size = psutil.disk_usage("/").total
+            usages = await asyncio.gather(*(cls._fetch_usage(name, total_disk_size) for name in pending))
+            result.update({name: usage for name, usage in zip(pending, usages) if usage is not None})
+        return result
+
+    @classmethod
+    async def usage_by_name(cls, container_name: str) -> Optional[ContainerUsageModel]:
+        name = container_name.lstrip("/")
+        history = cls._history.get(name)
+        if history:
+            return ContainerUsageModel(**history[-1].dict())
+        if name in cls._tasks:
+            return await cls._fetch_usage(name, psutil.disk_usage("/").total)
+        return None
+
+    @classmethod
+    def history_by_name(cls, container_name: str) -> List[ContainerUsageSampleModel]:
+        name = container_name.lstrip("/")
+        if name not in cls._history:
+            raise ContainerNotFound(f"Container {container_name} not found in sampled containers")
+        return list(cls._history[name])
+
+    @classmethod
+    def is_sampling(cls) -> bool:
+        return bool(cls._tasks)
+
+    @classmethod
+    async def _sample(cls, name: str) -> None:
+        total_disk_size = psutil.disk_usage("/").total
+        container = DockerCtx.client().containers.container(name)  # type: ignore
+        history = cls._history.setdefault(name, deque(maxlen=cls.HISTORY_SIZE))
+        try:
+            async for stats in container.stats(stream=True):  # type: ignore
+                usage = usage_from_stats(stats, cls._size_root_fs.get(name), total_disk_size)
+                history.append(ContainerUsageSampleModel(timestamp=time.time(), **usage.dict()))
+        except Exception as error:
+            logger.warning(f"Stats stream of {name} ended: {error}")
+        finally:
+            cls._tasks.pop(name, None)
+
+    @classmethod
+    async def _sync(cls) -> None:
+        running = {container.name.lstrip("/") for container in ContainerCache.containers()}
+
+        for name in running - cls._tasks.keys():
+            cls._tasks[name] = asyncio.create_task(cls._sample(name))
+
+        for name in cls._tasks.keys() - running:
+            cls._tasks[name].cancel()
+        for name in cls._history.keys() - running:
+            cls._history.pop(name, None)
+            cls._size_root_fs.pop(name, None)
+
+    @classmethod
+    async def _refresh_disk_usage(cls, names: List[str]) -> None:
+        # Done one container at a time to keep the load on the storage low
+        for name in names:
+            try:
+                show = await DockerCtx.client().containers.container(name).show(size=1)  # type: ignore
+                cls._size_root_fs[name] = show["SizeRootFs"]
+            except Exception as error:
+                logger.debug(f"Unable to fetch disk usage of {name}: {error}")
+
+    @classmethod
+    async def start_disk_task(cls) -> None:
+        last_full_refresh = 0.0
+        while cls._is_running:
+            # Newly started containers get their disk usage right away, the others only every DISK_REFRESH_INTERVAL
+            if time.monotonic() - last_full_refresh >= cls.DISK_REFRESH_INTERVAL:
+                last_full_refresh = time.monotonic()
+                await cls._refresh_disk_usage(list(cls._tasks.keys()))
+            else:
+                await cls._refresh_disk_usage([name for name in cls._tasks if name not in cls._size_root_fs])
+            await asyncio.sleep(cls.SYNC_INTERVAL)
+
+    @classmethod
+    async def start(cls) -> None:
+        disk_task = asyncio.create_task(cls.start_disk_task())
+        try:
+            while cls._is_running:
+                # Container table is only meaningful while it follows docker events
+                if ContainerCache.is_synced():
+                    await cls._sync()
+                await asyncio.sleep(cls.SYNC_INTERVAL)
+        finally:
+            disk_task.cancel()
+            for task in list(cls._tasks.values()):
+                task.cancel()
+
+    @classmethod
+    def stop(cls) -> None:
+        cls._is_running = False
@@ -1,4 +1,4 @@
 from jobs.jobs import JobsManager
-from jobs.models import Job
+from jobs.models import Job, JobState
 
-__all__ = ["Job", "JobsManager"]
+__all__ = ["Job", "JobState", "JobsManager"]
@@ -1,68 +1,195 @@
 import asyncio
-from typing import List, Optional
+import itertools
+import json
+import pathlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
 
 import aiohttp
+import appdirs
 from loguru import logger
 
+from config import SERVICE_NAME
 from jobs.exceptions import JobNotFound
-from jobs.models import Job
+from jobs.models import Job, JobState
 
 
 class JobsManager:
-    _jobs: List[Job] = []
-    _executing_job: Optional[Job] = None
+    # Number of jobs executed at the same time
+    WORKERS = 2
+    # Delay before the first retry of a failed job, doubled on each attempt up to MAX_RETRY_DELAY
+    RETRY_DELAY = 5.0
+    MAX_RETRY_DELAY = 300.0
+    # Number of finished or failed jobs kept to be queried
+    HISTORY_SIZE = 50
+    # Pending jobs are persisted so they are resumed after a restart
+    JOBS_FILE = pathlib.Path(appdirs.user_config_dir(SERVICE_NAME), "jobs.json")
+    # Time state changes are written after, so a burst of them is written to disk once
+    PERSIST_DELAY = 1.0
 
-    def __init__(self) -> None:
+    _jobs: Dict[str, Job] = {}
+    _history: Deque[Job] = deque(maxlen=HISTORY_SIZE)
+    _queue: "asyncio.PriorityQueue[Tuple[int, int, str]]" = asyncio.PriorityQueue()
+    # Keeps jobs with the same priority in insertion order
+    _sequence = itertools.count()
+    _persist_handle: Optional[asyncio.TimerHandle] = None
+
+    def __init__(self, workers: Optional[int] = None) -> None:
         self.is_running = True
         self.base_host = ""
+        self.workers = workers or self.WORKERS
+        self._tasks: List["asyncio.Task[None]"] = []
 
-    async def execute_job(self, job: Job) -> None:
+    async def execute_job(self, job: Job) -> bool:
         job_name = f"{job.method.value} - {job.route}"
-        logger.info(f"Executing job {job_name}")
-        async with aiohttp.ClientSession() as session:
-            for i in range(job.retries):
-                try:
-                    async with session.request(
-                        method=job.method, url=f"{self.base_host}/{job.route}", json=job.body
-                    ) as response:
-                        response.raise_for_status()
-                        await response.read()
-                        return
-                except Exception:
-                    logger.warning(f"Failed job {job_name} attempt {i + 1}/{job.retries}")
-                    await asyncio.sleep(5)
-            logger.error(f"Job {job_name} failed to be executed")
+        logger.info(f"Executing job {job_name} attempt {job.attempts}/{job.retries}")
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.request(
+                    method=job.method, url=f"{self.base_host}/{job.route}", json=job.body
+                ) as response:
+                    response.raise_for_status()
+                    await response.read()
+                    return True
+        except Exception as error:
+            logger.warning(f"Failed job {job_name} attempt {job.attempts}/{job.retries}: {error}")
+            job.error = str(error)
+            return False
 
-    async def start(self) -> None:
+    @classmethod
+    def _enqueue(cls, job: Job) -> None:
+        job.state = JobState.QUEUED
+        cls._queue.put_nowait((-job.priority, next(cls._sequence), job.id))
+
+    async def _retry_later(self, job: Job) -> None:
+        delay = min(self.RETRY_DELAY * 2 ** (job.attempts - 1), self.MAX_RETRY_DELAY)
+        await asyncio.sleep(delay)
+        # Job may have been deleted while waiting
+        if self._jobs.get(job.id) is job:
+            self._enqueue(job)
+            self._persist()
+
+    @classmethod
+    def _finish(cls, job: Job, state: JobState) -> None:
+        job.state = state
+        cls._jobs.pop(job.id, None)
+        cls._history.append(job)
+        cls._persist()
+
+    async def _worker(self) -> None:
         while self.is_running:
-            await asyncio.sleep(1)
-            if self._jobs:
-                self._executing_job = self._jobs.pop(0)
-                await self.execute_job(self._executing_job)
-                self._executing_job = None
+            _priority, _sequence, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.state != JobState.QUEUED:
+                continue
+
+            job.state = JobState.RUNNING
+            job.attempts += 1
+            self._persist()
+
+            succeeded = await self.execute_job(job)
+            # Job may have been deleted while running
+            if self._jobs.get(job.id) is not job:
+                continue
+
+            if succeeded:
+                self._finish(job, JobState.FINISHED)
+            elif job.attempts >= job.retries:
+                logger.error(f"Job {job.method.value} - {job.route} failed to be executed")
+                self._finish(job, JobState.FAILED)
+            else:
+                job.state = JobState.WAITING_RETRY
+                self._persist()
+                self._tasks.append(asyncio.create_task(self._retry_later(job)))
+                self._tasks = [task for task in self._tasks if not task.done()]
+
+    @classmethod
+    def _persist(cls) -> None:
+        """Schedule a write of the pending jobs, changes made until then are written with it"""
+        if cls._persist_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            cls._write()
+            return
+        cls._persist_handle = loop.call_later(cls.PERSIST_DELAY, cls._flush)
+
+    @classmethod
+    def _flush(cls) -> None:
+        if cls._persist_handle is not None:
+            cls._persist_handle.cancel()
+            cls._persist_handle = None
+            cls._write()
+
+    @classmethod
+    def _write(cls) -> None:
+        try:
+            cls.JOBS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            temporary_file = cls.JOBS_FILE.with_suffix(".tmp")
+            temporary_file.write_text(
+                json.dumps([json.loads(job.json()) for job in cls._jobs.values()]), encoding="utf-8"
+            )
+            temporary_file.replace(cls.JOBS_FILE)
+        except Exception as error:
+            logger.warning(f"Unable to persist jobs: {error}")
+
+    @classmethod
+    def _restore(cls) -> None:
+        if not cls.JOBS_FILE.exists():
+            return
+        try:
+            jobs = [Job.parse_obj(data) for data in json.loads(cls.JOBS_FILE.read_text(encoding="utf-8"))]
+        except Exception as error:
+            logger.warning(f"Unable to restore persisted jobs: {error}")
+            return
+
+        for job in jobs:
+            if job.id not in cls._jobs:
+                logger.info(f"Resuming job {job.method.value} - {job.route}")
+                cls._jobs[job.id] = job
+                cls._enqueue(job)
+
+    async def start(self) -> None:
+        self._restore()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers + self._tasks:
+                task.cancel()
+            self._flush()
 
     async def stop(self) -> None:
         self.is_running = False
+        for task in self._tasks:
+            task.cancel()
+        self._flush()
 
     def set_base_host(self, host: str) -> None:
         self.base_host = host
 
     @classmethod
     def add(cls, job: Job) -> None:
-        cls._jobs.append(job)
+        cls._jobs[job.id] = job
+        cls._enqueue(job)
+        cls._persist()
 
     @classmethod
     def get(cls) -> List[Job]:
-        return ([cls._executing_job] if cls._executing_job else []) + cls._jobs
+        return list(cls._jobs.values()) + list(cls._history)
 
     @classmethod
     def get_by_identifier(cls, identifier: str) -> Job:
-        job = next((job for job in cls.get() if job.id == identifier), None)
+        job = cls._jobs.get(identifier) or next((job for job in cls._history if job.id == identifier), None)
         if job is None:
             raise JobNotFound(f"Job with id {identifier} not found")
         return job
 
     @classmethod
     def delete(cls, identifier: str) -> None:
-        job = cls.get_by_identifier(identifier)
-        cls._jobs.remove(job)
+        if identifier in cls._jobs:
+            cls._jobs.pop(identifier)
+            cls._persist()
+            return
+        cls._history.remove(cls.get_by_identifier(identifier))
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Any
+from typing import Any, Optional
 
 from pydantic import BaseModel
 
@@ -13,9 +13,22 @@ class JobMethod(str, Enum):
     DELETE = "DELETE"
 
 
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    WAITING_RETRY = "waiting_retry"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+
 class Job(BaseModel):
     id: str
     route: str
     method: JobMethod
     body: Any
     retries: int = 5
+    # Jobs with higher priority are executed first
+    priority: int = 0
+    state: JobState = JobState.QUEUED
+    attempts: int = 0
+    error: Optional[str] = None
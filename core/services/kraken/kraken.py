@@ -1,7 +1,7 @@
 import asyncio
 import time
 import traceback
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 
 import aiohttp
 from commonwealth.settings.manager import Manager
@@ -13,18 +13,23 @@ from extension.extension import Extension
 from extension.models import ExtensionSource
 from harbor import ContainerManager
 from jobs import JobsManager
-from jobs.models import Job, JobMethod
+from jobs.models import Job, JobMethod, JobState
 from manifest import ManifestManager
 from manifest.exceptions import ManifestBackendOffline
 from settings import ExtensionSettings, SettingsV2
 
 
 class Kraken:
-    def __init__(self) -> None:
+    def __init__(self, max_concurrent_starts: int = 4, max_concurrent_pulls: int = 1) -> None:
         self._manager: Manager = Manager(SERVICE_NAME, SettingsV2)
         self._settings = self._manager.settings
         self.is_running = True
         self.manifest = ManifestManager.instance()
+        # Dead extensions are recovered in the background, bounded by these limits
+        self._start_semaphore = asyncio.Semaphore(max_concurrent_starts)
+        self._pull_semaphore = asyncio.Semaphore(max_concurrent_pulls)
+        # Recovery task of each extension being recovered, by unique entry
+        self._recovery_tasks: Dict[str, "asyncio.Task[None]"] = {}
 
     def _extension_start_try_valid(self, extension: ExtensionSettings) -> bool:
         unique_entry = f"{extension.identifier}{extension.tag}"
@@ -45,6 +50,52 @@ class Kraken:
             and extension.container_name() not in Extension.locked_entries
         ) and (unique_entry not in Extension.start_attempts or (now - last_attempt > required_delay))
 
+    async def _fetch_dead_extension_digest(self, extension: ExtensionSettings) -> Optional[str]:
+        try:
+            version = await self.manifest.fetch_extension_version(extension.identifier, extension.tag)
+            if version:
+                return Extension.get_compatible_digest(version, extension.identifier, False)
+            logger.warning(
+                f"Dead extension {extension.identifier}:{extension.tag} is external and likely requires authentication"
+            )
+        except IncompatibleExtension:
+            logger.warning(f"Dead extension {extension.identifier}:{extension.tag} is not compatible anymore")
+        except ManifestBackendOffline:
+            logger.warning(
+                f"Could not fetch manifest since the backend is offline, will try to start {extension.identifier}:{extension.tag} anyway"
+            )
+        except Exception:
+            logger.warning(
+                f"Unable to fetch manifest, will try to start {extension.identifier}:{extension.tag} anyway. Error: {traceback.format_exc()}"
+            )
+        return None
+
+    async def _recover_extension(self, extension: ExtensionSettings) -> None:
+        unique_entry = f"{extension.identifier}{extension.tag}"
+        try:
+            digest = await self._fetch_dead_extension_digest(extension)
+            dead_extension = Extension(ExtensionSource.from_settings(extension), digest)
+
+            # Pulls are done in their own stage so extensions with cached images do not wait behind them
+            if not await dead_extension.is_image_available():
+                async with self._pull_semaphore:
+                    try:
+                        await dead_extension.pull_image()
+                    except Exception:
+                        # Failed pulls count as start attempts to keep the exponential backoff
+                        Extension.mark_start_attempt(unique_entry)
+                        raise
+
+            async with self._start_semaphore:
+                # The image was found or pulled above, no need to check it again
+                await dead_extension.start(image_available=True)
+        except Exception:
+            logger.warning(
+                f"Dead extension {extension.identifier}:{extension.tag} could not be started: {traceback.format_exc()}"
+            )
+        finally:
+            self._recovery_tasks.pop(unique_entry, None)
+
     async def init_dead_extensions(self) -> None:
         # This can fail if docker daemon is not running
         try:
@@ -54,39 +105,15 @@ class Kraken:
             return
 
         extensions: List[ExtensionSettings] = Extension._fetch_settings()
+        running_names = {container.name[1:] for container in containers}
 
         for extension in extensions:
-            if not self._extension_start_try_valid(extension):
+            unique_entry = f"{extension.identifier}{extension.tag}"
+            if unique_entry in self._recovery_tasks or not self._extension_start_try_valid(extension):
                 continue
 
-            extension_name = extension.container_name()
-            if not any(container.name[1:] == extension_name for container in containers):
-                digest = None
-                try:
-                    version = await self.manifest.fetch_extension_version(extension.identifier, extension.tag)
-                    if version:
-                        digest = Extension.get_compatible_digest(version, extension.identifier, False)
-                    else:
-                        logger.warning(
-                            f"Dead extension {extension.identifier}:{extension.tag} is external and likely requires authentication"
-                        )
-                except IncompatibleExtension:
-                    logger.warning(f"Dead extension {extension.identifier}:{extension.tag} is not compatible anymore")
-                except ManifestBackendOffline:
-                    logger.warning(
-                        f"Could not fetch manifest since the backend is offline, will try to start {extension.identifier}:{extension.tag} anyway"
-                    )
-                except Exception:
-                    logger.warning(
-                        f"Unable to fetch manifest, will try to start {extension.identifier}:{extension.tag} anyway. Error: {traceback.format_exc()}"
-                    )
-
-                try:
-                    await (Extension(ExtensionSource.from_settings(extension), digest)).start()
-                except Exception:
-                    logger.warning(
-                        f"Dead extension {extension.identifier}:{extension.tag} could not be started: {traceback.format_exc()}"
-                    )
+            if extension.container_name() not in running_names:
+                self._recovery_tasks[unique_entry] = asyncio.create_task(self._recover_extension(extension))
 
     async def fetch_default_extension_data(self, url: str) -> Any:
         async with aiohttp.ClientSession() as session:
@@ -97,18 +124,15 @@ class Kraken:
 
     def is_install_default_ext_job_created(self, identifier: str) -> bool:
         try:
-            JobsManager.get_by_identifier(identifier)
+            job = JobsManager.get_by_identifier(identifier)
         except Exception:
             return False
-        return True
+        # Failed jobs are kept for inspection only, a new one should be created
+        return job.state != JobState.FAILED
 
     async def setup_default_extensions(self) -> None:
-        extensions: List[ExtensionSettings] = Extension._fetch_settings()
-        for ext in [
-            ext
-            for ext in DEFAULT_EXTENSIONS
-            if not any(ext["identifier"] == extension.identifier for extension in extensions)
-        ]:
+        registry = Extension.registry()
+        for ext in [ext for ext in DEFAULT_EXTENSIONS if not registry.by_identifier(ext["identifier"])]:
             job_id = f'__default_install_{ext["identifier"]}'
             if not self.is_install_default_ext_job_created(job_id):
                 data = await self.fetch_default_extension_data(ext["url"])
@@ -142,7 +166,7 @@ class Kraken:
             logger.error(f"Unable to list docker containers: {e}")
             return
 
-        extensions: List[ExtensionSettings] = Extension._fetch_settings()
+        container_names = Extension.registry().container_names()
 
         for container in containers:
             container_name = container.name[1:]
@@ -150,7 +174,7 @@ class Kraken:
             if (
                 container_name not in Extension.locked_entries
                 and container_name.startswith("extension-")
-                and container_name not in [ext.container_name() for ext in extensions]
+                and container_name not in container_names
             ):
                 try:
                     await Extension.remove(container_name)
@@ -173,3 +197,5 @@ class Kraken:
 
     async def stop(self) -> None:
         self.is_running = False
+        for task in list(self._recovery_tasks.values()):
+            task.cancel()
@@ -13,14 +13,17 @@ logging.basicConfig(handlers=[InterceptHandler()], level=0)
 init_logger(SERVICE_NAME)
 
 from api import application
+from extension.admission import AdmissionController
+from harbor import ContainerCache, ContainerStatsSampler, DockerCtx
 from jobs import JobsManager
 from kraken import Kraken
 
-kraken = Kraken()
 jobs = JobsManager()
 
 if __name__ == "__main__":
     args = CommandLineArgs.from_args()
+    kraken = Kraken(max_concurrent_starts=args.max_concurrent_starts, max_concurrent_pulls=args.max_concurrent_pulls)
+    AdmissionController.configure(args.disk_margin * 2**20, args.memory_budget_ratio, args.cpu_budget_ratio)
 
     if args.debug:
         logging.getLogger(SERVICE_NAME).setLevel(logging.DEBUG)
@@ -32,9 +35,14 @@ if __name__ == "__main__":
     server = Server(config)
     jobs.set_base_host(f"http://{args.host}:{args.port}")
 
+    loop.create_task(ContainerCache.start())
+    loop.create_task(ContainerStatsSampler.start())
     loop.create_task(kraken.start_cleaner_task())
     loop.create_task(kraken.start_starter_task())
     loop.create_task(jobs.start())
     loop.run_until_complete(server.serve())
     loop.run_until_complete(jobs.stop())
     loop.run_until_complete(kraken.stop())
+    ContainerStatsSampler.stop()
+    ContainerCache.stop()
+    loop.run_until_complete(DockerCtx.close())
@@ -1,30 +1,21 @@
 import asyncio
 import uuid
 from functools import wraps
-from typing import Any, Callable, List, Optional, Set, Tuple, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 
-import aiohttp
 import semver
-from aiocache import cached
 from commonwealth.settings.manager import Manager
 
 from config import DEFAULT_MANIFESTS, SERVICE_NAME
-from manifest.exceptions import (
-    ManifestBackendOffline,
-    ManifestDataFetchFailed,
-    ManifestDataParseFailed,
-    ManifestInvalidURL,
-    ManifestNotFound,
-    ManifestOperationNotAllowed,
-)
+from manifest.exceptions import ManifestNotFound, ManifestOperationNotAllowed
 from manifest.models import (
     ExtensionVersion,
     Manifest,
-    ManifestData,
     ManifestSource,
     RepositoryEntry,
     UpdateManifestSource,
 )
+from manifest.store import ManifestStore
 from settings import ManifestSettings, SettingsV2
 
 
@@ -34,6 +25,10 @@ class ManifestManager:
     """
 
     _instance: Optional["ManifestManager"] = None
+    _store: ManifestStore
+    _consolidated_key: Optional[Tuple[Tuple[str, str, int], ...]]
+    _consolidated: List[RepositoryEntry]
+    _index: Dict[str, RepositoryEntry]
     _manager: Manager = Manager(SERVICE_NAME, SettingsV2)
     _settings = _manager.settings
 
@@ -80,30 +75,16 @@ class ManifestManager:
     def instance(cls) -> "ManifestManager":
         if cls._instance is None:
             cls._instance = cls.__new__(cls)
+            cls._instance._store = ManifestStore()
+            cls._instance._consolidated_key = None
+            cls._instance._consolidated = []
+            cls._instance._index = {}
             cls._set_default_manifests()
 
         return cls._instance
 
-    @cached(ttl=3600, namespace="manifest")
     async def _fetch_manifest_data(self, url: str) -> List[RepositoryEntry]:
-        try:
-            async with aiohttp.ClientSession() as session:
-                headers = {"Accept": "application/json"}
-                try:
-                    async with session.get(url, headers=headers) as resp:
-                        if resp.status != 200:
-                            raise ManifestDataFetchFailed(
-                                f"Failed to fetch manifest data from {url} with status {resp.status}"
-                            )
-
-                        try:
-                            return ManifestData.parse_obj(await resp.json(content_type=None)).__root__
-                        except Exception as e:
-                            raise ManifestDataParseFailed(f"Failed to parse manifest data from {url}") from e
-                except aiohttp.InvalidURL as e:
-                    raise ManifestInvalidURL(f"Invalid URL {url}") from e
-        except aiohttp.ClientConnectionError as e:
-            raise ManifestBackendOffline("Unable to fetch manifest, backend is offline") from e
+        return await self._store.fetch(url)
 
     async def _fetch_manifest(self, settings: ManifestSettings, fetch_data: bool = True) -> Manifest:
         manifest = Manifest(
@@ -136,15 +117,19 @@ class ManifestManager:
     async def fetch_consolidated(self) -> List[RepositoryEntry]:
         manifests = await self.fetch(fetch_data=True, enabled=True)
 
-        consolidated = []
-        seen_identifiers: Set[str] = set()
-        for manifest in manifests:
-            if manifest.data is not None:
-                new_entries = [entry for entry in manifest.data if entry.identifier not in seen_identifiers]
-                consolidated.extend(new_entries)
-                seen_identifiers.update(entry.identifier for entry in new_entries)
+        # Merging is only redone when sources, their order or their content changed
+        key = tuple((manifest.identifier, manifest.url, self._store.version(manifest.url)) for manifest in manifests)
+        if key != self._consolidated_key:
+            consolidated = []
+            index: Dict[str, RepositoryEntry] = {}
+            for manifest in manifests:
+                if manifest.data is not None:
+                    new_entries = [entry for entry in manifest.data if entry.identifier not in index]
+                    consolidated.extend(new_entries)
+                    index.update((entry.identifier, entry) for entry in new_entries)
+            self._consolidated_key, self._consolidated, self._index = key, consolidated, index
 
-        return consolidated
+        return list(self._consolidated)
 
     def _raise_in_default_source(self, identifier: str) -> None:
         default_identifiers = [source["identifier"] for source in DEFAULT_MANIFESTS]
@@ -248,13 +233,12 @@ class ManifestManager:
         self._manager.save()
 
     async def fetch_extension(self, extension_id: str, manifest_id: Optional[str] = None) -> Optional[RepositoryEntry]:
-        manifest = []
         if manifest_id is None:
             # Only fetch enabled sources already sorted by priority
-            manifest = await self.fetch_consolidated()
-        else:
-            manifest = (await self.fetch_by_identifier(manifest_id, fetch_data=True)).data or []
+            await self.fetch_consolidated()
+            return self._index.get(extension_id)
 
+        manifest = (await self.fetch_by_identifier(manifest_id, fetch_data=True)).data or []
         return next((ext for ext in manifest if ext.identifier == extension_id), None)
 
     async def fetch_extension_versions(
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import appdirs
+from loguru import logger
+
+from config import SERVICE_NAME
+from manifest.exceptions import (
+    ManifestBackendOffline,
+    ManifestDataFetchFailed,
+    ManifestDataParseFailed,
+    ManifestInvalidURL,
+)
+from manifest.models import ManifestData, RepositoryEntry
+
+
+class CachedManifest:
+    def __init__(self, url: str, data: Any, etag: Optional[str], last_modified: Optional[str]) -> None:
+        self.url = url
+        self.raw = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.entries: List[RepositoryEntry] = ManifestData.parse_obj(data).__root__
+        # Entries loaded from disk need to be revalidated before being considered fresh
+        self.validated_at: Optional[float] = None
+        # Changes every time the content changes, used to know when merged data must be rebuilt
+        self.version = 0
+
+
+class ManifestStore:
+    """
+    Keeps the last good payload of each manifest source in memory and on disk.
+    Payloads are revalidated with ETag/Last-Modified once they get older than DATA_TTL, and the last good payload is
+    served whenever the backend can't be reached.
+    """
+
+    # Time a payload is used without asking the backend if it changed
+    DATA_TTL = 3600.0
+    # Time before trying to reach the backend again after it failed and a cached payload was served
+    RETRY_INTERVAL = 60.0
+    CACHE_FOLDER = pathlib.Path(appdirs.user_config_dir(SERVICE_NAME), "manifests")
+
+    def __init__(self) -> None:
+        self._cache: Dict[str, CachedManifest] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._versions = 0
+
+    def _cache_file(self, url: str) -> pathlib.Path:
+        return self.CACHE_FOLDER.joinpath(f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json")
+
+    def _load_from_disk(self, url: str) -> Optional[CachedManifest]:
+        cache_file = self._cache_file(url)
+        if not cache_file.exists():
+            return None
+        try:
+            content = json.loads(cache_file.read_text(encoding="utf-8"))
+            return self._track(CachedManifest(url, content["data"], content.get("etag"), content.get("last_modified")))
+        except Exception as error:
+            logger.warning(f"Ignoring invalid manifest cache of {url}: {error}")
+            return None
+
+    def _save_to_disk(self, cached: CachedManifest) -> None:
+        try:
+            self.CACHE_FOLDER.mkdir(parents=True, exist_ok=True)
+            cache_file = self._cache_file(cached.url)
+            temporary_file = cache_file.with_suffix(".tmp")
+            temporary_file.write_text(
+                json.dumps(
+                    {
+                        "url": cached.url,
+                        "etag": cached.etag,
+                        "last_modified": cached.last_modified,
+                        "data": cached.raw,
+                    }
+                ),
+                encoding="utf-8",
+            )
+            temporary_file.replace(cache_file)
+        except Exception as error:
+            logger.warning(f"Unable to save manifest cache of {cached.url}: {error}")
+
+    def _track(self, cached: CachedManifest) -> CachedManifest:
+        self._versions += 1
+        cached.version = self._versions
+        return cached
+
+    def _cached(self, url: str) -> Optional[CachedManifest]:
+        if url not in self._cache:
+            cached = self._load_from_disk(url)
+            if cached is None:
+                return None
+            self._cache[url] = cached
+        return self._cache[url]
+
+    def version(self, url: str) -> int:
+        cached = self._cache.get(url)
+        return cached.version if cached else 0
+
+    async def _download(self, url: str, cached: Optional[CachedManifest]) -> CachedManifest:
+        headers = {"Accept": "application/json"}
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                try:
+                    async with session.get(url, headers=headers) as resp:
+                        if resp.status == 304 and cached is not None:
+                            return cached
+
+                        if resp.status != 200:
+                            raise ManifestDataFetchFailed(
+                                f"Failed to fetch manifest data from {url} with status {resp.status}"
+                            )
+
+                        try:
+                            data = await resp.json(content_type=None)
+                            fetched = CachedManifest(
+                                url, data, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+                            )
+                        except Exception as e:
+                            raise ManifestDataParseFailed(f"Failed to parse manifest data from {url}") from e
+                except aiohttp.InvalidURL as e:
+                    raise ManifestInvalidURL(f"Invalid URL {url}") from e
+        except aiohttp.ClientConnectionError as e:
+            raise ManifestBackendOffline("Unable to fetch manifest, backend is offline") from e
+
+        self._save_to_disk(fetched)
+        return self._track(fetched)
+
+    async def fetch(self, url: str) -> List[RepositoryEntry]:
+        lock = self._locks.setdefault(url, asyncio.Lock())
+        # Concurrent requests for the same source share a single download
+        async with lock:
+            cached = self._cached(url)
+            if (
+                cached is not None
+                and cached.validated_at is not None
+                and time.monotonic() - cached.validated_at < self.DATA_TTL
+            ):
+                return cached.entries
+
+            try:
+                fetched = await self._download(url, cached)
+            # A payload that can't be parsed is as useless as an unreachable backend
+            except (ManifestBackendOffline, ManifestDataFetchFailed, ManifestDataParseFailed) as error:
+                if cached is None:
+                    raise
+                logger.warning(f"{error}, using last known manifest of {url}")
+                cached.validated_at = time.monotonic() - self.DATA_TTL + self.RETRY_INTERVAL
+                return cached.entries
+
+            fetched.validated_at = time.monotonic()
+            self._cache[url] = fetched
+            return fetched.entries
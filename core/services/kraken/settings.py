@@ -5,6 +5,9 @@ from typing import Any, Dict
 from commonwealth.settings import settings
 from pykson import BooleanField, IntegerField, JsonObject, ObjectListField, StringField
 
+# Characters that are not allowed in extension container names
+CONTAINER_NAME_INVALID_CHARS = re.compile("[^a-zA-Z0-9]")
+
 
 class ExtensionSettings(JsonObject):
     identifier = StringField()
@@ -29,8 +32,7 @@ class ExtensionSettings(JsonObject):
         return f"{self.docker}:{self.tag}"
 
     def container_name(self) -> str:
-        regex = re.compile("[^a-zA-Z0-9]")
-        return "extension-" + regex.sub("", f"{self.docker}{self.tag}")
+        return "extension-" + CONTAINER_NAME_INVALID_CHARS.sub("", f"{self.docker}{self.tag}")
 
 
 class ManifestSettings(JsonObject):